@@ -14,6 +14,10 @@ Oana Mirestean oam34
 from consts import *
 from game2d import *
 from wave import *
+import struct
+
+# The fixed part of a snapshot of the application: the state and lastkeys
+APP_HEADER = struct.Struct('<bi')
 
 
 # PRIMARY RULE: Invaders can only access attributes in wave.py via getters/setters
@@ -83,9 +87,35 @@ class Invaders(GameApp):
     #Attribute _newblack: creates a black GRectangle object for the screen background
     #Invariant: _newblack is a GRectangle object
     #
+    # Attribute _pilot: the scripted player that stands in for the keyboard
+    # Invariant: _pilot is an Autopilot object (see autopilot.py), or None if
+    # the game is played with the keyboard.  It is a class attribute until
+    # setPilot is called, since this class has no initializer.
+
+    _pilot = None
 
     # DO NOT MAKE A NEW INITIALIZER!
 
+    # GETTERS AND SETTERS
+    def getPilot(self):
+        """
+        Returns the scripted player of the game (None if it is the keyboard).
+        """
+        return self._pilot
+
+    def setPilot(self, pilot):
+        """
+        Sets the scripted player that stands in for the keyboard.
+
+        The pilot presses "s" to start a wave and "c" to continue after a
+        lost life, and plays the waves itself, so the game runs unattended.
+        It may be set before or after the game starts.
+
+        Parameter pilot: the scripted player (None for the keyboard)
+        Precondition: pilot is None or an Autopilot object (such as a Planner)
+        """
+        self._pilot = pilot
+
     # THREE MAIN GAMEAPP METHODS
     def start(self):
         """
@@ -166,6 +196,7 @@ class Invaders(GameApp):
         Precondition: dt is a number (int or float)
         """
         assert type(dt) == int or type(dt) == float
+        self._steer()
         self._determineState()
         if   self._state == STATE_INACTIVE:
             self.state_inactive()
@@ -182,7 +213,7 @@ class Invaders(GameApp):
             text='Player lives: ' + str(self._wave.getLives()),linecolor='white',font_size=12,
             font_name='RetroGame.ttf')
             last_lives = self._wave.getLives()
-            self._wave.update(self.input,dt)
+            self._wave.update(self._keyboard(),dt)
             if last_lives != self._wave.getLives() and self._wave.getLives() > 0:
                 self._state = STATE_PAUSED                                                              #STATE_HIT
         elif self._state == STATE_PAUSED:
@@ -211,7 +242,9 @@ class Invaders(GameApp):
         from class.
         """
         self._black.draw(self.view)
-        if self._wave != None and self._state != STATE_COMPLETE:
+        if self._wave != None and self._state == STATE_ACTIVE:
+            self._wave.draw(self.view, self.interpolation)
+        elif self._wave != None and self._state != STATE_COMPLETE:
             self._wave.draw(self.view)
         if self._text == None:
             self._gametext.draw(self.view)
@@ -230,25 +263,52 @@ class Invaders(GameApp):
         user must release the key and press it again to change the state.
         """
         # Determine the current number of keys pressed
-        curr_keys = self.input.key_count
+        keyboard = self._keyboard()
+        curr_keys = keyboard.key_count
         # Only change if we have just pressed the keys this animation frame
         change = curr_keys > 0 and curr_keys < 2 and self.lastkeys == 0
         if change:
             # Click happened.  Change the state
-            if self.input.is_key_down('s') and (self._state == STATE_INACTIVE or
+            if keyboard.is_key_down('s') and (self._state == STATE_INACTIVE or
             self._state == STATE_COMPLETE):
                 self._state = STATE_NEWWAVE
                 self.lastkeys = curr_keys + 1
-            elif self.input.is_key_down('p'):
+            elif keyboard.is_key_down('p'):
                 self._state = STATE_PAUSED
                 self.lastkeys = curr_keys + 1
-            elif self.input.is_key_down('c') and self._state == STATE_PAUSED:
+            elif keyboard.is_key_down('c') and self._state == STATE_PAUSED:
                 self._state = STATE_CONTINUE
                 self.lastkeys = curr_keys + 1
         if self._state == STATE_ACTIVE and (self._wave.getLives() <=0 or self._wave.player_won()):
             self.lastkeys = 0
             self._state = STATE_COMPLETE
 
+    def _keyboard(self):
+        """
+        Returns the input that plays the game: the pilot if there is one, else input.
+        """
+        return self.input if self._pilot is None else self._pilot
+
+    def _steer(self):
+        """
+        Has the pilot (if there is one) choose its keys for this animation frame.
+
+        It presses "s" in STATE_INACTIVE and STATE_COMPLETE, "c" in
+        STATE_PAUSED, plays the wave in STATE_ACTIVE, and holds no keys
+        otherwise.
+        """
+        pilot = self._pilot
+        if pilot is None:
+            return
+        if self._state == STATE_INACTIVE or self._state == STATE_COMPLETE:
+            pilot.hold('s')
+        elif self._state == STATE_PAUSED:
+            pilot.hold('c')
+        elif self._state == STATE_ACTIVE:
+            pilot.think(self._wave.getSimulation())
+        else:
+            pilot.hold()
+
     def state_inactive(self):
         """
         Helper function for STATE_INACTIVE
@@ -294,3 +354,35 @@ class Invaders(GameApp):
         else:
             self._text = GLabel(x = GAME_WIDTH/2,y =GAME_HEIGHT/2,
             text='You lost! Press "S"',font_size=40, font_name='RetroGame.ttf',linecolor='white')
+
+    # METHODS TO SAVE AND RESTORE THE GAME
+    def snapshot(self):
+        """
+        Returns the state of the game as a bytes object.
+
+        This is the state, the keys pressed so far, and the snapshot of the
+        current wave (see Wave.snapshot), if there is one.
+        """
+        header = APP_HEADER.pack(self._state, self.lastkeys)
+        if self._wave is None:
+            return header
+        return header + self._wave.snapshot()
+
+    def restore(self, snapshot):
+        """
+        Puts the game back in the state of a snapshot.
+
+        The current wave is restored in place, so no images are made unless
+        there is no wave yet.  The messages on screen are remade by the next
+        update.
+
+        Parameter snapshot: the state to restore
+        Precondition: snapshot is a bytes object returned by snapshot
+        """
+        self._state, self.lastkeys = APP_HEADER.unpack_from(snapshot)
+        if len(snapshot) == APP_HEADER.size:
+            self._wave = None
+            return
+        if self._wave is None:
+            self._wave = Wave()
+        self._wave.restore(snapshot[APP_HEADER.size:])
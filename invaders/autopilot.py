@@ -0,0 +1,206 @@
+"""
+Autopilot module for Alien Invaders
+
+This module contains the class Autopilot, a scripted player that stands in
+for the keyboard.  It is an ActionInput (see env.py), so it may be given to
+Simulation.update or Wave.update in place of the input of the application,
+or made the pilot of the Invaders application (see Invaders.setPilot).
+Every update, think looks at the wave and chooses the keys to hold down: it
+dodges the alien bolts that would hit the ship, and otherwise moves under
+the frontline column (the column whose bottom alien is lowest) and fires at
+it.
+
+The function soak plays wave after wave with an autopilot, as fast as the
+game allows, and measures the time of the updates and the memory in use as
+it goes.  This is how we soak-test a build for slowdowns and memory growth
+over the equivalent of days of play.  It plays headless Simulations, or
+Waves drawn to a view (to include the model objects and their images).
+
+Like simulation.py, this module does not depend on the Kivy classes of game2d
+(unless soak is given a view, which imports wave.py).
+"""
+from consts import *
+from simulation import Simulation
+from env import ActionInput
+import numpy as np
+import time
+import gc
+import tracemalloc
+
+# PRIMARY RULE: Autopilot can only access consts.py, simulation.py, env.py and
+# (in soak) wave.py.
+
+# The top of the ship (the height at which an alien bolt hits it)
+SHIP_TOP = SHIP_BOTTOM + SHIP_HEIGHT
+# How far from the center of the ship an alien bolt is a threat
+DANGER_WIDTH = SHIP_WIDTH/2.0 + BOLT_WIDTH/2.0 + 2*SHIP_MOVEMENT
+# The number of updates of warning beyond the time needed to dodge
+DANGER_SLACK = 8
+# The number of updates in an hour of play
+HOUR_TICKS = 3600*UPDATE_RATE
+
+
+class Autopilot(ActionInput):
+    """
+    A class representing a scripted player.
+
+    Call think before each update to choose the keys for the current state
+    of a wave, or hold to choose them directly (to press the keys of a menu,
+    for example).  The keys stay down until the next call to either.
+    """
+
+    # METHODS TO CHOOSE THE KEYS
+    def hold(self, *keys):
+        """
+        Holds down the given keys (and releases all others).
+
+        Parameter keys: the keys to hold down
+        Precondition: each key is a key name
+        """
+        self._keys = keys
+
+    def think(self, sim):
+        """
+        Chooses the keys to play the next update of a wave.
+
+        The ship dodges the nearest alien bolt that is about to hit it,
+        moving away from the bolt (unless that runs into the edge of the
+        window).  Otherwise it moves under the frontline column, without
+        moving into the path of a bolt.  It fires whenever it is under an
+        alien and its last bolt is gone.
+
+        Parameter sim: the wave to play
+        Precondition: sim is a Simulation object
+        """
+        x = sim.getShipX()
+        formation = sim.getFormation()
+        fronts = formation.frontline()
+        keys = []
+        threat = self._threat(sim, x)
+        if threat is not None:
+            way = 1 if x >= threat else -1
+            if not SHIP_WIDTH <= x + way*DANGER_WIDTH <= GAME_WIDTH-SHIP_WIDTH:
+                way = -way
+            keys.append('right' if way > 0 else 'left')
+        elif fronts:
+            xs = formation.getX()
+            ys = formation.getY()
+            target = min(fronts, key=lambda pos: (ys[pos], abs(xs[pos] - x)))
+            dx = xs[target] - x
+            if abs(dx) > SHIP_MOVEMENT/2.0:
+                way = 1 if dx > 0 else -1
+                if self._threat(sim, x + way*SHIP_MOVEMENT) is None:
+                    keys.append('right' if way > 0 else 'left')
+        if sim.getBolts().players() == 0:
+            xs = formation.getX()
+            if any(abs(xs[pos] - x) < ALIEN_WIDTH/2.0 for pos in fronts):
+                keys.append('spacebar')
+        self._keys = tuple(keys)
+
+    # HELPER METHODS
+    def _threat(self, sim, x):
+        """
+        Returns the x-value of the nearest alien bolt that threatens a ship at x.
+
+        A bolt is a threat if it is close enough to the ship, sideways, to hit
+        it, and it will reach the ship before the ship can get out of its way
+        (with DANGER_SLACK updates to spare).  This returns None if no bolt
+        is a threat.
+
+        Parameter sim: the wave to check
+        Precondition: sim is a Simulation object
+
+        Parameter x: the horizontal coordinate of the ship center
+        Precondition: x is a number
+        """
+        bolts = sim.getBolts()
+        if bolts.aliens() == 0:
+            return None
+        chosen = bolts.getAlive() & ~bolts.getOwner()
+        xs = bolts.getX()[chosen]
+        gap = np.abs(xs - x)
+        above = bolts.getY()[chosen] - BOLT_HEIGHT/2.0 - SHIP_TOP
+        ticks = above/BOLT_SPEED
+        escape = (DANGER_WIDTH - gap)/SHIP_MOVEMENT
+        danger = (gap < DANGER_WIDTH) & (above > -BOLT_HEIGHT)
+        danger &= ticks <= escape + DANGER_SLACK
+        if not danger.any():
+            return None
+        return float(xs[danger][np.argmin(above[danger])])
+
+
+def soak(ticks=HOUR_TICKS, seed=None, window=UPDATE_RATE*60, pixel=False, view=None):
+    """
+    Plays waves with an autopilot for a number of updates, and returns the measurements.
+
+    The waves are played back to back with no pause between updates.  Each
+    new wave is seeded from the random numbers of the last one, so a soak
+    run with a seed always plays the same waves.  Every window updates, the
+    run records a tuple (tick, seconds, memory, waves): the updates played
+    so far, the mean time of an update in the window, the bytes allocated by
+    Python after a garbage collection (as traced by tracemalloc), and the
+    waves finished so far.  The memory is None if tracemalloc is not
+    tracing; start it before the run to measure memory (it makes the updates
+    slower).
+
+    Without a view, the waves are headless Simulations.  With a view, they
+    are Waves (without audio), and each one is drawn to the view after every
+    update, as Invaders does, so the run also measures the model objects,
+    their images and the bolt pool.  This needs Kivy, and the view is
+    cleared before each draw.
+
+    A build is healthy if the seconds and the memory stay level over a long
+    run.  A trend up in either is a leak or a slowdown.
+
+    Parameter ticks: the number of updates to play
+    Precondition: ticks is an int > 0
+
+    Parameter seed: the seed of the first wave (None for a random wave)
+    Precondition: seed is None or an int >= 0
+
+    Parameter window: the number of updates between measurements
+    Precondition: window is an int > 0
+
+    Parameter pixel: whether bolts only hit opaque pixels
+    Precondition: pixel is a bool
+
+    Parameter view: the view to draw the waves to (None to play headless)
+    Precondition: view is None or a GView
+    """
+    assert type(ticks) == int and ticks > 0, repr(ticks)+' is not a valid number of ticks'
+    assert type(window) == int and window > 0, repr(window)+' is not a valid window'
+    if view is None:
+        play = Simulation
+    else:
+        from wave import Wave
+
+        def play(pixel, seed):
+            return Wave(False, seed, pixel)
+    pilot = Autopilot()
+    game = play(pixel, seed)
+    sim = game if view is None else game.getSimulation()
+    waves = 0
+    dt = 1.0/UPDATE_RATE
+    result = []
+    tick = 0
+    while tick < ticks:
+        count = min(window, ticks-tick)
+        start = time.perf_counter()
+        for _ in range(count):
+            pilot.think(sim)
+            game.update(pilot, dt)
+            if view is not None:
+                view.clear()
+                game.draw(view)
+            if sim.player_won() or sim.getLives() <= 0:
+                game = play(pixel, sim.getRandom().randint(0, 2**31-1))
+                sim = game if view is None else game.getSimulation()
+                waves += 1
+        seconds = (time.perf_counter()-start)/count
+        tick += count
+        memory = None
+        if tracemalloc.is_tracing():
+            gc.collect()
+            memory = tracemalloc.get_traced_memory()[0]
+        result.append((tick, seconds, memory, waves))
+    return result
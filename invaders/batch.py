@@ -0,0 +1,450 @@
+"""
+Batched game module for Alien Invaders
+
+This module contains the class BatchEnv, which plays many independent games
+of Alien Invaders at once.  It follows the same rules as Simulation, but the
+state of every game is a row of a NumPy array, so one call to step advances
+all of the games with a fixed number of array operations.  This is much
+faster than updating a Simulation per game when there are many games (when
+training or evaluating an agent, for instance).
+
+The batch is specialized to the case that matters for this: every call to
+step is exactly one update at UPDATE_RATE, and collisions use bounding boxes.
+With these settings a game in the batch plays like a Simulation (except for
+the random numbers, which come from one generator for the whole batch).
+
+Like simulation.py, this module does not depend on game2d.
+"""
+from consts import *
+from formation import *
+from trajectory import RIGHT_LIMIT, LEFT_LIMIT, LAND_LIMIT
+from simulation import STEP_TICKS
+import numpy as np
+
+# PRIMARY RULE: BatchEnv can only access consts.py, formation.py, trajectory.py
+# and simulation.py (for its constants).
+
+# The number of updates an alien bolt can stay on screen (it is fired at most
+# from the top of the window, and is removed once its top is below the window)
+BOLT_LIFETIME = (GAME_HEIGHT + BOLT_HEIGHT//2)//BOLT_SPEED + 1
+# The number of alien bolts each game has room for.  The aliens fire at most
+# once every 2*STEP_TICKS updates, so this is the most alien bolts that can be
+# on screen at once, and no shot is ever skipped or left out of an observation
+ALIEN_BOLTS = max(1, -(-BOLT_LIFETIME//(2*STEP_TICKS)))
+# The fields of an observation (see BatchEnv.observe).  This is the one
+# definition of the layout: InvadersEnv and FeatureTable use it as well
+OBSERVATION = np.dtype([('ship', np.float32), ('lives', np.float32),
+                        ('offset', np.float32, (2,)), ('direction', np.float32),
+                        ('bolt', np.float32, (3,)),
+                        ('alien_bolts', np.float32, (ALIEN_BOLTS, 3)),
+                        ('alive', np.float32, (ALIEN_ROWS, ALIENS_IN_ROW))])
+# The number of features in an observation
+OBSERVATION_SIZE = OBSERVATION.itemsize//np.dtype(np.float32).itemsize
+# The columns of an action: move left, move right and fire
+ACTION_LEFT  = 0
+ACTION_RIGHT = 1
+ACTION_FIRE  = 2
+# The reward for each alien killed and each life lost
+KILL_REWARD = 1.0
+LIFE_REWARD = -1.0
+
+
+class BatchEnv(object):
+    """
+    A class representing a batch of games of Alien Invaders played in lock-step.
+
+    Each call to step takes an action for every game and advances all of them
+    by one update.  A game that ends (the aliens are all dead, or the player
+    has no lives left) is reset in place, so every row always holds a game in
+    play.  The observation of a game is a row of floats (see observe).
+
+    All state is kept in arrays whose first axis is the game.  The aliens of a
+    game always form a lattice that moves as a whole, so a game only stores
+    which aliens are alive and how far the lattice has moved.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _size: the number of games
+    # Invariant: _size is an int > 0
+    #
+    # Attribute _rng: the random numbers of the batch
+    # Invariant: _rng is a numpy.random.Generator
+    #
+    # Attribute _basex: the x-value of each alien column at the start of a game
+    # Invariant: _basex is a 1d float array of length ALIENS_IN_ROW
+    #
+    # Attribute _basey: the y-value of each alien row at the start of a game
+    # Invariant: _basey is a 1d float array of length ALIEN_ROWS
+    #
+    # Attribute _shipx: the horizontal coordinate of each ship center
+    # Invariant: _shipx is a float array of shape (size,)
+    #
+    # Attribute _lives: the number of lives left in each game
+    # Invariant: _lives is an int array of shape (size,)
+    #
+    # Attribute _alive: whether each alien of each game is alive
+    # Invariant: _alive is a bool array of shape (size, ALIEN_ROWS, ALIENS_IN_ROW)
+    #
+    # Attribute _offx, _offy: how far each formation has moved from its start
+    # Invariant: _offx and _offy are float arrays of shape (size,)
+    #
+    # Attribute _direction: the direction each formation is marching
+    # Invariant: _direction is an int array of shape (size,), of 1 or -1
+    #
+    # Attribute _clock: the number of updates since each game started
+    # Invariant: _clock is an int array of shape (size,)
+    #
+    # Attribute _nextstep, _nextfire: the update of the next alien step and
+    # the next alien shot of each game
+    # Invariant: _nextstep and _nextfire are int arrays of shape (size,)
+    #
+    # Attribute _pbolt: whether each game has a player bolt on screen
+    # Invariant: _pbolt is a bool array of shape (size,)
+    #
+    # Attribute _pboltx, _pbolty: the center of each player bolt
+    # Invariant: _pboltx and _pbolty are float arrays of shape (size,)
+    #
+    # Attribute _abolt: whether each alien bolt slot of each game is in use
+    # Invariant: _abolt is a bool array of shape (size, ALIEN_BOLTS)
+    #
+    # Attribute _aboltx, _abolty: the center of each alien bolt
+    # Invariant: _aboltx and _abolty are float arrays of shape (size, ALIEN_BOLTS)
+    #
+    # Attribute _observation: the observations returned by observe
+    # Invariant: _observation is a float32 array of shape (size, OBSERVATION_SIZE)
+    #
+    # Attribute _fields: the view of each field of _observation
+    # Invariant: _fields is a dict from the field names of OBSERVATION to arrays
+
+    # GETTERS
+    def getSize(self):
+        """
+        Returns the number of games in the batch.
+        """
+        return self._size
+
+    def getLives(self):
+        """
+        Returns the array of the lives left in each game (do not modify it).
+        """
+        return self._lives
+
+    def getAlive(self):
+        """
+        Returns the array of the alive aliens of each game (do not modify it).
+        """
+        return self._alive
+
+    def getShipX(self):
+        """
+        Returns the array of the ship x-coordinates (do not modify it).
+        """
+        return self._shipx
+
+    # INITIALIZER
+    def __init__(self, size, seed=None):
+        """
+        Initializes a batch of new games.
+
+        Parameter size: the number of games
+        Precondition: size is an int > 0
+
+        Parameter seed: the seed of the random numbers (None for a random seed)
+        Precondition: seed is None or an int >= 0
+        """
+        self._size = size
+        self._rng = np.random.default_rng(seed)
+        start = Formation()
+        self._basex = start.getX()[0].copy()
+        self._basey = start.getY()[:,0].copy()
+        rows, cols = start.getShape()
+        self._shipx = np.zeros(size)
+        self._lives = np.zeros(size, dtype=int)
+        self._alive = np.zeros((size, rows, cols), dtype=bool)
+        self._offx = np.zeros(size)
+        self._offy = np.zeros(size)
+        self._direction = np.ones(size, dtype=int)
+        self._clock = np.zeros(size, dtype=int)
+        self._nextstep = np.zeros(size, dtype=int)
+        self._nextfire = np.zeros(size, dtype=int)
+        self._pbolt = np.zeros(size, dtype=bool)
+        self._pboltx = np.zeros(size)
+        self._pbolty = np.zeros(size)
+        self._abolt = np.zeros((size, ALIEN_BOLTS), dtype=bool)
+        self._aboltx = np.zeros((size, ALIEN_BOLTS))
+        self._abolty = np.zeros((size, ALIEN_BOLTS))
+        self._observation = np.zeros((size, OBSERVATION_SIZE), dtype=np.float32)
+        record = self._observation.view(OBSERVATION).reshape(size)
+        self._fields = {name: record[name] for name in OBSERVATION.names}
+        self._restart(np.ones(size, dtype=bool))
+
+    # METHODS TO PLAY THE GAMES
+    def reset(self, games=None):
+        """
+        Starts new games, and returns the observations of all of the games.
+
+        Parameter games: the games to reset (None for all of them)
+        Precondition: games is None or a bool array of shape (size,)
+        """
+        if games is None:
+            games = np.ones(self._size, dtype=bool)
+        self._restart(games)
+        return self.observe()
+
+    def step(self, actions):
+        """
+        Advances every game by one update, and returns (observations, rewards, dones).
+
+        The rewards are KILL_REWARD for each alien killed and LIFE_REWARD for
+        each life lost during the update.  A game is done when its aliens are
+        all dead or it has no lives left; it is then reset, so its observation
+        is the start of the next game.
+
+        Parameter actions: the keys held down in each game
+        Precondition: actions is an array of shape (size, 3) whose columns are
+        ACTION_LEFT, ACTION_RIGHT and ACTION_FIRE (nonzero for held down)
+        """
+        actions = np.asarray(actions, dtype=bool)
+        assert actions.shape == (self._size, 3), repr(actions.shape)+' is not a valid action shape'
+        lives = self._lives.copy()
+        count = self._alive.sum(axis=(1,2))
+
+        self._move_ships(actions)
+        self._move_bolts(actions[:,ACTION_FIRE])
+        self._hit_aliens()
+        self._hit_ships()
+        self._clock += 1
+        self._march()
+        self._fire()
+
+        left = self._alive.sum(axis=(1,2))
+        rewards = KILL_REWARD*(count-left) + LIFE_REWARD*(lives-self._lives)
+        dones = (left == 0) | (self._lives <= 0)
+        if dones.any():
+            self._restart(dones)
+        return (self.observe(), rewards, dones)
+
+    def observe(self):
+        """
+        Returns the observations of the games, as a float array of shape (size, features).
+
+        The features of a game are the fields of OBSERVATION, in order: the
+        ship x, the lives, the formation offset (x and y) and direction, the
+        player bolt (a flag and its x and y), the ALIEN_BOLTS alien bolt slots
+        (a flag and x and y for each), and the alive flag of every alien
+        (bottom row first).  The x and y of a bolt are 0 when its flag is 0.
+
+        The result is the same array on every call (and the same as the
+        observations returned by reset and step), so copy it to keep it.
+        """
+        fields = self._fields
+        fields['ship'][:] = self._shipx
+        fields['lives'][:] = self._lives
+        fields['offset'][:,0] = self._offx
+        fields['offset'][:,1] = self._offy
+        fields['direction'][:] = self._direction
+        bolt = fields['bolt']
+        bolt[:,0] = self._pbolt
+        np.multiply(self._pboltx, self._pbolt, out=bolt[:,1])
+        np.multiply(self._pbolty, self._pbolt, out=bolt[:,2])
+        slots = fields['alien_bolts']
+        slots[:,:,0] = self._abolt
+        np.multiply(self._aboltx, self._abolt, out=slots[:,:,1])
+        np.multiply(self._abolty, self._abolt, out=slots[:,:,2])
+        fields['alive'][:] = self._alive
+        return self._observation
+
+    # HIDDEN METHODS
+    def _restart(self, games):
+        """
+        Starts new games, without observing them.
+
+        Parameter games: the games to reset
+        Precondition: games is a bool array of shape (size,)
+        """
+        n = int(games.sum())
+        self._shipx[games] = GAME_WIDTH//2
+        self._lives[games] = SHIP_LIVES
+        self._alive[games] = True
+        self._offx[games] = 0
+        self._offy[games] = 0
+        self._direction[games] = 1
+        self._clock[games] = 0
+        self._nextstep[games] = STEP_TICKS
+        self._nextfire[games] = STEP_TICKS*(self._fire_delay(n)+1)
+        self._pbolt[games] = False
+        self._abolt[games] = False
+
+    def _move_ships(self, actions):
+        """
+        Moves the ships left or right, wrapping around the screen.
+
+        Parameter actions: the actions of the games
+        Precondition: actions is a bool array of shape (size, 3)
+        """
+        da = SHIP_MOVEMENT*(actions[:,ACTION_RIGHT].astype(int) - actions[:,ACTION_LEFT])
+        x = self._shipx + da
+        x[x > GAME_WIDTH] = 0
+        x[x < 0] = GAME_WIDTH
+        self._shipx = x
+
+    def _move_bolts(self, fire):
+        """
+        Fires the player bolts, and moves and culls all of the bolts.
+
+        Parameter fire: whether each game is firing
+        Precondition: fire is a bool array of shape (size,)
+        """
+        shoot = fire & ~self._pbolt
+        self._pbolt |= shoot
+        self._pboltx[shoot] = self._shipx[shoot]
+        self._pbolty[shoot] = BOLT_HEIGHT//2 + SHIP_HEIGHT + SHIP_BOTTOM
+        self._pbolty += BOLT_SPEED
+        self._pbolt &= self._pbolty - BOLT_HEIGHT//2 <= GAME_HEIGHT
+        self._abolty -= BOLT_SPEED
+        self._abolt &= self._abolty + BOLT_HEIGHT//2 >= 0
+
+    def _hit_aliens(self):
+        """
+        Kills the first alien hit by each player bolt (bottom row first, then left to right).
+
+        A bolt is smaller than the space between aliens, so it can only overlap
+        the two rows and two columns found by the lattice lookup of Formation.hit.
+        """
+        games = np.flatnonzero(self._pbolt)
+        if len(games) == 0:
+            return
+        rows, cols = self._alive.shape[1:]
+        x = self._pboltx[games]
+        y = self._pbolty[games]
+        r0, r1 = _span(y - BOLT_HEIGHT/2.0, y + BOLT_HEIGHT/2.0, self._basey[0] + self._offy[games],
+                       ROW_PITCH, ALIEN_HEIGHT/2.0, rows)
+        c0, c1 = _span(x - BOLT_WIDTH/2.0, x + BOLT_WIDTH/2.0, self._basex[0] + self._offx[games],
+                       COLUMN_PITCH, ALIEN_WIDTH/2.0, cols)
+        hitrow = np.full(len(games), -1)
+        hitcol = np.full(len(games), -1)
+        for dr in (0, 1):
+            for dc in (0, 1):
+                r = r0 + dr
+                c = c0 + dc
+                ok = (hitrow < 0) & (r <= r1) & (c <= c1)
+                ok[ok] = self._alive[games[ok], r[ok], c[ok]]
+                hitrow[ok] = r[ok]
+                hitcol[ok] = c[ok]
+        hit = hitrow >= 0
+        self._alive[games[hit], hitrow[hit], hitcol[hit]] = False
+        self._pbolt[games[hit]] = False
+
+    def _hit_ships(self):
+        """
+        Removes the alien bolts that hit the ships, and takes away the lives.
+
+        A game also loses 3 lives on every update where its lowest alien is at
+        the defense line.
+        """
+        x = self._shipx[:,None]
+        hits = (self._abolt &
+                (self._aboltx - BOLT_WIDTH/2.0 < x + SHIP_WIDTH/2.0) &
+                (x - SHIP_WIDTH/2.0 < self._aboltx + BOLT_WIDTH/2.0) &
+                (self._abolty - BOLT_HEIGHT/2.0 < SHIP_BOTTOM + SHIP_HEIGHT) &
+                (SHIP_BOTTOM < self._abolty + BOLT_HEIGHT/2.0))
+        self._abolt &= ~hits
+        self._lives -= hits.sum(axis=1)
+        rowany = self._alive.any(axis=2)
+        some = rowany.any(axis=1)
+        lowest = self._basey[rowany.argmax(axis=1)] + self._offy
+        self._lives[some & (lowest <= LAND_LIMIT)] -= 3
+
+    def _march(self):
+        """
+        Takes an alien step in the games whose next step is due.
+
+        The rules are those of the march in Simulation (see trajectory.py).
+        """
+        due = (self._clock >= self._nextstep) & self._alive.any(axis=(1,2))
+        if not due.any():
+            return
+        self._nextstep[due] += STEP_TICKS
+        games = np.flatnonzero(due)
+        alive = self._alive[games]
+        colany = alive.any(axis=1)
+        rowany = alive.any(axis=2)
+        cols = colany.shape[1]
+        left = self._basex[colany.argmax(axis=1)] + self._offx[games]
+        right = self._basex[cols-1-colany[:,::-1].argmax(axis=1)] + self._offx[games]
+        lowest = self._basey[rowany.argmax(axis=1)] + self._offy[games]
+        d = self._direction[games]
+        moving = lowest > LAND_LIMIT
+        down = moving & (((d == 1) & (right >= RIGHT_LIMIT)) | ((d == -1) & (left <= LEFT_LIMIT)))
+        walk = moving & ~down
+        self._offy[games[down]] -= ALIEN_V_WALK
+        self._direction[games[down]] = -d[down]
+        self._offx[games[walk]] += ALIEN_H_WALK*d[walk]
+
+    def _fire(self):
+        """
+        Fires a bolt from a random bottom alien in the games whose next shot is due.
+        """
+        due = (self._clock >= self._nextfire) & self._alive.any(axis=(1,2))
+        if not due.any():
+            return
+        games = np.flatnonzero(due)
+        self._nextfire[games] += STEP_TICKS*(self._fire_delay(len(games))+1)
+        alive = self._alive[games]
+        colany = alive.any(axis=1)
+        col = self._fire_column(colany)
+        row = alive[np.arange(len(games)),:,col].argmax(axis=1)
+        slot = (~self._abolt[games]).argmax(axis=1)
+        free = ~self._abolt[games, slot]
+        games, slot, row, col = games[free], slot[free], row[free], col[free]
+        self._abolt[games, slot] = True
+        self._aboltx[games, slot] = self._basex[col] + self._offx[games]
+        self._abolty[games, slot] = self._basey[row] + self._offy[games]
+
+    def _fire_delay(self, n):
+        """
+        Returns an int array of n random numbers of alien steps in 1..BOLT_RATE.
+
+        Parameter n: the number of delays
+        Precondition: n is an int >= 0
+        """
+        return self._rng.integers(1, BOLT_RATE+1, size=n)
+
+    def _fire_column(self, colany):
+        """
+        Returns an int array with a random nonempty column for each row of colany.
+
+        Parameter colany: whether each column of each game has an alive alien
+        Precondition: colany is a bool array of shape (n, ALIENS_IN_ROW), with
+        at least one True in each row
+        """
+        counts = colany.sum(axis=1)
+        pick = (self._rng.random(len(counts))*counts).astype(int)
+        return (np.cumsum(colany, axis=1) > pick[:,None]).argmax(axis=1)
+
+
+# HELPER FUNCTIONS
+def _span(low, high, origin, pitch, half, size):
+    """
+    Returns the arrays (first, last) of the lattice cells overlapping each interval.
+
+    This is the vectorized version of the helper _cells in formation.py.  The
+    range is empty where first > last.
+
+    Parameter low, high: the ends of the intervals
+    Precondition: low and high are float arrays of the same shape, low <= high
+
+    Parameter origin: the center of cell 0 for each interval
+    Precondition: origin is a float array of the same shape as low
+
+    Parameter pitch: the distance between cell centers
+    Precondition: pitch is a number > 2*half
+
+    Parameter half: the radius of a cell
+    Precondition: half is a number > 0
+
+    Parameter size: the number of cells
+    Precondition: size is an int > 0
+    """
+    first = np.maximum(np.floor((low-origin-half)/pitch).astype(int)+1, 0)
+    last = np.minimum(np.ceil((high-origin+half)/pitch).astype(int)-1, size-1)
+    return (first, last)
@@ -0,0 +1,308 @@
+"""
+Laser bolt storage module for Alien Invaders
+
+This module contains the class BoltBuffer, which stores the laser bolts of a
+wave in parallel NumPy arrays instead of a list of objects.  All bolts are
+moved, culled off-screen and compacted in a single vectorized pass, and the
+number of bolts of each owner is maintained as bolts are fired and removed.
+
+Like simulation.py, this module does not depend on game2d.  The Bolt images
+are owned by Wave, which draws one image per bolt in the buffer.
+"""
+from consts import *
+import numpy as np
+
+# PRIMARY RULE: BoltBuffer can only access consts.py (and NumPy).
+
+# The initial number of bolts a buffer has room for (it grows as needed)
+BOLT_CAPACITY = 16
+
+
+class BoltBuffer(object):
+    """
+    A class representing the laser bolts on screen.
+
+    Each bolt is the rectangle of size BOLT_WIDTH x BOLT_HEIGHT centered at
+    (x,y).  The bolts are stored in the first count() entries of the arrays,
+    in the order they were fired.  A bolt with a positive velocity was fired
+    by the player; any other bolt was fired by an alien.
+
+    Bolts that hit something are marked with kill, and are removed from the
+    arrays by the next call to advance (or compact).
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _x: the horizontal coordinate of each bolt center
+    # Invariant: _x is a 1d float array whose length is the capacity
+    #
+    # Attribute _y: the vertical coordinate of each bolt center
+    # Invariant: _y is a 1d float array with the same length as _x
+    #
+    # Attribute _vel: the velocity in y direction of each bolt
+    # Invariant: _vel is a 1d float array with the same length as _x
+    #
+    # Attribute _owner: whether each bolt was fired by the player
+    # Invariant: _owner is a 1d bool array with the same length as _x, and
+    # _owner[i] is the same as _vel[i] > 0
+    #
+    # Attribute _alive: whether each bolt is still in play
+    # Invariant: _alive is a 1d bool array with the same length as _x
+    #
+    # Attribute _count: the number of bolts stored
+    # Invariant: _count is an int in 0..len(_x)
+    #
+    # Attribute _players: the number of alive player bolts
+    # Invariant: _players is an int >= 0
+    #
+    # Attribute _aliens: the number of alive alien bolts
+    # Invariant: _aliens is an int >= 0
+
+    # GETTERS
+    def getX(self):
+        """
+        Returns the array of bolt x-coordinates (a view; do not modify it).
+        """
+        return self._x[:self._count]
+
+    def getY(self):
+        """
+        Returns the array of bolt y-coordinates (a view; do not modify it).
+        """
+        return self._y[:self._count]
+
+    def getVelocity(self):
+        """
+        Returns the array of bolt velocities (a view; do not modify it).
+        """
+        return self._vel[:self._count]
+
+    def getOwner(self):
+        """
+        Returns the array of player-owner flags (a view; do not modify it).
+        """
+        return self._owner[:self._count]
+
+    def getAlive(self):
+        """
+        Returns the array of alive flags (a view; do not modify it).
+        """
+        return self._alive[:self._count]
+
+    # INITIALIZER
+    def __init__(self, capacity=BOLT_CAPACITY):
+        """
+        Initializes an empty buffer.
+
+        Parameter capacity: the initial number of bolts there is room for
+        Precondition: capacity is an int > 0
+        """
+        self._x = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self._vel = np.zeros(capacity)
+        self._owner = np.zeros(capacity, dtype=bool)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._count = 0
+        self._players = 0
+        self._aliens = 0
+
+    # METHODS TO QUERY THE BUFFER
+    def count(self):
+        """
+        Returns the number of bolts stored (including killed ones not yet removed).
+        """
+        return self._count
+
+    def players(self):
+        """
+        Returns the number of alive bolts fired by the player.
+        """
+        return self._players
+
+    def aliens(self):
+        """
+        Returns the number of alive bolts fired by the aliens.
+        """
+        return self._aliens
+
+    def swept(self, scale):
+        """
+        Returns the arrays (bottom, top) of the paths swept by the bolts.
+
+        The path of a bolt covers every position it would have had during the
+        last update if the update had been split into updates at UPDATE_RATE.
+        So a long update (scale > 1) finds the same hits as the equivalent
+        run of normal updates, and an update of scale 1 or less sweeps
+        nothing.  The left and right edges of a path are the same as those
+        of the bolt.
+
+        Parameter scale: the length of the last update (see advance)
+        Precondition: scale is an int or float >= 0
+        """
+        n = self._count
+        y = self._y[:n]
+        prev = y - self._vel[:n]*max(scale-1, 0)
+        return (np.minimum(y, prev) - BOLT_HEIGHT/2.0, np.maximum(y, prev) + BOLT_HEIGHT/2.0)
+
+    def overlapping(self, left, bottom, right, top, player, scale=0):
+        """
+        Returns the indices of the alive bolts whose paths overlap a box.
+
+        Boxes that only touch do not overlap.  For a bolt smaller than the box
+        and scale 0, this is the same as having a corner strictly inside the
+        box (the test used by GObject.contains).  This checks every bolt at once.
+
+        Parameter left, bottom, right, top: the edges of the box
+        Precondition: each edge is an int or float
+
+        Parameter player: whether to check the player bolts or the alien bolts
+        Precondition: player is a bool
+
+        Parameter scale: the length of the last update (0 for no sweep)
+        Precondition: scale is an int or float >= 0
+        """
+        n = self._count
+        bx = self._x[:n]
+        low, high = self.swept(scale)
+        owner = self._owner[:n] if player else ~self._owner[:n]
+        mask = (self._alive[:n] & owner &
+                (bx - BOLT_WIDTH/2.0 < right) & (left < bx + BOLT_WIDTH/2.0) &
+                (low < top) & (bottom < high))
+        return np.flatnonzero(mask).tolist()
+
+    # METHODS TO CHANGE THE BUFFER
+    def fire(self, x, y, vel):
+        """
+        Adds a bolt centered at (x,y) with velocity vel.
+
+        Parameter x: the horizontal coordinate of the bolt center
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the bolt center
+        Precondition: y is an int or float
+
+        Parameter vel: the velocity in y direction
+        Precondition: vel is an int or float, and not 0
+        """
+        if self._count == len(self._x):
+            self._grow()
+        i = self._count
+        self._x[i] = x
+        self._y[i] = y
+        self._vel[i] = vel
+        self._owner[i] = vel > 0
+        self._alive[i] = True
+        self._count = i+1
+        if vel > 0:
+            self._players += 1
+        else:
+            self._aliens += 1
+
+    def kill(self, i):
+        """
+        Marks bolt i as removed from play.
+
+        Parameter i: the bolt index
+        Precondition: i is an int in 0..count()-1 and bolt i is alive
+        """
+        self._alive[i] = False
+        if self._owner[i]:
+            self._players -= 1
+        else:
+            self._aliens -= 1
+
+    def advance(self, scale=1):
+        """
+        Moves every bolt by its velocity, and removes the bolts off screen.
+
+        A player bolt is off screen once its bottom is above the window, and an
+        alien bolt once its top is below the window.  Killed bolts are removed
+        as well.  This is a single vectorized pass over the buffer.
+
+        Parameter scale: the number of updates (at UPDATE_RATE) to move the bolts
+        Precondition: scale is an int or float >= 0
+        """
+        n = self._count
+        y = self._y[:n]
+        y += self._vel[:n] * scale
+        keep = self._alive[:n] & (y - BOLT_HEIGHT//2 <= GAME_HEIGHT) & (y + BOLT_HEIGHT//2 >= 0)
+        self._compact(keep)
+
+    def compact(self):
+        """
+        Removes the killed bolts from the arrays, keeping the order of the others.
+        """
+        self._compact(self._alive[:self._count].copy())
+
+    def clear(self):
+        """
+        Removes all bolts.
+        """
+        self._alive[:self._count] = False
+        self._count = 0
+        self._players = 0
+        self._aliens = 0
+
+    def restore(self, x, y, vel, alive):
+        """
+        Replaces the bolts with saved ones.
+
+        The arguments are the first count() entries of the getters of a buffer
+        (killed bolts included), in order.
+
+        Parameter x: the horizontal coordinate of each bolt center
+        Precondition: x is a 1d float array
+
+        Parameter y: the vertical coordinate of each bolt center
+        Precondition: y is a 1d float array with the same length as x
+
+        Parameter vel: the velocity in y direction of each bolt
+        Precondition: vel is a 1d float array with the same length as x
+
+        Parameter alive: whether each bolt is still in play
+        Precondition: alive is a 1d bool array with the same length as x
+        """
+        self.clear()
+        n = len(x)
+        while n > len(self._x):
+            self._grow()
+        self._x[:n] = x
+        self._y[:n] = y
+        self._vel[:n] = vel
+        self._owner[:n] = self._vel[:n] > 0
+        self._alive[:n] = alive
+        self._count = n
+        self._players = int(np.count_nonzero(self._alive[:n] & self._owner[:n]))
+        self._aliens = int(np.count_nonzero(self._alive[:n])) - self._players
+
+    # HIDDEN METHODS
+    def _compact(self, keep):
+        """
+        Keeps only the bolts with a True entry in keep, and updates the counts.
+
+        Parameter keep: the bolts to keep
+        Precondition: keep is a bool array of length count()
+        """
+        n = self._count
+        if keep.all():
+            return
+        culled = self._alive[:n] & ~keep
+        players = int(np.count_nonzero(culled & self._owner[:n]))
+        self._players -= players
+        self._aliens -= int(np.count_nonzero(culled)) - players
+        index = np.flatnonzero(keep)
+        m = len(index)
+        for array in (self._x, self._y, self._vel, self._owner):
+            array[:m] = array[:n][index]
+        self._alive[:m] = True
+        self._alive[m:n] = False
+        self._count = m
+
+    def _grow(self):
+        """
+        Doubles the capacity of the buffer.
+        """
+        size = 2*len(self._x)
+        for name in ('_x', '_y', '_vel', '_owner', '_alive'):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
@@ -16,6 +16,8 @@ import sys
 GAME_WIDTH  = 800
 #: the height of the game display
 GAME_HEIGHT = 700
+#: the number of updates per second that the per-update speeds below assume
+UPDATE_RATE = 60
 
 
 ### SHIP CONSTANTS ###
@@ -26,10 +28,12 @@ SHIP_WIDTH    = 44
 SHIP_HEIGHT   = 44
 # the distance of the (bottom of the) ship from the bottom of the screen
 SHIP_BOTTOM   = 32
-# The number of pixels to move the ship per update
+# The number of pixels to move the ship per update (at UPDATE_RATE)
 SHIP_MOVEMENT = 5
 # The number of lives a ship has
 SHIP_LIVES    = 3
+# the image file for the ship
+SHIP_IMAGE    = 'ship.png'
 
 # The y-coordinate of the defensive line the ship is protecting
 DEFENSE_LINE = 100
@@ -67,10 +71,12 @@ ALIEN_SPEED = 1.0
 BOLT_WIDTH  = 4
 # the height of a laser bolt
 BOLT_HEIGHT = 16
-# the number of pixels to move the bolt per update
+# the number of pixels to move the bolt per update (at UPDATE_RATE)
 BOLT_SPEED  = 10
 # the number of ALIEN STEPS (not frames) between bolts
 BOLT_RATE   = 5
+# whether bolts only hit the opaque pixels of the ship and aliens (not their boxes)
+PIXEL_COLLISIONS = False
 
 
 ### GAME CONSTANTS ###
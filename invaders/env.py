@@ -0,0 +1,312 @@
+"""
+Agent environment module for Alien Invaders
+
+This module contains the class InvadersEnv, which lets a program (such as a
+learning agent) play a wave of Alien Invaders through the usual reset/step
+interface.  It drives a Simulation directly, so it needs neither the
+Invaders application, a window, nor a keyboard, and it runs as fast as the
+simulation allows instead of in real time.
+
+Each call to step holds the keys of an action for a number of updates (the
+frame-skip) and only observes the state at the end.  The observation has
+the same layout as the observations of BatchEnv (see batch.py).
+
+An environment may also keep the pictures of its last few steps (a frame
+stack) for agents that learn from pixels.  Each picture is drawn straight
+into the next slot of a GFrameStack, and the stack is a view of those
+slots, so no picture is ever copied to build it.
+
+Like simulation.py, this module does not depend on the Kivy classes of game2d.
+"""
+from consts import *
+from simulation import *
+from batch import OBSERVATION_SIZE, KILL_REWARD, LIFE_REWARD
+from pixels import PixelView
+from features import FeatureTable
+from game2d.gframes import GFrameStack
+
+# PRIMARY RULE: InvadersEnv can only access consts.py, simulation.py,
+# pixels.py, features.py, batch.py (for its constants) and the headless
+# helpers of game2d.
+
+# The keys held down for each action
+ACTIONS = ((), ('left',), ('right',), ('spacebar',),
+           ('left', 'spacebar'), ('right', 'spacebar'))
+# The largest seed drawn for the next wave (see InvadersEnv.reset)
+SEED_LIMIT = 2**31-1
+
+
+class ActionInput(object):
+    """
+    A class representing the keyboard state of an action.
+
+    It has the same methods as GInput that the simulation uses, so it may be
+    given to Simulation.update in place of the keyboard.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _keys: the keys held down
+    # Invariant: _keys is a tuple of key names
+
+    @property
+    def key_count(self):
+        """
+        The number of keys currently held down.
+        """
+        return len(self._keys)
+
+    @property
+    def keys(self):
+        """
+        The list of keys that are currently held down.
+        """
+        return list(self._keys)
+
+    def __init__(self, keys=()):
+        """
+        Initializes the input with the given keys held down.
+
+        Parameter keys: the keys held down
+        Precondition: keys is a tuple of key names
+        """
+        self._keys = tuple(keys)
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down.
+
+        Parameter key: the key to check
+        Precondition: key is a string
+        """
+        return key in self._keys
+
+
+# The input for no keys held down
+RELEASED = ActionInput()
+
+
+class InvadersEnv(object):
+    """
+    A class representing a wave of Alien Invaders played by a program.
+
+    The actions are the indices of ACTIONS: 0 does nothing, 1 and 2 move left
+    and right, 3 fires, and 4 and 5 move while firing.  The reward of a step
+    is KILL_REWARD for each alien killed and LIFE_REWARD for each life lost.
+    The episode is done when the wave is won or the player has no lives left.
+
+    The frame-skip is the number of updates (at UPDATE_RATE) of each step.
+    The action repeat is the number of those updates that the keys of the
+    action are held down; for the rest, no keys are held.  A repeat of 1
+    presses fire once per step, for example, and a repeat equal to the
+    frame-skip holds the action for the whole step.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _frameskip: the number of updates per step
+    # Invariant: _frameskip is an int > 0
+    #
+    # Attribute _repeat: the number of updates per step the action is held
+    # Invariant: _repeat is an int in 1.._frameskip
+    #
+    # Attribute _pixel: whether the simulation uses collision masks
+    # Invariant: _pixel is a bool
+    #
+    # Attribute _inputs: the input of each action
+    # Invariant: _inputs is a tuple of ActionInput, one for each of ACTIONS
+    #
+    # Attribute _sim: the wave being played
+    # Invariant: _sim is a Simulation object, or None before the first reset
+    #
+    # Attribute _ticks: the number of updates since the last reset
+    # Invariant: _ticks is an int >= 0
+    #
+    # Attribute _view: the pixel view used by render and the frame stack
+    # Invariant: _view is a PixelView object, or None before the first render
+    # (it is made at once if there is a frame stack)
+    #
+    # Attribute _frames: the pictures of the last steps
+    # Invariant: _frames is a GFrameStack of pictures of _view, or None if
+    # the environment keeps no frame stack
+    #
+    # Attribute _features: the features of the current state
+    # Invariant: _features is a FeatureTable with one record
+    #
+    # Attribute _observation: the observation returned by observe
+    # Invariant: _observation is the float32 view of the observation of
+    # _features, of length OBSERVATION_SIZE
+
+    # GETTERS
+    def getSimulation(self):
+        """
+        Returns the Simulation of the current episode (None before the first reset).
+        """
+        return self._sim
+
+    def getTicks(self):
+        """
+        Returns the number of updates since the last reset.
+        """
+        return self._ticks
+
+    def getFeatures(self):
+        """
+        Returns the FeatureTable with the features of the current state (one record).
+
+        Every reset and step updates the table in place, so its views may be
+        kept and read after every step.
+        """
+        return self._features
+
+    def getFrames(self):
+        """
+        Returns the pictures of the last steps, oldest first (None without a frame stack).
+
+        The result is a view of the frame stack, an array of shape (stack,
+        height, width) with the pictures of render.  It is only correct until
+        the next reset or step, so copy it to keep it.  After a reset, every
+        picture in it is the first picture of the wave.
+        """
+        if self._frames is None or self._sim is None:
+            return None
+        return self._frames.frames
+
+    # INITIALIZER
+    def __init__(self, frameskip=4, repeat=None, pixel=False, stack=0):
+        """
+        Initializes the environment.  Call reset to start an episode.
+
+        Parameter frameskip: the number of updates per step
+        Precondition: frameskip is an int > 0
+
+        Parameter repeat: the number of updates per step the action is held
+        (None for the whole step)
+        Precondition: repeat is None or an int in 1..frameskip
+
+        Parameter pixel: whether bolts only hit opaque pixels
+        Precondition: pixel is a bool
+
+        Parameter stack: the number of pictures in the frame stack (0 for none)
+        Precondition: stack is an int >= 0
+        """
+        assert type(frameskip) == int and frameskip > 0, \
+            repr(frameskip)+' is not a valid frame-skip'
+        if repeat is None:
+            repeat = frameskip
+        assert type(repeat) == int and 1 <= repeat <= frameskip, \
+            repr(repeat)+' is not a valid repeat'
+        assert type(stack) == int and stack >= 0, repr(stack)+' is not a valid stack'
+        self._frameskip = frameskip
+        self._repeat = repeat
+        self._pixel = pixel
+        self._inputs = tuple(ActionInput(keys) for keys in ACTIONS)
+        self._sim = None
+        self._ticks = 0
+        self._view = None
+        self._frames = None
+        if stack:
+            self._view = PixelView()
+            self._frames = GFrameStack(stack, self._view.getRaster().buffer.shape)
+        self._features = FeatureTable()
+        self._observation = self._features.getObservations()[0]
+
+    # METHODS TO PLAY
+    def reset(self, seed=None):
+        """
+        Starts a new wave, and returns its first observation.
+
+        Every wave has its own random numbers.  If seed is None, the seed of
+        the new wave is drawn from the random numbers of the last one, so the
+        waves after a seeded reset are always the same.  The first wave is
+        random if it has no seed.
+
+        Parameter seed: the seed of the wave (None for the next seed)
+        Precondition: seed is None or an int >= 0
+        """
+        if seed is None and self._sim is not None:
+            seed = self._sim.getRandom().randint(0, SEED_LIMIT)
+        self._sim = Simulation(self._pixel, seed)
+        self._ticks = 0
+        if self._frames is not None:
+            self._draw()
+            self._frames.reset()
+        return self.observe()
+
+    def step(self, action):
+        """
+        Plays one step, and returns the tuple (observation, reward, done, info).
+
+        The observation is the array of observe, which every step reuses.
+        The info is a dict with the lives left, the aliens left and the number
+        of updates since the last reset.  The step stops early if the episode
+        ends during it.
+
+        Parameter action: the action to play
+        Precondition: action is an int in 0..len(ACTIONS)-1, and the episode
+        is not done
+        """
+        assert self._sim is not None, 'reset must be called before step'
+        sim = self._sim
+        lives = sim.getLives()
+        count = sim.getFormation().count()
+        held = self._inputs[action]
+        dt = 1.0/UPDATE_RATE
+        for frame in range(self._frameskip):
+            sim.update(held if frame < self._repeat else RELEASED, dt)
+            self._ticks += 1
+            if self.done():
+                break
+        killed = count - sim.getFormation().count()
+        lost = lives - sim.getLives()
+        reward = KILL_REWARD*killed + LIFE_REWARD*lost
+        info = {'lives': sim.getLives(), 'aliens': sim.getFormation().count(),
+                'ticks': self._ticks}
+        if self._frames is not None:
+            self._draw()
+            self._frames.push()
+        return (self.observe(), reward, self.done(), info)
+
+    def done(self):
+        """
+        Returns True if the current episode is over.
+        """
+        return self._sim.player_won() or self._sim.getLives() <= 0
+
+    def render(self):
+        """
+        Returns a picture of the current state, as a uint8 array of gray levels.
+
+        The picture is drawn by a PixelView at its default resolution, and it
+        is the same array on every call (copy it to keep it).  With a frame
+        stack, it is the newest picture of the stack, which is already drawn.
+        """
+        if self._frames is not None:
+            return self._frames.frames[-1]
+        if self._view is None:
+            self._view = PixelView()
+        return self._view.draw(self._sim)
+
+    def observe(self):
+        """
+        Returns the observation of the current state, a float array of OBSERVATION_SIZE.
+
+        The features are those of BatchEnv.observe (the fields of OBSERVATION
+        in batch.py): the ship x, the lives, the formation offset (x and y)
+        and direction, the player bolt (a flag and its x and y), ALIEN_BOLTS
+        alien bolt slots (a flag and x and y for each), and the alive flag of
+        every alien (bottom row first).  There are as many alien bolt slots
+        as alien bolts can be on screen at once (see ALIEN_BOLTS in
+        batch.py), so no bolt is left out.
+
+        The observation is the observation field of the FeatureTable of this
+        environment (see getFeatures), which this updates.  The result is the
+        same array on every call (and the same as the observation returned by
+        reset and step), so copy it to keep it.
+        """
+        self._features.update(self._sim)
+        return self._observation
+
+    # HIDDEN METHODS
+    def _draw(self):
+        """
+        Draws the current state straight into the next slot of the frame stack.
+        """
+        self._view.getRaster().bind(self._frames.slot)
+        self._view.draw(self._sim)
@@ -0,0 +1,295 @@
+"""
+Gameplay event module for Alien Invaders
+
+This module contains the events that happen during a wave (a bolt is fired,
+an alien is killed, the ship is hit) and the class EventBus that delivers
+them.  The simulation only records events while it updates.  Anything that
+reacts to them (sounds, the HUD, statistics) subscribes to the bus, and is
+called when the bus is drained after the update.  So the simulation loop
+never waits on an audio device, and a headless run simply has no audio
+subscriber.
+
+Like simulation.py, this module does not depend on game2d.
+"""
+from consts import *
+
+# PRIMARY RULE: Events can only access consts.py.
+
+
+class GameEvent(object):
+    """
+    The base class of the events recorded by a Simulation.
+
+    Subscribers may register for GameEvent to receive every event, or for
+    one of its subclasses to receive only that kind of event.
+    """
+    pass
+
+
+class BoltFired(GameEvent):
+    """
+    An event for a laser bolt fired by the player or by an alien.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _x: the horizontal coordinate of the new bolt
+    # Invariant: _x is an int or float
+    #
+    # Attribute _y: the vertical coordinate of the new bolt
+    # Invariant: _y is an int or float
+    #
+    # Attribute _player: whether the player fired the bolt
+    # Invariant: _player is a bool
+
+    # GETTERS
+    def getX(self):
+        """
+        Returns the horizontal coordinate of the new bolt.
+        """
+        return self._x
+
+    def getY(self):
+        """
+        Returns the vertical coordinate of the new bolt.
+        """
+        return self._y
+
+    def isPlayerBolt(self):
+        """
+        Returns True if the player fired the bolt.
+        """
+        return self._player
+
+    # INITIALIZER
+    def __init__(self, x, y, player):
+        """
+        Initializes the event.
+
+        Parameter x: the horizontal coordinate of the new bolt
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the new bolt
+        Precondition: y is an int or float
+
+        Parameter player: whether the player fired the bolt
+        Precondition: player is a bool
+        """
+        self._x = x
+        self._y = y
+        self._player = player
+
+
+class AlienKilled(GameEvent):
+    """
+    An event for an alien destroyed by a player bolt.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _row: the formation row of the alien (0 is the bottom row)
+    # Invariant: _row is an int >= 0
+    #
+    # Attribute _col: the formation column of the alien
+    # Invariant: _col is an int >= 0
+    #
+    # Attribute _remaining: the number of aliens still alive
+    # Invariant: _remaining is an int >= 0
+
+    # GETTERS
+    def getRow(self):
+        """
+        Returns the formation row of the alien (0 is the bottom row).
+        """
+        return self._row
+
+    def getCol(self):
+        """
+        Returns the formation column of the alien.
+        """
+        return self._col
+
+    def getRemaining(self):
+        """
+        Returns the number of aliens still alive after this one died.
+        """
+        return self._remaining
+
+    # INITIALIZER
+    def __init__(self, row, col, remaining):
+        """
+        Initializes the event.
+
+        Parameter row: the formation row of the alien
+        Precondition: row is an int >= 0
+
+        Parameter col: the formation column of the alien
+        Precondition: col is an int >= 0
+
+        Parameter remaining: the number of aliens still alive
+        Precondition: remaining is an int >= 0
+        """
+        self._row = row
+        self._col = col
+        self._remaining = remaining
+
+
+class ShipHit(GameEvent):
+    """
+    An event for the ship losing lives, to an alien bolt or to the aliens
+    reaching the defense line.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _lost: the number of lives lost
+    # Invariant: _lost is an int > 0
+    #
+    # Attribute _lives: the number of lives left
+    # Invariant: _lives is an int
+
+    # GETTERS
+    def getLost(self):
+        """
+        Returns the number of lives lost.
+        """
+        return self._lost
+
+    def getLives(self):
+        """
+        Returns the number of lives left after the hit.
+        """
+        return self._lives
+
+    # INITIALIZER
+    def __init__(self, lost, lives):
+        """
+        Initializes the event.
+
+        Parameter lost: the number of lives lost
+        Precondition: lost is an int > 0
+
+        Parameter lives: the number of lives left
+        Precondition: lives is an int
+        """
+        self._lost = lost
+        self._lives = lives
+
+
+class EventBus(object):
+    """
+    A class that buffers the events of an update and delivers them to subscribers.
+
+    Events are added with emit, which only appends to the buffer.  They are
+    delivered by drain, in the order they were emitted, to every subscriber
+    registered for their kind.  Subscribers are called in the order they
+    subscribed.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _pending: the events emitted but not yet drained
+    # Invariant: _pending is a list of GameEvent objects
+    #
+    # Attribute _subscribers: the registered handlers
+    # Invariant: _subscribers is a list of (kind, handler) pairs, where kind is
+    # a subclass of GameEvent and handler is a function taking one event
+
+    # INITIALIZER
+    def __init__(self):
+        """
+        Initializes a bus with no events and no subscribers.
+        """
+        self._pending = []
+        self._subscribers = []
+
+    # METHODS TO MANAGE SUBSCRIBERS
+    def subscribe(self, handler, kind=GameEvent):
+        """
+        Registers handler to be called with each drained event of the given kind.
+
+        Parameter handler: the function to call
+        Precondition: handler is a function taking one GameEvent
+
+        Parameter kind: the kind of event to receive (GameEvent for all)
+        Precondition: kind is GameEvent or a subclass of it
+        """
+        assert issubclass(kind, GameEvent), repr(kind)+' is not an event class'
+        self._subscribers.append((kind, handler))
+
+    def unsubscribe(self, handler):
+        """
+        Removes every registration of handler.
+
+        Parameter handler: the function to remove
+        Precondition: handler is a function
+        """
+        self._subscribers = [pair for pair in self._subscribers if pair[1] != handler]
+
+    # METHODS TO MANAGE EVENTS
+    def emit(self, event):
+        """
+        Adds event to the buffer (it is not delivered until drain).
+
+        Parameter event: the event to add
+        Precondition: event is a GameEvent
+        """
+        self._pending.append(event)
+
+    def pending(self):
+        """
+        Returns the list of events emitted but not yet drained.
+
+        The list is owned by the bus and should not be modified.
+        """
+        return self._pending
+
+    def drain(self):
+        """
+        Delivers the buffered events to the subscribers and empties the buffer.
+
+        The buffer is emptied before the subscribers are called, so a
+        subscriber may emit new events; they are delivered by the next drain.
+        """
+        events = self._pending
+        self._pending = []
+        for event in events:
+            for kind, handler in self._subscribers:
+                if isinstance(event, kind):
+                    handler(event)
+
+    def clear(self):
+        """
+        Discards the buffered events without delivering them.
+        """
+        self._pending = []
+
+
+class EventCounter(object):
+    """
+    A subscriber that counts the events of each kind, for telemetry.
+
+    Subscribe the method record to a bus, then read the totals with count.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _counts: the number of events seen of each class
+    # Invariant: _counts is a dict from GameEvent subclasses to ints > 0
+
+    # INITIALIZER
+    def __init__(self):
+        """
+        Initializes a counter with no events.
+        """
+        self._counts = {}
+
+    # METHODS
+    def record(self, event):
+        """
+        Counts event.
+
+        Parameter event: the event to count
+        Precondition: event is a GameEvent
+        """
+        kind = type(event)
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+
+    def count(self, kind=GameEvent):
+        """
+        Returns the number of events counted of the given kind (and its subclasses).
+
+        Parameter kind: the kind of event to count
+        Precondition: kind is GameEvent or a subclass of it
+        """
+        return sum(n for k, n in self._counts.items() if issubclass(k, kind))
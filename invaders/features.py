@@ -0,0 +1,280 @@
+"""
+Feature module for Alien Invaders
+
+This module contains the class FeatureTable, which keeps the state of one or
+more waves as a NumPy structured array: one record per game, with a field for
+each feature.  The array is made once, and update writes the current state of
+a Simulation into its record in place, so reading the state of a game every
+update makes no new table and no new observation.  (Update still makes a few
+small temporary arrays, to select the alive bolts.)  The getters return views
+of the fields, which always show the latest values.
+
+The record of a game starts with an observation, whose fields are those of
+OBSERVATION in batch.py, so the table holds exactly what BatchEnv and
+InvadersEnv observe (InvadersEnv reads its observations from a table):
+
+    ship:        the x-coordinate of the ship center
+    lives:       the lives left
+    offset:      how far (x, y) the formation has moved from its start
+    direction:   the direction the aliens are marching (1 or -1)
+    bolt:        the player bolt (a flag, and its x and y)
+    alien_bolts: the ALIEN_BOLTS alien bolt slots (a flag, x and y for each)
+    alive:       whether each alien is alive (1 or 0, ALIEN_ROWS x
+                 ALIENS_IN_ROW, bottom row first)
+
+The rest of the record holds features that an observation leaves out:
+
+    frontline: the y-coordinate of the bottom alive alien of each column
+               (0 for an empty column)
+    bolt_x, bolt_y, bolt_vel: the center and velocity of each bolt slot
+    bolt_valid: whether each bolt slot holds a bolt
+
+Every value is a float32, except bolt_valid.  Bolt slots that hold no bolt
+are all 0, so a program that ignores the flags never reads an old bolt.
+
+The bolt slots hold the alive bolts in the order they were fired.  There is
+room for BOLT_SLOTS of them, and the bolts after the first BOLT_SLOTS are
+left out of the record, with no other sign.  This never happens with the rules
+of Simulation: a wave has at most one player bolt on screen, and only a few
+alien bolts (see ALIEN_BOLTS in batch.py).
+
+Like simulation.py, this module does not depend on game2d.
+"""
+from consts import *
+from formation import Formation, ROW_PITCH
+from batch import ALIEN_BOLTS, OBSERVATION, OBSERVATION_SIZE
+import numpy as np
+
+# PRIMARY RULE: FeatureTable can only access consts.py, formation.py and
+# batch.py (for its constants).
+
+# The number of bolt slots in a record
+BOLT_SLOTS = 16
+# The type of a record (aligned, so that the float fields are too)
+FEATURES = np.dtype([('observation', OBSERVATION),
+                     ('frontline', np.float32, (ALIENS_IN_ROW,)),
+                     ('bolt_x', np.float32, (BOLT_SLOTS,)),
+                     ('bolt_y', np.float32, (BOLT_SLOTS,)),
+                     ('bolt_vel', np.float32, (BOLT_SLOTS,)),
+                     ('bolt_valid', np.bool_, (BOLT_SLOTS,))], align=True)
+
+
+class FeatureTable(object):
+    """
+    A class representing the features of a number of games.
+
+    Each getter returns a view of one field for all of the games, so its first
+    axis is the game.  The views are made once and stay valid, so a program
+    may keep them and read them after every update.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _table: the records of the games
+    # Invariant: _table is a 1d structured array of FEATURES
+    #
+    # Attribute _fields: the view of each field of _table
+    # Invariant: _fields is a dict from the field names of FEATURES (except
+    # observation) and of OBSERVATION to arrays
+    #
+    # Attribute _observations: the observations of _table, as rows of floats
+    # Invariant: _observations is a float32 view of shape (size, OBSERVATION_SIZE)
+    #
+    # Attribute _origin: the center of the bottom left alien at the start of a wave
+    # Invariant: _origin is a pair of floats
+    #
+    # Attribute _rows: scratch space for the bottom alive row of each column
+    # Invariant: _rows is an int array of length ALIENS_IN_ROW
+    #
+    # Attribute _empty: scratch space for the columns with no alien alive
+    # Invariant: _empty is a bool array of length ALIENS_IN_ROW
+
+    # GETTERS
+    def getSize(self):
+        """
+        Returns the number of games in the table.
+        """
+        return len(self._table)
+
+    def getTable(self):
+        """
+        Returns the structured array with the record of each game (do not modify it).
+        """
+        return self._table
+
+    def getObservations(self):
+        """
+        Returns the view of the observations, of shape (size, OBSERVATION_SIZE).
+
+        Each row is the observation field of a record as float32, with the
+        layout of BatchEnv.observe.
+        """
+        return self._observations
+
+    def getShipX(self):
+        """
+        Returns the view of the ship x-coordinates, of shape (size,).
+        """
+        return self._fields['ship']
+
+    def getLives(self):
+        """
+        Returns the view of the lives left, of shape (size,).
+        """
+        return self._fields['lives']
+
+    def getOffset(self):
+        """
+        Returns the view of the formation offsets, of shape (size, 2).
+        """
+        return self._fields['offset']
+
+    def getDirection(self):
+        """
+        Returns the view of the march directions, of shape (size,).
+        """
+        return self._fields['direction']
+
+    def getAlive(self):
+        """
+        Returns the view of the alive aliens, of shape (size, ALIEN_ROWS, ALIENS_IN_ROW).
+
+        An alive alien is 1, and a dead one 0.
+        """
+        return self._fields['alive']
+
+    def getBolt(self):
+        """
+        Returns the view of the player bolts (a flag, x and y), of shape (size, 3).
+        """
+        return self._fields['bolt']
+
+    def getAlienBolts(self):
+        """
+        Returns the view of the alien bolt slots, of shape (size, ALIEN_BOLTS, 3).
+
+        Each slot is a flag, and the x and y of the bolt.
+        """
+        return self._fields['alien_bolts']
+
+    def getFrontline(self):
+        """
+        Returns the view of the frontline heights, of shape (size, ALIENS_IN_ROW).
+        """
+        return self._fields['frontline']
+
+    def getBoltX(self):
+        """
+        Returns the view of the bolt x-coordinates, of shape (size, BOLT_SLOTS).
+        """
+        return self._fields['bolt_x']
+
+    def getBoltY(self):
+        """
+        Returns the view of the bolt y-coordinates, of shape (size, BOLT_SLOTS).
+        """
+        return self._fields['bolt_y']
+
+    def getBoltVelocity(self):
+        """
+        Returns the view of the bolt velocities, of shape (size, BOLT_SLOTS).
+
+        A slot with a positive velocity holds a player bolt.
+        """
+        return self._fields['bolt_vel']
+
+    def getBoltValid(self):
+        """
+        Returns the view of the used bolt slots, of shape (size, BOLT_SLOTS).
+        """
+        return self._fields['bolt_valid']
+
+    # INITIALIZER
+    def __init__(self, size=1, buffer=None):
+        """
+        Initializes a table of empty records.
+
+        The records may live in memory owned by someone else (such as a
+        SharedMemory block, so that worker processes write the features that
+        the parent reads).
+
+        Parameter size: the number of games
+        Precondition: size is an int > 0
+
+        Parameter buffer: the memory of the records (None for new memory)
+        Precondition: buffer is None or a writable buffer of at least
+        size*FEATURES.itemsize bytes
+        """
+        assert type(size) == int and size > 0, repr(size)+' is not a valid size'
+        if buffer is None:
+            self._table = np.zeros(size, dtype=FEATURES)
+        else:
+            self._table = np.ndarray(size, dtype=FEATURES, buffer=buffer)
+            self._table[:] = np.zeros(1, dtype=FEATURES)
+        self._fields = {name: self._table[name] for name in FEATURES.names[1:]}
+        observation = self._table['observation']
+        for name in OBSERVATION.names:
+            self._fields[name] = observation[name]
+        self._observations = np.ndarray((size, OBSERVATION_SIZE), np.float32,
+            self._table, FEATURES.fields['observation'][1], (FEATURES.itemsize, 4))
+        start = Formation()
+        self._origin = (float(start.getX()[0,0]), float(start.getY()[0,0]))
+        self._rows = np.zeros(ALIENS_IN_ROW, dtype=np.intp)
+        self._empty = np.zeros(ALIENS_IN_ROW, dtype=bool)
+
+    # METHODS TO UPDATE THE FEATURES
+    def update(self, sim, game=0):
+        """
+        Writes the current state of a wave into the record of a game.
+
+        The frontline is read from the formation, which keeps it as aliens
+        die.  Only the first BOLT_SLOTS alive bolts are written; any others
+        are dropped without notice (see the module docstring).
+
+        Parameter sim: the wave
+        Precondition: sim is a Simulation object
+
+        Parameter game: the game of the record
+        Precondition: game is an int in 0..size-1
+        """
+        fields = self._fields
+        formation = sim.getFormation()
+        fields['ship'][game] = sim.getShipX()
+        fields['lives'][game] = sim.getLives()
+        x = formation.getX()[0,0]
+        y = formation.getY()[0,0]
+        fields['offset'][game] = (x - self._origin[0], y - self._origin[1])
+        fields['direction'][game] = sim.getDirection()
+        fields['alive'][game] = formation.getAlive()
+        rows = self._rows
+        rows[:] = formation.bottoms()
+        front = fields['frontline'][game]
+        np.multiply(rows, ROW_PITCH, out=front, casting='unsafe')
+        front += y
+        np.less(rows, 0, out=self._empty)
+        np.copyto(front, 0, where=self._empty)
+
+        bolts = sim.getBolts()
+        alive = bolts.getAlive()
+        owner = bolts.getOwner()
+        xs = bolts.getX()
+        ys = bolts.getY()
+        bolt = fields['bolt'][game]
+        bolt[:] = 0
+        player = np.flatnonzero(alive & owner)
+        if len(player):
+            bolt[:] = (1, xs[player[0]], ys[player[0]])
+        aliens = np.flatnonzero(alive & ~owner)[:ALIEN_BOLTS]
+        slots = fields['alien_bolts'][game]
+        slots[:] = 0
+        slots[:len(aliens),0] = 1
+        slots[:len(aliens),1] = xs[aliens]
+        slots[:len(aliens),2] = ys[aliens]
+
+        chosen = np.flatnonzero(alive)[:BOLT_SLOTS]
+        n = len(chosen)
+        velocities = bolts.getVelocity()
+        for name, values in (('bolt_x', xs), ('bolt_y', ys), ('bolt_vel', velocities)):
+            field = fields[name][game]
+            field[:n] = values[chosen]
+            field[n:] = 0
+        fields['bolt_valid'][game,:n] = True
+        fields['bolt_valid'][game,n:] = False
@@ -0,0 +1,366 @@
+"""
+Alien formation module for Alien Invaders
+
+This module contains the class Formation, which stores the marching aliens of
+a wave as NumPy arrays rather than a 2d list of objects.  The aliens always
+move together, so a march step is a single array operation no matter how
+many rows and columns there are.
+
+Because the aliens sit on a regular lattice, a point can be mapped directly
+to the lattice cell that might contain it.  Bolt hits are found this way, so
+their cost does not depend on the size of the formation.
+
+The formation also keeps an index of its alive aliens (count, extents and
+the bottom alien of each column).  The index is updated only when an alien
+dies, so the queries made every frame never scan the table.
+
+Like simulation.py, this module does not depend on game2d.  The alien images
+are owned by Wave, which copies the positions from the formation only when
+they have changed since the last draw (see getVersion).
+"""
+from consts import *
+import numpy as np
+import math
+
+# PRIMARY RULE: Formation can only access consts.py (and NumPy).
+
+# The horizontal distance between the centers of adjacent columns
+COLUMN_PITCH = ALIEN_WIDTH + ALIEN_H_SEP
+# The vertical distance between the centers of adjacent rows (see Formation)
+ROW_PITCH = ALIEN_HEIGHT//2 + ALIEN_HEIGHT + ALIEN_V_SEP
+
+
+class Formation(object):
+    """
+    A class representing the table of aliens in a wave.
+
+    The table is built from bottom to top, so row 0 is the bottom row.  The
+    arrays are all of shape (ALIEN_ROWS, ALIENS_IN_ROW).  A destroyed alien
+    keeps its position (it still moves with the formation), but its entry in
+    the alive array is False.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _x: the horizontal coordinate of each alien center
+    # Invariant: _x is a 2d float array of shape (ALIEN_ROWS, ALIENS_IN_ROW)
+    #
+    # Attribute _y: the vertical coordinate of each alien center
+    # Invariant: _y is a 2d float array of shape (ALIEN_ROWS, ALIENS_IN_ROW)
+    #
+    # Attribute _alive: whether each alien is still alive
+    # Invariant: _alive is a 2d bool array of shape (ALIEN_ROWS, ALIENS_IN_ROW)
+    #
+    # Attribute _type: the index into ALIEN_IMAGES of each alien
+    # Invariant: _type is a 2d int array of shape (ALIEN_ROWS, ALIENS_IN_ROW)
+    #
+    # Attribute _version: a counter that changes whenever an alien moves or dies
+    # Invariant: _version is an int >= 0
+    #
+    # Attribute _count: the number of aliens still alive
+    # Invariant: _count is the number of True entries in _alive
+    #
+    # Attribute _colcount: the number of alive aliens in each column
+    # Invariant: _colcount is a list of ALIENS_IN_ROW ints >= 0
+    #
+    # Attribute _rowcount: the number of alive aliens in each row
+    # Invariant: _rowcount is a list of ALIEN_ROWS ints >= 0
+    #
+    # Attribute _front: the row of the bottom alive alien in each column
+    # Invariant: _front is a list of ALIENS_IN_ROW ints, -1 for an empty column
+    #
+    # Attribute _left: the leftmost column with an alive alien
+    # Invariant: _left is an int, the index of the first nonzero _colcount
+    # (or cols if _count is 0)
+    #
+    # Attribute _right: the rightmost column with an alive alien
+    # Invariant: _right is an int, the index of the last nonzero _colcount
+    # (or -1 if _count is 0)
+    #
+    # Attribute _bottom: the bottom row with an alive alien
+    # Invariant: _bottom is an int, the index of the first nonzero _rowcount
+    # (or rows if _count is 0)
+
+    # GETTERS
+    def getX(self):
+        """
+        Returns the array of alien x-coordinates (do not modify it).
+        """
+        return self._x
+
+    def getY(self):
+        """
+        Returns the array of alien y-coordinates (do not modify it).
+        """
+        return self._y
+
+    def getAlive(self):
+        """
+        Returns the array of alive flags (do not modify it).
+        """
+        return self._alive
+
+    def getTypes(self):
+        """
+        Returns the array of ALIEN_IMAGES indices (do not modify it).
+        """
+        return self._type
+
+    def getVersion(self):
+        """
+        Returns a counter that changes whenever an alien moves or dies.
+
+        A view can compare this against the value it saw on the last draw to
+        decide whether its images need to be moved.
+        """
+        return self._version
+
+    def getShape(self):
+        """
+        Returns the pair (rows, columns) of the formation.
+        """
+        return self._alive.shape
+
+    # INITIALIZER
+    def __init__(self, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW):
+        """
+        Initializes a full table of aliens according to the given constants.
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens per row
+        Precondition: cols is an int > 0
+        """
+        bottom = GAME_HEIGHT - ALIEN_CEILING - (rows * (ALIEN_V_SEP + ALIEN_HEIGHT))
+        xs = ALIEN_H_SEP + ALIEN_WIDTH//2 + np.arange(cols) * COLUMN_PITCH
+        ys = bottom + ALIEN_HEIGHT//2 + np.arange(rows) * ROW_PITCH
+        self._x = np.tile(xs.astype(float), (rows,1))
+        self._y = np.repeat(ys.astype(float)[:,None], cols, axis=1)
+        self._alive = np.ones((rows,cols), dtype=bool)
+        # Alien types change every two rows: 0,0,1,1,2,2,0,0,...
+        rowtype = (np.arange(rows) // 2) % len(ALIEN_IMAGES)
+        self._type = np.repeat(rowtype[:,None], cols, axis=1)
+        self._version = 0
+        self._count = rows*cols
+        self._colcount = [rows]*cols
+        self._rowcount = [cols]*rows
+        self._front = [0]*cols
+        self._left = 0
+        self._right = cols-1
+        self._bottom = 0
+
+    def restore(self, x, y, alive):
+        """
+        Puts the formation back in a saved state.
+
+        The state is the position of the bottom left alien and the alive flags,
+        since the rest of the lattice follows from them.  The arrays are
+        updated in place, and the index is rebuilt from the alive flags.
+
+        Parameter x: the horizontal coordinate of the alien at row 0, column 0
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the alien at row 0, column 0
+        Precondition: y is an int or float
+
+        Parameter alive: whether each alien is alive
+        Precondition: alive is a 2d bool array with the shape of the formation
+        """
+        self.move(x - self._x[0,0], y - self._y[0,0])
+        self._alive[:] = alive
+        rows, cols = self._alive.shape
+        self._count = int(np.count_nonzero(self._alive))
+        self._colcount = self._alive.sum(axis=0).tolist()
+        self._rowcount = self._alive.sum(axis=1).tolist()
+        front = self._alive.argmax(axis=0)
+        self._front = np.where(self._alive.any(axis=0), front, -1).tolist()
+        filled = [col for col in range(cols) if self._colcount[col]]
+        self._left = filled[0] if filled else cols
+        self._right = filled[-1] if filled else -1
+        filled = [row for row in range(rows) if self._rowcount[row]]
+        self._bottom = filled[0] if filled else rows
+
+    # METHODS TO MOVE THE FORMATION
+    def move(self, dx, dy):
+        """
+        Moves every alien in the formation by (dx,dy).
+
+        Parameter dx: the horizontal displacement
+        Precondition: dx is an int or float
+
+        Parameter dy: the vertical displacement
+        Precondition: dy is an int or float
+        """
+        if dx:
+            self._x += dx
+        if dy:
+            self._y += dy
+        self._version += 1
+
+    def kill(self, row, col):
+        """
+        Destroys the alien at the given row and column.
+
+        Parameter row: the alien row (0 is the bottom row)
+        Precondition: row is a valid row index and the alien is alive
+
+        Parameter col: the alien column
+        Precondition: col is a valid column index
+        """
+        self._alive[row,col] = False
+        self._version += 1
+        self._count -= 1
+        self._colcount[col] -= 1
+        self._rowcount[row] -= 1
+        rows, cols = self._alive.shape
+        if self._front[col] == row:
+            front = row+1
+            while front < rows and not self._alive[front,col]:
+                front += 1
+            self._front[col] = front if front < rows else -1
+        while self._left < cols and self._colcount[self._left] == 0:
+            self._left += 1
+        while self._right >= 0 and self._colcount[self._right] == 0:
+            self._right -= 1
+        while self._bottom < rows and self._rowcount[self._bottom] == 0:
+            self._bottom += 1
+
+    # METHODS TO QUERY THE FORMATION
+    def count(self):
+        """
+        Returns the number of aliens still alive.
+        """
+        return self._count
+
+    def right(self):
+        """
+        Returns the x-value of the rightmost alive alien (0 if there is none).
+        """
+        if self._count == 0:
+            return 0
+        return float(self._x[0,self._right])
+
+    def left(self):
+        """
+        Returns the x-value of the leftmost alive alien (GAME_WIDTH-1 if there is none).
+        """
+        if self._count == 0:
+            return GAME_WIDTH-1
+        return float(self._x[0,self._left])
+
+    def lowest(self):
+        """
+        Returns the y-value of the lowest alive alien (GAME_HEIGHT if there is none).
+        """
+        if self._count == 0:
+            return GAME_HEIGHT
+        return float(self._y[self._bottom,0])
+
+    def bounds(self):
+        """
+        Returns the triple (left, right, bottom) of the extreme alive columns and row.
+
+        This is (cols, -1, rows) if there are no aliens alive.  It only changes
+        when a kill clears a column or row at an edge of the formation.
+        """
+        return (self._left, self._right, self._bottom)
+
+    def columns(self):
+        """
+        Returns the list of the number of alive aliens in each column.
+
+        The list is owned by the formation and should not be modified.
+        """
+        return self._colcount
+
+    def bottom(self, col):
+        """
+        Returns the row of the bottom alive alien in column col (-1 if there is none).
+
+        Parameter col: the alien column
+        Precondition: col is a valid column index
+        """
+        return self._front[col]
+
+    def bottoms(self):
+        """
+        Returns the list of the row of the bottom alive alien in each column.
+
+        The row of an empty column is -1.  The list is kept up to date as
+        aliens die, and is owned by the formation and should not be modified.
+        """
+        return self._front
+
+    def frontline(self):
+        """
+        Returns the list of (row, col) pairs of the bottom alive alien in each column.
+
+        Columns with no alive aliens are skipped.
+        """
+        return [(row, col) for col, row in enumerate(self._front) if row >= 0]
+
+    def hit(self, left, right, bottom, top, accept=None):
+        """
+        Returns the (row, col) of the first alive alien overlapping a box.
+
+        The box is given by its edges, and boxes that only touch do not
+        overlap.  For a box smaller than an alien (such as a bolt), this is
+        the same as having a corner strictly inside the alien.  The box may
+        also be the path swept by a bolt during an update, which is how fast
+        bolts are kept from passing through an alien.  Aliens are checked
+        from the bottom row up, and left to right.  If no alien is hit, this
+        method returns None.
+
+        The edges are mapped to the range of lattice rows and columns they
+        cover, so a bolt tests at most four cells (more only if its path is
+        longer than a row), whatever the size of the formation.
+
+        If accept is given, it is a finer test (such as a collision mask) for
+        the aliens whose boxes overlap, and aliens that fail it are skipped.
+
+        Parameter left, right, bottom, top: the edges of the box
+        Precondition: each edge is an int or float
+
+        Parameter accept: the finer test, or None to accept every overlap
+        Precondition: accept is None or a function taking (row, col) and
+        returning a bool
+        """
+        if self._count == 0:
+            return None
+        rows = _cells(bottom, top, float(self._y[0,0]), ROW_PITCH,
+                      ALIEN_HEIGHT/2.0, self._alive.shape[0])
+        if not rows:
+            return None
+        cols = _cells(left, right, float(self._x[0,0]), COLUMN_PITCH,
+                      ALIEN_WIDTH/2.0, self._alive.shape[1])
+        for row in rows:
+            for col in cols:
+                if self._alive[row,col] and (accept is None or accept(row, col)):
+                    return (row, col)
+        return None
+
+
+# HELPER FUNCTIONS
+def _cells(low, high, origin, pitch, half, size):
+    """
+    Returns the range of lattice indices whose cells overlap the interval (low, high).
+
+    Cell i is the open interval of radius half around origin + i*pitch.
+
+    Parameter low, high: the ends of the interval
+    Precondition: low and high are numbers with low <= high
+
+    Parameter origin: the center of cell 0
+    Precondition: origin is a number
+
+    Parameter pitch: the distance between cell centers
+    Precondition: pitch is a number > 2*half
+
+    Parameter half: the radius of a cell
+    Precondition: half is a number > 0
+
+    Parameter size: the number of cells
+    Precondition: size is an int > 0
+    """
+    first = max(math.floor((low-origin-half)/pitch)+1, 0)
+    last  = min(math.ceil((high-origin+half)/pitch)-1, size-1)
+    return range(first, last+1)
@@ -4,13 +4,68 @@ A module to support simple 2D game development.
 This module is a simple wrapper around Kivy interfaces to make 2D game development
 simpler for students in CS 1110.
 
+The helper modules that do not draw anything (such as :mod:`gspatial`, :mod:`gmask`
+and :mod:`gtimer`) are pure Python.  The classes that draw are only imported from
+Kivy when they are first used, so importing a helper never loads Kivy (even when it
+is installed), which allows game logic to run headless.
+
 Author: Walker M. White (wmw2)
 Date:   August 1, 2017 (Python 3 version)
 """
-from .gobject import GObject, GScene
-from .grectangle import GRectangle, GEllipse, GImage, GLabel
-from .gsprite import GSprite
-from .gpath import GPath, GTriangle, GPolygon
-from .gview import GInput, GView
-from .sound import Sound, SoundLibrary
-from .app import GameApp
\ No newline at end of file
+import importlib
+import importlib.util
+
+from .gspatial import GSpatialHash
+from .gmask import GMask
+from .gtimer import GTimer, GTimerWheel
+
+try:
+    from .grandom import GRandom
+    from .graster import GRaster, GTexture
+    from .gframes import GFrameStack
+except ImportError as e:
+    # The random number, raster and frame support need NumPy
+    if e.name != 'numpy':
+        raise
+
+# The classes that need Kivy, and the module of each one.  They are imported the
+# first time they are used (see __getattr__), so that importing a headless helper
+# (such as game2d.gspatial) does not load Kivy, even when Kivy is installed.
+_KIVY_CLASSES = {
+    'GObject': 'gobject', 'GScene': 'gobject',
+    'GRectangle': 'grectangle', 'GEllipse': 'grectangle', 'GImage': 'grectangle', 'GLabel': 'grectangle',
+    'GSprite': 'gsprite',
+    'GPath': 'gpath', 'GTriangle': 'gpath', 'GPolygon': 'gpath',
+    'GInput': 'gview', 'GView': 'gview',
+    'Sound': 'sound', 'SoundLibrary': 'sound',
+    'GameApp': 'app',
+}
+
+# The names of "from game2d import *" (the Kivy classes only if Kivy is installed)
+__all__ = [name for name in globals() if name[0].isupper()]
+if importlib.util.find_spec('kivy') is not None:
+    __all__ += list(_KIVY_CLASSES)
+
+
+def __getattr__(name):
+    """
+    :return: The Kivy class ``name``, importing its module the first time.
+
+    This is only called for names that are not yet attributes of the package.
+
+    :param name: The name of the class
+    :type name:  ``str``
+    """
+    if name not in _KIVY_CLASSES:
+        raise AttributeError('module %s has no attribute %s' % (repr(__name__),repr(name)))
+    module = importlib.import_module('.'+_KIVY_CLASSES[name],__name__)
+    value = getattr(module,name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    :return: The names of the package, including the Kivy classes not imported yet.
+    """
+    return sorted(set(globals()) | set(__all__))
@@ -16,6 +16,7 @@ from kivy.config import Config
 from kivy.clock  import Clock
 
 import os.path
+from . import gmask
 
 class GameApp(kivy.app.App):
     """
@@ -35,9 +36,19 @@ class GameApp(kivy.app.App):
     
     :meth:`draw`: This method draws all of the objects to the screen.  The only 
     thing you should have in this method are calls to ``self.view.draw()``.
+    
+    The game is updated with a fixed timestep.  Every animation frame, the time since
+    the last frame is added to an accumulator, and :meth:`update` is called once for
+    every ``1/tickrate`` seconds in the accumulator (but at most ``maxsteps`` times).
+    Hence ``dt`` is always the same, and the game runs at the same speed no matter 
+    the frame rate.  The time left over in the accumulator is available as the 
+    attribute ``interpolation``, which :meth:`draw` can use to draw objects part of
+    the way to their next position.
     """
     # Class attribute for tracking textures (to reduce memory footprint)
     TEXTURE_CACHE = {}
+    # Class attribute for tracking collision masks (shared with the gmask module)
+    MASK_CACHE = gmask.MASK_CACHE
     
     
     # MUTABLE ATTRIBUTES
@@ -62,6 +73,45 @@ class GameApp(kivy.app.App):
         self._fps = value
         Clock.schedule_interval(self._refresh,1.0/self._fps)
     
+    @property
+    def tickrate(self):
+        """
+        The number of times per second to call :meth:`update`
+        
+        By default this is the same as the ``fps`` the game was created with.  A 
+        lower value is cheaper on slow machines.  The game speed does not change, 
+        provided that :meth:`update` moves objects in proportion to ``dt``.
+        
+        **Invariant**: Must be an int or float > 0.
+        """
+        return self._tickrate
+    
+    @tickrate.setter
+    def tickrate(self,value):
+        assert type(value) in [int,float], 'value %s is not a number' % repr(value)
+        assert value > 0, 'value %s is not positive' % repr(value)
+        self._tickrate = value
+    
+    @property
+    def maxsteps(self):
+        """
+        The maximum number of times to call :meth:`update` in one animation frame
+        
+        If a frame is late, the game catches up by calling :meth:`update` several 
+        times.  If it is so late that this would take more than ``maxsteps`` calls,
+        the rest of the time is dropped (and the game slows down) rather than making
+        the next frame even later.  By default this value is 5.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return self._maxsteps
+    
+    @maxsteps.setter
+    def maxsteps(self,value):
+        assert type(value) == int, 'value %s is not an int' % repr(value)
+        assert value > 0, 'value %s is not positive' % repr(value)
+        self._maxsteps = value
+    
     
     # IMMUTABLE PROPERTIES
     @property
@@ -82,6 +132,19 @@ class GameApp(kivy.app.App):
         """
         return self._gheight
     
+    @property
+    def interpolation(self):
+        """
+        The fraction of a timestep since the last call to :meth:`update`
+        
+        Use this value in :meth:`draw` to place moving objects between their last 
+        position and their next one.  This makes motion look smooth even when the 
+        ``tickrate`` is much lower than the frame rate.
+        
+        **Invariant**: Must be a float in the range 0..1.
+        """
+        return self._interpolation
+    
     @property
     def view(self):
         """
@@ -188,6 +251,21 @@ class GameApp(kivy.app.App):
         
         return texture
     
+    @classmethod
+    def load_mask(cls,name):
+        """
+        Returns: The collision mask for the given file name
+        
+        The ``name`` must refer to the file in the **Images** folder.  If the mask
+        has already been loaded, it will return the cached mask.  Otherwise, it will
+        read the image file, build the mask and cache it before returning it.
+        
+        :param name: The file name
+        :type name:  ``str``
+        """
+        assert cls.is_image(name), '%s is not an image file' % repr(name)
+        return gmask.load_mask(name,cls.images)
+    
     @classmethod
     def unload_texture(cls,name):
         """
@@ -232,15 +310,21 @@ class GameApp(kivy.app.App):
         w = keywords.pop('width', 0.0)
         h = keywords.pop('height', 0.0)
         f = keywords.pop('fps', 60.0)
+        t = keywords.pop('tickrate', f)
+        m = keywords.pop('maxsteps', 5)
 
         assert type(w) in [int,float], 'width %s is not a number' % repr(w)
         assert type(h) in [int,float], 'height %s is not a number' % repr(h)
         assert type(f) in [int,float], 'fps %s is not a number' % repr(f)
-        assert f > 0, 'fps %s is not positive' % repr(value)
+        assert f > 0, 'fps %s is not positive' % repr(f)
 
         self._gwidth = w
         self._gheight = h
         self._fps = f
+        self.tickrate = t
+        self.maxsteps = m
+        self._accumulator = 0.0
+        self._interpolation = 0.0
         
         Config.set('graphics', 'width', str(self.width))
         Config.set('graphics', 'height', str(self.height))
@@ -302,9 +386,10 @@ class GameApp(kivy.app.App):
         """
         Updates the state of the game one animation frame.
         
-        This method is called 60x a second (depending on the ``fps``) to provide on-screen 
-        animation. Any code that moves objects or processes user input (keyboard or mouse)
-        goes in this method.
+        This method is called 60x a second (depending on the ``tickrate``) to provide 
+        on-screen animation. Any code that moves objects or processes user input 
+        (keyboard or mouse) goes in this method.  The value ``dt`` is always 
+        ``1/tickrate``, so objects should move in proportion to it.
         
         Think of this method as the body of the loop.  You will need to add attributes
         that represent the current animation state, so that they can persist across
@@ -345,12 +430,24 @@ class GameApp(kivy.app.App):
         
         This method a callback-proxy for the methods `update` and `draw`.  It handles
         important issues behind the scenes, particularly with clearing the window.
+        It also runs the fixed timestep, calling `update` as many times as the 
+        accumulated time requires (up to `maxsteps`).
         
         :param dt: time in seconds since last update
         :type dt:  ``int`` or ``float``
         """
+        step = 1.0/self.tickrate
+        self._accumulator += dt
+        steps = 0
+        while self._accumulator >= step and steps < self.maxsteps:
+            self.update(step)
+            self._accumulator -= step
+            steps += 1
+        if self._accumulator >= step:
+            # Too far behind; drop the backlog instead of spiraling
+            self._accumulator = self._accumulator % step
+        self._interpolation = self._accumulator/step
         self.view.clear()
-        self.update(dt)
         self.draw()
     
     def _setpaths(self):
@@ -0,0 +1,151 @@
+"""
+Frame history support for 2D games.
+
+This module provides a stack of the last few frames of a game (such as the pictures
+of a :class:`GRaster`), which is what an agent usually observes: one frame does not
+show which way things are moving.  The obvious way to keep the stack is to shift the
+frames by one and copy the new frame in at the end, but that copies every frame of
+the stack on every step.
+
+A :class:`GFrameStack` keeps the frames in one long array instead, and each new frame
+is written into the next free slot of that array.  The last frames are then always
+next to each other, so the stack is a slice of the array: a view, not a copy.  Only
+when the array is full are the newest frames moved back to its start, which costs a
+copy of the stack once every ``length`` frames.
+
+This module requires NumPy, but it is pure Python and does not require Kivy.
+"""
+import numpy as np
+
+
+class GFrameStack(object):
+    """
+    A class representing the last ``depth`` frames of a game.
+
+    To add a frame, write it into :attr:`slot` (or have a raster draw straight into
+    it, see :meth:`GRaster.bind`) and call :meth:`push`.  Since the slot moves on
+    every push, get it again for every frame.
+
+    The view returned by :meth:`push` (and :attr:`frames`) is oldest frame first.  It
+    stays correct until the next push, so copy it to keep it longer.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def depth(self):
+        """
+        The number of frames in the stack.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._depth
+
+    @property
+    def shape(self):
+        """
+        The shape of a frame.
+
+        **Invariant**: Must be a ``tuple`` of ``int``.
+        """
+        return self._data.shape[1:]
+
+    @property
+    def slot(self):
+        """
+        The array to write the next frame into.
+
+        **Invariant**: Must be a view of a frame of the internal array.
+        """
+        return self._data[self._next]
+
+    @property
+    def frames(self):
+        """
+        The last ``depth`` frames, oldest first (a view, not a copy).
+
+        **Invariant**: Must be an array of shape ``(depth,)+shape``.
+        """
+        return self._frames
+
+    # BUILT-IN METHODS
+    def __init__(self,depth,shape,dtype=np.uint8,length=None):
+        """
+        Creates a stack of blank (zero) frames.
+
+        :param depth: The number of frames in the stack
+        :type depth:  ``int`` > 0
+
+        :param shape: The shape of a frame
+        :type shape:  ``tuple`` of ``int``
+
+        :param dtype: The type of the frame values
+        :type dtype:  a NumPy type
+
+        :param length: The number of frames written between two moves (None for 4*depth)
+        :type length:  ``int`` > depth or ``None``
+        """
+        assert type(depth) == int and depth > 0, '%s is not a valid depth' % repr(depth)
+        if length is None:
+            length = 4*depth
+        # After a move, the next slot must not be one of the frames of the stack
+        assert type(length) == int and length > depth, '%s is not a valid length' % repr(length)
+        self._depth = depth
+        self._data = np.zeros((depth-1+length,)+tuple(shape),dtype=dtype)
+        self._next = depth
+        self._frames = self._data[:depth]
+
+
+    # PUBLIC METHODS
+    def push(self):
+        """
+        Adds the frame in :attr:`slot` to the stack.
+
+        :return: The last ``depth`` frames, oldest first (a view, not a copy)
+        :rtype:  ``numpy.ndarray``
+        """
+        self._next += 1
+        self._frames = self._data[self._next-self._depth:self._next]
+        if self._next == len(self._data):
+            self._wrap()
+        return self._frames
+
+    def append(self,frame):
+        """
+        Copies a frame into :attr:`slot` and adds it to the stack.
+
+        :param frame: The frame to add
+        :type frame:  array of shape :attr:`shape`
+
+        :return: The last ``depth`` frames, oldest first (a view, not a copy)
+        :rtype:  ``numpy.ndarray``
+        """
+        self._data[self._next] = frame
+        return self.push()
+
+    def reset(self):
+        """
+        Fills the stack with the frame in :attr:`slot`, as at the start of a game.
+
+        :return: The last ``depth`` frames, which are all the same (a view, not a copy)
+        :rtype:  ``numpy.ndarray``
+        """
+        first = self._depth-1
+        if self._next != first:
+            self._data[first] = self._data[self._next]
+            self._next = first
+        self._data[:first] = self._data[first]
+        return self.push()
+
+
+    # HIDDEN METHODS
+    def _wrap(self):
+        """
+        Moves the newest ``depth-1`` frames to the start of the array.
+
+        The frames at the end of the array are not changed, so the current stack
+        stays correct until the next push.
+        """
+        first = self._depth-1
+        if first:
+            self._data[:first] = self._data[len(self._data)-first:]
+        self._next = first
@@ -0,0 +1,169 @@
+"""
+Pixel-accurate collision support for 2D games.
+
+This module provides collision masks: a packed grid of bits with one bit for every
+pixel of an image, set when that pixel is opaque.  Most sprites are mostly transparent,
+so a bounding box collision reports hits that the player cannot see.  A mask checks
+only the pixels that are actually drawn.
+
+Each row of a mask is packed into a single (arbitrary precision) Python integer.  To
+check a rectangle against a mask, the columns under the rectangle are turned into a
+bit pattern, and that pattern is ANDed with each row under the rectangle.  There is no
+loop over pixels, so the cost only depends on the height of the rectangle.
+
+Masks are built from the image file (see :mod:`gpng`) and cached by file name, so each
+image is only read once.  This module is pure Python and does not require Kivy.
+"""
+import math
+import os
+from .gpng import read_png
+
+# The masks loaded so far, by file name (shared with GameApp.MASK_CACHE)
+MASK_CACHE = {}
+
+
+class GMask(object):
+    """
+    A class representing the opaque pixels of an image.
+
+    Mask rows are numbered from the bottom, like the y-axis of a game.  A mask knows
+    nothing about where its image is on screen.  Hence the methods that check for
+    collisions take the center and size of the image being drawn.  The image may be
+    drawn at a different size than the file; the mask is scaled to match.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def width(self):
+        """
+        The number of pixel columns in this mask.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._width
+
+    @property
+    def height(self):
+        """
+        The number of pixel rows in this mask.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._height
+
+    # BUILT-IN METHODS
+    def __init__(self,width,height,rows):
+        """
+        Creates a mask from packed rows.
+
+        Bit ``i`` of a row is set if the pixel in column ``i`` is opaque.
+
+        :param width: The number of pixel columns
+        :type width:  ``int`` > 0
+
+        :param height: The number of pixel rows
+        :type height:  ``int`` > 0
+
+        :param rows: The packed rows, from bottom to top
+        :type rows:  sequence of ``height`` ints >= 0
+        """
+        assert type(width) == int and width > 0, '%s is not a valid width' % repr(width)
+        assert type(height) == int and height > 0, '%s is not a valid height' % repr(height)
+        assert len(rows) == height, '%s does not have %d rows' % (repr(rows),height)
+        self._width  = width
+        self._height = height
+        self._rows   = tuple(rows)
+
+    @classmethod
+    def from_file(cls,filename,threshold=128):
+        """
+        :return: The mask of a PNG file.
+        :rtype:  :class:`GMask`
+
+        A pixel is opaque if its alpha value is at least ``threshold``.
+
+        :param filename: The path of the PNG file
+        :type filename:  ``str``
+
+        :param threshold: The smallest opaque alpha value
+        :type threshold:  ``int`` in 1..255
+        """
+        width, height, pixels = read_png(filename)
+        rows = []
+        stride = 4*width
+        for j in range(height-1,-1,-1):
+            alpha = pixels[j*stride+3:(j+1)*stride:4]
+            bits = ''.join('1' if a >= threshold else '0' for a in reversed(alpha))
+            rows.append(int(bits,2))
+        return cls(width,height,rows)
+
+    # PUBLIC METHODS
+    def count(self):
+        """
+        :return: The number of opaque pixels in this mask.
+        :rtype:  ``int`` >= 0
+        """
+        return sum(bin(row).count('1') for row in self._rows)
+
+    def overlaps(self,x,y,width,height,box):
+        """
+        Checks whether a rectangle overlaps an opaque pixel of an image.
+
+        The image is drawn centered at ``(x,y)`` with size ``width`` x ``height``.  The
+        rectangle is first checked against the bounds of the image, and then against
+        the rows of this mask that it covers.  Rectangles that only touch a pixel at an
+        edge do not overlap it.
+
+        :param x: The horizontal coordinate of the image center
+        :type x:  ``int`` or ``float``
+
+        :param y: The vertical coordinate of the image center
+        :type y:  ``int`` or ``float``
+
+        :param width: The width the image is drawn at
+        :type width:  ``int`` or ``float`` > 0
+
+        :param height: The height the image is drawn at
+        :type height:  ``int`` or ``float`` > 0
+
+        :param box: The rectangle ``(left, bottom, right, top)``
+        :type box:  ``tuple`` of 4 numbers
+
+        :return: True if the rectangle overlaps an opaque pixel
+        :rtype:  ``bool``
+        """
+        left   = x-width/2.0
+        bottom = y-height/2.0
+        sx = self._width/width
+        sy = self._height/height
+        c0 = max(math.floor((box[0]-left)*sx),0)
+        c1 = min(math.ceil((box[2]-left)*sx),self._width)
+        if c0 >= c1:
+            return False
+        r0 = max(math.floor((box[1]-bottom)*sy),0)
+        r1 = min(math.ceil((box[3]-bottom)*sy),self._height)
+        if r0 >= r1:
+            return False
+        bits = ((1 << (c1-c0))-1) << c0
+        for row in self._rows[r0:r1]:
+            if row & bits:
+                return True
+        return False
+
+
+def load_mask(name,directory):
+    """
+    :return: The mask of an image file, loading it only if it is not cached.
+    :rtype:  :class:`GMask`
+
+    The mask is cached by ``name`` in ``MASK_CACHE``.
+
+    :param name: The file name
+    :type name:  ``str``
+
+    :param directory: The folder containing the file
+    :type directory:  ``str``
+    """
+    if name not in MASK_CACHE:
+        MASK_CACHE[name] = GMask.from_file(os.path.join(directory,name))
+    return MASK_CACHE[name]
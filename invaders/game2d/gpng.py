@@ -0,0 +1,176 @@
+"""
+PNG file support for 2D games.
+
+This module provides a small PNG decoder so that the pixels of an image can be read
+without a graphics window.  It is used for collision masks and for software rendering.
+Kivy is much faster at loading textures for drawing, but a texture cannot be read
+without an OpenGL context, which is not available on headless machines.
+
+Only the formats in common use for game sprites are supported: 8 bits per channel,
+no interlacing, and the color types grayscale, RGB, palette, grayscale with alpha,
+and RGBA.  This module is pure Python and does not require Kivy.
+"""
+import struct
+import zlib
+
+# The eight byte signature at the start of every PNG file
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# The number of channels for each PNG color type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def read_png(filename):
+    """
+    Reads a PNG file, converting its pixels to RGBA.
+
+    The pixels are returned as a ``bytearray`` of length ``4*width*height``, with the
+    rows from top to bottom (the order in the file).
+
+    :param filename: The path of the PNG file
+    :type filename:  ``str``
+
+    :return: The tuple ``(width, height, pixels)``
+    :rtype:  ``tuple``
+    """
+    with open(filename,'rb') as file:
+        data = file.read()
+    if data[:8] != PNG_SIGNATURE:
+        raise IOError('%s is not a PNG file' % repr(filename))
+
+    header  = None
+    palette = None
+    alphas  = None
+    chunks  = []
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s',data[pos:pos+8])
+        body = data[pos+8:pos+8+length]
+        if kind == b'IHDR':
+            header = struct.unpack('>IIBBBBB',body)
+        elif kind == b'PLTE':
+            palette = body
+        elif kind == b'tRNS':
+            alphas = body
+        elif kind == b'IDAT':
+            chunks.append(body)
+        elif kind == b'IEND':
+            break
+        pos += 12+length
+
+    if header is None:
+        raise IOError('%s has no PNG header' % repr(filename))
+    width, height, depth, color, _, _, interlace = header
+    if depth != 8 or color not in PNG_CHANNELS or interlace != 0:
+        raise IOError('The format of %s is not supported' % repr(filename))
+    if color == 3 and palette is None:
+        raise IOError('%s has no palette' % repr(filename))
+
+    channels = PNG_CHANNELS[color]
+    raw = _unfilter(zlib.decompress(b''.join(chunks)),width*channels,height,channels)
+    return (width, height, _to_rgba(raw,color,palette,alphas))
+
+
+# HIDDEN FUNCTIONS
+def _unfilter(raw,stride,height,bpp):
+    """
+    :return: The scanlines of a PNG image with the filters removed.
+    :rtype:  ``bytearray``
+
+    :param raw: The decompressed image data (each scanline starts with a filter byte)
+    :type raw:  ``bytes``
+
+    :param stride: The number of bytes in a scanline (without the filter byte)
+    :type stride:  ``int`` > 0
+
+    :param height: The number of scanlines
+    :type height:  ``int`` > 0
+
+    :param bpp: The number of bytes per pixel
+    :type bpp:  ``int`` > 0
+    """
+    result = bytearray(stride*height)
+    prior  = bytearray(stride)
+    for row in range(height):
+        start = row*(stride+1)
+        kind  = raw[start]
+        line  = bytearray(raw[start+1:start+1+stride])
+        if kind == 1:
+            for i in range(bpp,stride):
+                line[i] = (line[i]+line[i-bpp]) & 0xFF
+        elif kind == 2:
+            for i in range(stride):
+                line[i] = (line[i]+prior[i]) & 0xFF
+        elif kind == 3:
+            for i in range(stride):
+                left = line[i-bpp] if i >= bpp else 0
+                line[i] = (line[i]+((left+prior[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                a = line[i-bpp] if i >= bpp else 0
+                b = prior[i]
+                c = prior[i-bpp] if i >= bpp else 0
+                p  = a+b-c
+                pa = abs(p-a)
+                pb = abs(p-b)
+                pc = abs(p-c)
+                if pa <= pb and pa <= pc:
+                    pred = a
+                elif pb <= pc:
+                    pred = b
+                else:
+                    pred = c
+                line[i] = (line[i]+pred) & 0xFF
+        elif kind != 0:
+            raise IOError('Unknown PNG filter %d' % kind)
+        result[row*stride:(row+1)*stride] = line
+        prior = line
+    return result
+
+
+def _to_rgba(raw,color,palette,alphas):
+    """
+    :return: The pixels of an unfiltered PNG image converted to RGBA.
+    :rtype:  ``bytearray``
+
+    :param raw: The unfiltered scanlines
+    :type raw:  ``bytearray``
+
+    :param color: The PNG color type
+    :type color:  one of 0, 2, 3, 4 or 6
+
+    :param palette: The PLTE chunk (only used by color type 3)
+    :type palette:  ``bytes`` or ``None``
+
+    :param alphas: The tRNS chunk (only used by color type 3)
+    :type alphas:  ``bytes`` or ``None``
+    """
+    if color == 6:
+        return raw
+
+    count  = len(raw)//PNG_CHANNELS[color]
+    result = bytearray(4*count)
+    if color == 2:
+        result[0::4] = raw[0::3]
+        result[1::4] = raw[1::3]
+        result[2::4] = raw[2::3]
+        result[3::4] = b'\xff'*count
+    elif color == 0:
+        result[0::4] = raw
+        result[1::4] = raw
+        result[2::4] = raw
+        result[3::4] = b'\xff'*count
+    elif color == 4:
+        result[0::4] = raw[0::2]
+        result[1::4] = raw[0::2]
+        result[2::4] = raw[0::2]
+        result[3::4] = raw[1::2]
+    else:
+        table = bytearray(4*256)
+        for i in range(len(palette)//3):
+            table[4*i:4*i+3] = palette[3*i:3*i+3]
+            table[4*i+3] = alphas[i] if alphas is not None and i < len(alphas) else 255
+        for i in range(count):
+            index = raw[i]
+            result[4*i:4*i+4] = table[4*index:4*index+4]
+    return result
@@ -0,0 +1,149 @@
+"""
+Random number support for 2D games.
+
+This module provides a seedable random number generator that belongs to a single
+game.  The functions of the built-in ``random`` module share one generator for the
+whole process, so two games played side by side draw from each other's stream, and
+neither can be replayed from a seed.  A :class:`GRandom` only feeds its own game, so
+a game with the same seed draws the same numbers wherever it is played.
+
+The numbers are drawn from NumPy in blocks.  Each draw is a read from the current
+block, and the cost of calling NumPy is shared by the whole block.
+
+This module requires NumPy, but it is pure Python and does not require Kivy.
+"""
+import numpy as np
+import struct
+
+# The layout of a saved state: the 128-bit state and increment of the generator (as
+# 64-bit halves), its buffered 32-bit word (a flag and the word), and the position
+# and size of the block
+_STATE = struct.Struct('<4Q?I2H')
+# The number of bytes of a saved state (see GRandom.getstate)
+STATE_SIZE = _STATE.size
+
+# The 64 low bits of an int
+_LOW = (1 << 64)-1
+
+
+class GRandom(object):
+    """
+    A class representing a stream of random numbers for one game.
+
+    The stream is a NumPy ``PCG64`` generator.  It is read in blocks of ``block``
+    floats in [0,1), and the integers and choices are made from those floats, so
+    every draw uses exactly one number of the stream.  The state of a stream (see
+    :meth:`getstate`) is a few dozen bytes, since a block can always be drawn again
+    from the state of the generator before it.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def block(self):
+        """
+        The number of values drawn from NumPy at a time.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._block
+
+    # BUILT-IN METHODS
+    def __init__(self,seed=None,block=256):
+        """
+        Creates a new stream.
+
+        :param seed: The seed of the stream (None for a seed from the operating system)
+        :type seed:  ``int`` >= 0 or ``None``
+
+        :param block: The number of values drawn from NumPy at a time
+        :type block:  ``int`` in 1..65535
+        """
+        assert seed is None or (type(seed) == int and seed >= 0), '%s is not a valid seed' % repr(seed)
+        assert type(block) == int and 0 < block < 1 << 16, '%s is not a valid block size' % repr(block)
+        self._block = block
+        self._generator = np.random.Generator(np.random.PCG64(seed))
+        self._refill()
+
+
+    # PUBLIC METHODS
+    def random(self):
+        """
+        :return: The next random float in [0,1).
+        :rtype:  ``float``
+        """
+        if self._index == self._block:
+            self._refill()
+        value = self._values[self._index]
+        self._index += 1
+        return value
+
+    def randint(self,a,b):
+        """
+        :return: A random int in the range a..b (including both ends).
+        :rtype:  ``int``
+
+        :param a: The low end of the range
+        :type a:  ``int``
+
+        :param b: The high end of the range
+        :type b:  ``int`` >= a
+        """
+        return a + int(self.random()*(b-a+1))
+
+    def choice(self,seq):
+        """
+        :return: A random element of a sequence.
+
+        :param seq: The sequence to choose from
+        :type seq:  a nonempty sequence
+        """
+        return seq[int(self.random()*len(seq))]
+
+    def seed(self,seed=None):
+        """
+        Restarts this stream from a seed, as if it was just created with it.
+
+        :param seed: The seed of the stream (None for a seed from the operating system)
+        :type seed:  ``int`` >= 0 or ``None``
+        """
+        assert seed is None or (type(seed) == int and seed >= 0), '%s is not a valid seed' % repr(seed)
+        self._generator = np.random.Generator(np.random.PCG64(seed))
+        self._refill()
+
+    def getstate(self):
+        """
+        :return: The state of this stream, to pass to :meth:`setstate` later.
+        :rtype:  ``bytes`` of ``STATE_SIZE``
+        """
+        state = self._mark['state']
+        return _STATE.pack(state['state'] >> 64,state['state'] & _LOW,
+                           state['inc'] >> 64,state['inc'] & _LOW,
+                           bool(self._mark['has_uint32']),self._mark['uinteger'],
+                           self._index,self._block)
+
+    def setstate(self,state):
+        """
+        Puts this stream back in a saved state.
+
+        The stream then draws the same numbers that it drew after the state was saved.
+
+        :param state: The state to restore
+        :type state:  ``bytes`` returned by :meth:`getstate` of a stream with the same block size
+        """
+        shi, slo, ihi, ilo, flag, word, index, block = _STATE.unpack_from(state)
+        assert block == self._block, 'the state has a block size of %d, not %d' % (block,self._block)
+        self._generator.bit_generator.state = {'bit_generator': 'PCG64',
+            'state': {'state': (shi << 64) | slo, 'inc': (ihi << 64) | ilo},
+            'has_uint32': int(flag), 'uinteger': word}
+        self._refill()
+        self._index = index
+
+
+    # HIDDEN METHODS
+    def _refill(self):
+        """
+        Draws the next block, remembering the state of the generator before it.
+        """
+        self._mark = self._generator.bit_generator.state
+        self._values = self._generator.random(self._block).tolist()
+        self._index = 0
@@ -0,0 +1,396 @@
+"""
+Software rendering support for 2D games.
+
+This module provides a raster: a NumPy array of pixels that a game can draw into
+without Kivy, OpenGL or a window.  It is meant for small pictures of the game (the
+observations of a learning agent, or a check that a frame looks right on a machine
+without a GPU), not for what the player sees.
+
+A raster covers the same rectangle of game coordinates as the window, with the origin
+at the bottom left, but has its own (usually much lower) resolution.  Images are
+resized once to the size they take up on the raster (see :class:`GTexture`), so
+drawing one is a copy of a block of the array.
+
+Images are read from the image files (see :mod:`gpng`) and cached by file name.  This
+module requires NumPy, but it is pure Python and does not require Kivy.
+"""
+import numpy as np
+import os
+from .gpng import read_png
+
+# The images loaded so far, by file name, as RGBA arrays (rows top-down)
+PICTURE_CACHE = {}
+
+# The weights of red, green and blue in the gray level of a color
+_LUMA = (0.299, 0.587, 0.114)
+
+
+class GTexture(object):
+    """
+    A class representing an image resized for a raster.
+
+    A texture has the colors of its pixels and a mask of the opaque ones.  Only the
+    opaque pixels are drawn; a pixel is opaque if at least half of the image under it
+    is (as in :class:`GMask`).
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def width(self):
+        """
+        The number of pixel columns in this texture.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._pixels.shape[1]
+
+    @property
+    def height(self):
+        """
+        The number of pixel rows in this texture.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._pixels.shape[0]
+
+    @property
+    def pixels(self):
+        """
+        The colors of the pixels, with the rows from the top down (do not modify it).
+
+        **Invariant**: Must be a ``uint8`` array of shape (height, width, channels).
+        """
+        return self._pixels
+
+    @property
+    def mask(self):
+        """
+        The opaque pixels, with the rows from the top down (do not modify it).
+
+        **Invariant**: Must be a ``bool`` array of shape (height, width, 1).
+        """
+        return self._mask
+
+    # BUILT-IN METHODS
+    def __init__(self,pixels,mask):
+        """
+        Creates a texture from its pixels.
+
+        :param pixels: The colors of the pixels, with the rows from the top down
+        :type pixels:  ``uint8`` array of shape (height, width, channels)
+
+        :param mask: The opaque pixels, with the rows from the top down
+        :type mask:  ``bool`` array of shape (height, width, 1)
+        """
+        assert pixels.ndim == 3 and mask.shape == pixels.shape[:2]+(1,), 'the mask does not match the pixels'
+        self._pixels = np.ascontiguousarray(pixels,dtype=np.uint8)
+        self._mask = np.ascontiguousarray(mask,dtype=bool)
+        # The opaque pixels as a list, for drawing many copies at once
+        self._opaque = np.nonzero(self._mask[:,:,0])
+        self._values = self._pixels[self._opaque]
+
+    @classmethod
+    def from_rgba(cls,rgba,width,height,channels=3,samples=4):
+        """
+        :return: The texture of an image resized to the given size.
+        :rtype:  :class:`GTexture`
+
+        Each pixel of the texture is the average of ``samples`` x ``samples`` points of
+        the image, weighted by their alpha, so small textures keep the look of the image
+        rather than a few of its pixels.
+
+        :param rgba: The pixels of the image, with the rows from the top down
+        :type rgba:  ``uint8`` array of shape (rows, columns, 4)
+
+        :param width: The number of pixel columns of the texture
+        :type width:  ``int`` > 0
+
+        :param height: The number of pixel rows of the texture
+        :type height:  ``int`` > 0
+
+        :param channels: The number of channels (1 for gray levels, 3 for colors)
+        :type channels:  1 or 3
+
+        :param samples: The number of points averaged along each side of a pixel
+        :type samples:  ``int`` > 0
+        """
+        assert channels in (1,3), '%s is not a valid number of channels' % repr(channels)
+        rows = _samples(rgba.shape[0],height,samples)
+        cols = _samples(rgba.shape[1],width,samples)
+        points = rgba[rows[:,:,None,None],cols[None,None,:,:]].astype(float)
+        alpha = points[...,3:4]
+        total = alpha.sum(axis=(1,3))
+        color = (points[...,:3]*alpha).sum(axis=(1,3))/np.maximum(total,1)
+        if channels == 1:
+            color = color.dot(_LUMA)[...,None]
+        mask = total >= 128*samples*samples
+        return cls(np.rint(color).astype(np.uint8),mask)
+
+
+class GRaster(object):
+    """
+    A class representing an array of pixels covering the game window.
+
+    The array has ``height`` rows and ``width`` columns of pixels with ``channels``
+    values each.  Row 0 is the top of the window, as in an image file, but every
+    method takes game coordinates (with y going up), so a raster can draw the same
+    positions as the game objects.
+
+    The array is drawn in place, and :attr:`buffer` is always the same array (until
+    :meth:`bind` gives the raster another array to draw into).
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def width(self):
+        """
+        The number of pixel columns in this raster.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._data.shape[1]
+
+    @property
+    def height(self):
+        """
+        The number of pixel rows in this raster.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._data.shape[0]
+
+    @property
+    def channels(self):
+        """
+        The number of values of each pixel (1 for gray levels, 3 for colors).
+
+        **Invariant**: Must be 1 or 3.
+        """
+        return self._data.shape[2]
+
+    @property
+    def buffer(self):
+        """
+        The pixels of this raster (do not keep it past the next draw if you need a copy).
+
+        It has shape (height, width) for gray levels and (height, width, 3) for colors.
+
+        **Invariant**: Must be a ``uint8`` array.
+        """
+        return self._buffer
+
+    # BUILT-IN METHODS
+    def __init__(self,width,height,world_width,world_height,channels=1):
+        """
+        Creates a new, black raster.
+
+        :param width: The number of pixel columns
+        :type width:  ``int`` > 0
+
+        :param height: The number of pixel rows
+        :type height:  ``int`` > 0
+
+        :param world_width: The width of the window in game coordinates
+        :type world_width:  ``int`` or ``float`` > 0
+
+        :param world_height: The height of the window in game coordinates
+        :type world_height:  ``int`` or ``float`` > 0
+
+        :param channels: The number of values of each pixel (1 for gray levels, 3 for colors)
+        :type channels:  1 or 3
+        """
+        assert type(width) == int and width > 0, '%s is not a valid width' % repr(width)
+        assert type(height) == int and height > 0, '%s is not a valid height' % repr(height)
+        assert channels in (1,3), '%s is not a valid number of channels' % repr(channels)
+        self._data = np.zeros((height,width,channels),dtype=np.uint8)
+        self._buffer = self._data[:,:,0] if channels == 1 else self._data
+        self._sx = width/float(world_width)
+        self._sy = height/float(world_height)
+        self._top = float(world_height)
+        self._textures = {}
+
+
+    # PUBLIC METHODS
+    def bind(self,array):
+        """
+        Makes this raster draw into another array, such as a slot of a :class:`GFrameStack`.
+
+        The pixels are then drawn straight where they are wanted, with no copy.  The
+        array becomes :attr:`buffer`.  Its contents are kept, so clear it to start a
+        new picture.
+
+        :param array: The pixels to draw into
+        :type array:  ``uint8`` array of the shape of :attr:`buffer`
+        """
+        assert array.dtype == np.uint8, '%s is not a uint8 array' % repr(array.dtype)
+        assert array.shape == self._buffer.shape, '%s is not the shape %s' % (repr(array.shape),repr(self._buffer.shape))
+        self._buffer = array
+        self._data = array[:,:,None] if array.ndim == 2 else array
+
+    def color(self,rgb):
+        """
+        :return: A color as the values of a pixel of this raster.
+        :rtype:  ``numpy.ndarray`` of ``uint8``
+
+        :param rgb: The red, green and blue levels
+        :type rgb:  3-element sequence of ``int`` in 0..255
+        """
+        if self.channels == 1:
+            return np.array([round(np.dot(rgb,_LUMA))],dtype=np.uint8)
+        return np.array(rgb,dtype=np.uint8)
+
+    def texture(self,name,directory,width,height):
+        """
+        :return: The texture of an image file for the given size in game coordinates.
+        :rtype:  :class:`GTexture`
+
+        The texture is cached by name and size, so each image is only resized once
+        for each size.
+
+        :param name: The file name
+        :type name:  ``str``
+
+        :param directory: The folder containing the file
+        :type directory:  ``str``
+
+        :param width: The width of the image in game coordinates
+        :type width:  ``int`` or ``float`` > 0
+
+        :param height: The height of the image in game coordinates
+        :type height:  ``int`` or ``float`` > 0
+        """
+        size = (max(int(round(width*self._sx)),1),max(int(round(height*self._sy)),1))
+        key = (name,)+size
+        if key not in self._textures:
+            picture = load_picture(name,directory)
+            self._textures[key] = GTexture.from_rgba(picture,size[0],size[1],self.channels)
+        return self._textures[key]
+
+    def clear(self,color=None):
+        """
+        Fills the whole raster with a color.
+
+        :param color: The color (None for black)
+        :type color:  a result of :meth:`color` or ``None``
+        """
+        if color is None:
+            self._data.fill(0)
+        else:
+            self._data[:] = color
+
+    def fill(self,left,bottom,right,top,color):
+        """
+        Fills a rectangle of game coordinates with a color.
+
+        The rectangle is rounded to whole pixels, and is at least one pixel wide and
+        high, so thin things (such as a line) do not disappear.  The part outside the
+        raster is skipped.
+
+        :param left, bottom, right, top: The edges of the rectangle
+        :type left, bottom, right, top:  ``int`` or ``float``
+
+        :param color: The color
+        :type color:  a result of :meth:`color`
+        """
+        c0 = int(round(left*self._sx))
+        c1 = max(int(round(right*self._sx)),c0+1)
+        r0 = int(round((self._top-top)*self._sy))
+        r1 = max(int(round((self._top-bottom)*self._sy)),r0+1)
+        c0, r0 = max(c0,0), max(r0,0)
+        if c0 < c1 and r0 < r1:
+            self._data[r0:r1,c0:c1] = color
+
+    def blit(self,texture,x,y):
+        """
+        Draws the opaque pixels of a texture centered at (x,y) in game coordinates.
+
+        The part outside the raster is skipped.
+
+        :param texture: The texture to draw
+        :type texture:  :class:`GTexture` with the channels of this raster
+
+        :param x: The horizontal coordinate of the center
+        :type x:  ``int`` or ``float``
+
+        :param y: The vertical coordinate of the center
+        :type y:  ``int`` or ``float``
+        """
+        h, w = texture._pixels.shape[:2]
+        c0 = int(round(x*self._sx - w/2.0))
+        r0 = int(round((self._top-y)*self._sy - h/2.0))
+        c1 = min(c0+w,self._data.shape[1])
+        r1 = min(r0+h,self._data.shape[0])
+        tc = max(-c0,0)
+        tr = max(-r0,0)
+        if c0+tc < c1 and r0+tr < r1:
+            np.copyto(self._data[r0+tr:r1,c0+tc:c1],
+                      texture._pixels[tr:r1-r0,tc:c1-c0],
+                      where=texture._mask[tr:r1-r0,tc:c1-c0])
+
+    def blit_all(self,texture,xs,ys):
+        """
+        Draws the opaque pixels of a texture centered at each point of an array.
+
+        This is the same as calling :meth:`blit` for each point, in order, but it
+        draws every copy with one array operation.
+
+        :param texture: The texture to draw
+        :type texture:  :class:`GTexture` with the channels of this raster
+
+        :param xs: The horizontal coordinates of the centers
+        :type xs:  ``numpy.ndarray`` of numbers
+
+        :param ys: The vertical coordinates of the centers
+        :type ys:  ``numpy.ndarray`` of numbers with the same shape as ``xs``
+        """
+        if len(xs) == 0:
+            return
+        h, w = texture._pixels.shape[:2]
+        c0 = np.rint(np.asarray(xs,dtype=float).ravel()*self._sx - w/2.0).astype(int)
+        r0 = np.rint((self._top-np.asarray(ys,dtype=float).ravel())*self._sy - h/2.0).astype(int)
+        rows = r0[:,None] + texture._opaque[0]
+        cols = c0[:,None] + texture._opaque[1]
+        inside = (rows >= 0) & (rows < self._data.shape[0]) & (cols >= 0) & (cols < self._data.shape[1])
+        values = np.broadcast_to(texture._values,rows.shape+texture._values.shape[1:])
+        if inside.all():
+            self._data[rows,cols] = values
+        else:
+            self._data[rows[inside],cols[inside]] = values[inside]
+
+
+# HELPER FUNCTIONS
+def load_picture(name,directory):
+    """
+    :return: The RGBA pixels of an image file, loading it only if it is not cached.
+    :rtype:  ``uint8`` array of shape (rows, columns, 4), with the rows from the top down
+
+    The pixels are cached by ``name`` in ``PICTURE_CACHE``.
+
+    :param name: The file name
+    :type name:  ``str``
+
+    :param directory: The folder containing the file
+    :type directory:  ``str``
+    """
+    if name not in PICTURE_CACHE:
+        width, height, data = read_png(os.path.join(directory,name))
+        PICTURE_CACHE[name] = np.frombuffer(bytes(data),dtype=np.uint8).reshape(height,width,4)
+    return PICTURE_CACHE[name]
+
+
+def _samples(size,count,samples):
+    """
+    :return: The source indices of the sample points of each target pixel.
+    :rtype:  ``int`` array of shape (count, samples)
+
+    :param size: The number of source pixels
+    :type size:  ``int`` > 0
+
+    :param count: The number of target pixels
+    :type count:  ``int`` > 0
+
+    :param samples: The number of sample points per target pixel
+    :type samples:  ``int`` > 0
+    """
+    points = (np.arange(count)[:,None] + (np.arange(samples)+0.5)/samples)*(size/float(count))
+    return np.minimum(points.astype(int),size-1)
@@ -75,6 +75,53 @@ class GRectangle(GObject):
         self._defined = True
     
     
+    # PUBLIC METHODS
+    def overlaps(self,other):
+        """
+        Checks whether this rectangle overlaps another one
+        
+        The other rectangle may be any :class:`GObject` (in which case its bounding
+        box is used) or a tuple ``(left, bottom, right, top)``.  Rectangles that only
+        touch at an edge do not overlap.
+        
+        This method compares the edges directly, so it is much faster than calling
+        :meth:`contains` on the corners.  For a shape smaller than this one, the
+        result is the same as checking whether any of its corners is inside.
+        
+        **Warning**: Using this method on a rotated object may slow down your framerate.
+        
+        :param other: the rectangle to check
+        :type other: :class:`GObject` or a tuple of 4 numbers
+        
+        :return: True if the two rectangles overlap
+        :rtype:  ``bool``
+        """
+        if self._rotate.angle == 0.0:
+            hw = self._width/2.0
+            hh = self._height/2.0
+            l1 = self._trans.x-hw
+            r1 = self._trans.x+hw
+            b1 = self._trans.y-hh
+            t1 = self._trans.y+hh
+        else:
+            l1, b1, r1, t1 = self.left, self.bottom, self.right, self.top
+        
+        if not isinstance(other,GObject):
+            assert is_num_tuple(other,4), "%s is not a valid rectangle" % repr(other)
+            l2, b2, r2, t2 = other
+        elif other._rotate.angle == 0.0:
+            hw = other._width/2.0
+            hh = other._height/2.0
+            l2 = other._trans.x-hw
+            r2 = other._trans.x+hw
+            b2 = other._trans.y-hh
+            t2 = other._trans.y+hh
+        else:
+            l2, b2, r2, t2 = other.left, other.bottom, other.right, other.top
+        
+        return l1 < r2 and l2 < r1 and b1 < t2 and b2 < t1
+    
+    
     # HIDDEN METHODS
     def _reset(self):
         """
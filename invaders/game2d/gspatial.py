@@ -0,0 +1,298 @@
+"""
+Broad-phase collision support for 2D games.
+
+This module provides a uniform grid (a spatial hash) for finding the objects whose
+bounding boxes overlap a region, or each other.  Checking every object against every
+other object gets slow very quickly once there are hundreds of objects on screen.  The
+grid only compares objects that share a cell.
+
+This module is pure Python and does not require Kivy, so it may also be used by
+headless simulations that track their objects as plain bounding boxes.
+"""
+
+
+class GSpatialHash(object):
+    """
+    A class representing a uniform grid of square cells for broad-phase collisions.
+
+    Any hashable object may be inserted into the grid.  If the object is a
+    :class:`GObject`, its bounding box is read from the attributes ``left``, ``right``,
+    ``bottom`` and ``top``.  Otherwise, the bounding box must be given explicitly as a
+    tuple ``(left, bottom, right, top)``.
+
+    Every object may also be given a group (such as ``'ship'`` or ``'bolt'``).  Groups
+    allow you to restrict a query to a single kind of object, or to enumerate the
+    overlapping pairs between two kinds of object.
+
+    The grid does not notice when an object moves.  After changing the ``x`` or ``y``
+    of an object, you should call :meth:`update`.  This is cheap when the object stays
+    in the same cells, which is the common case.
+
+    The grid is only a broad-phase: two objects overlap if their bounding boxes
+    overlap.  For anything more accurate (such as rotated shapes or images with
+    transparency), you should check the results again yourself.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def cellsize(self):
+        """
+        The width (and height) of a grid cell.
+
+        For best performance, this should be about the size of a typical object.
+
+        **Invariant**: Must be an ``int`` or ``float`` > 0.
+        """
+        return self._cellsize
+
+    # BUILT-IN METHODS
+    def __init__(self,cellsize=64):
+        """
+        Creates a new, empty grid.
+
+        :param cellsize: The width (and height) of a grid cell
+        :type cellsize:  ``int`` or ``float`` > 0
+        """
+        assert type(cellsize) in [int,float], '%s is not a number' % repr(cellsize)
+        assert cellsize > 0, '%s is not positive' % repr(cellsize)
+        self._cellsize = cellsize
+        self._cells = {}
+        self._entries = {}
+
+    def __len__(self):
+        """
+        :return: The number of objects in this grid.
+        :rtype:  ``int`` >= 0
+        """
+        return len(self._entries)
+
+    def __contains__(self,obj):
+        """
+        :return: True if ``obj`` is in this grid.
+        :rtype:  ``bool``
+        """
+        return obj in self._entries
+
+    def __iter__(self):
+        """
+        :return: An iterator over the objects in this grid.
+        """
+        return iter(self._entries)
+
+
+    # PUBLIC METHODS
+    def insert(self,obj,box=None,group=None):
+        """
+        Adds an object to this grid.
+
+        If the object is already in the grid, this is the same as :meth:`update`,
+        except that the group is replaced as well.
+
+        :param obj: The object to add
+        :type obj:  any hashable object
+
+        :param box: The bounding box ``(left, bottom, right, top)``, or None for a GObject
+        :type box:  ``tuple`` of 4 numbers or ``None``
+
+        :param group: The group of this object (optional)
+        :type group:  any hashable value
+        """
+        if obj in self._entries:
+            self.remove(obj)
+        box = self._bounds(obj,box)
+        span = self._span(box)
+        self._entries[obj] = [box,group,span]
+        self._add(obj,span)
+
+    def update(self,obj,box=None):
+        """
+        Updates the bounding box of an object in this grid.
+
+        The object only changes cells if its new bounding box covers different cells.
+
+        :param obj: The object to update
+        :type obj:  an object in this grid
+
+        :param box: The new bounding box ``(left, bottom, right, top)``, or None for a GObject
+        :type box:  ``tuple`` of 4 numbers or ``None``
+        """
+        assert obj in self._entries, '%s is not in this grid' % repr(obj)
+        entry = self._entries[obj]
+        entry[0] = self._bounds(obj,box)
+        span = self._span(entry[0])
+        if span != entry[2]:
+            self._discard(obj,entry[2])
+            self._add(obj,span)
+            entry[2] = span
+
+    def remove(self,obj):
+        """
+        Removes an object from this grid.
+
+        This method does nothing if the object is not in the grid.
+
+        :param obj: The object to remove
+        :type obj:  any hashable object
+        """
+        entry = self._entries.pop(obj,None)
+        if entry is not None:
+            self._discard(obj,entry[2])
+
+    def clear(self):
+        """
+        Removes all objects from this grid.
+        """
+        self._cells.clear()
+        self._entries.clear()
+
+    def box(self,obj):
+        """
+        :return: The bounding box ``(left, bottom, right, top)`` of an object in this grid.
+        :rtype:  ``tuple``
+
+        :param obj: The object to look up
+        :type obj:  an object in this grid
+        """
+        return self._entries[obj][0]
+
+    def group(self,obj):
+        """
+        :return: The group of an object in this grid.
+
+        :param obj: The object to look up
+        :type obj:  an object in this grid
+        """
+        return self._entries[obj][1]
+
+    def query(self,left,bottom,right,top,group=None):
+        """
+        Finds the objects whose bounding boxes overlap a region.
+
+        Boxes that only touch at an edge do not overlap.  The objects are returned
+        in no particular order, though the order is always the same for the same
+        sequence of insertions.
+
+        :param left: The left edge of the region
+        :type left:  ``int`` or ``float``
+
+        :param bottom: The bottom edge of the region
+        :type bottom:  ``int`` or ``float``
+
+        :param right: The right edge of the region
+        :type right:  ``int`` or ``float``
+
+        :param top: The top edge of the region
+        :type top:  ``int`` or ``float``
+
+        :param group: The group to restrict the search to (None for all groups)
+        :type group:  any hashable value
+
+        :return: The list of overlapping objects
+        :rtype:  ``list``
+        """
+        result = {}
+        size = self._cellsize
+        for i in range(int(left//size),int(right//size)+1):
+            for j in range(int(bottom//size),int(top//size)+1):
+                for obj in self._cells.get((i,j),()):
+                    if obj in result:
+                        continue
+                    entry = self._entries[obj]
+                    if group is not None and entry[1] != group:
+                        continue
+                    b = entry[0]
+                    if b[0] < right and left < b[2] and b[1] < top and bottom < b[3]:
+                        result[obj] = True
+        return list(result)
+
+    def pairs(self,group1,group2):
+        """
+        Finds the pairs of objects in two groups whose bounding boxes overlap.
+
+        Each pair ``(a, b)`` has ``a`` in ``group1`` and ``b`` in ``group2``, and is
+        reported once even if the two objects share several cells.  If the two groups
+        are the same, each unordered pair is reported once.
+
+        :param group1: The group of the first object in each pair
+        :type group1:  any hashable value
+
+        :param group2: The group of the second object in each pair
+        :type group2:  any hashable value
+
+        :return: The list of overlapping pairs
+        :rtype:  ``list`` of ``tuple``
+        """
+        seen = set()
+        result = []
+        for members in self._cells.values():
+            if len(members) < 2:
+                continue
+            firsts  = [obj for obj in members if self._entries[obj][1] == group1]
+            if not firsts:
+                continue
+            seconds = [obj for obj in members if self._entries[obj][1] == group2]
+            for a in firsts:
+                b1 = self._entries[a][0]
+                for b in seconds:
+                    if a == b:
+                        continue
+                    # Objects are keys of the grid, so the pair is too (in either
+                    # order when the groups are the same)
+                    key = frozenset((a,b)) if group1 == group2 else (a,b)
+                    if key in seen:
+                        continue
+                    b2 = self._entries[b][0]
+                    if b1[0] < b2[2] and b2[0] < b1[2] and b1[1] < b2[3] and b2[1] < b1[3]:
+                        seen.add(key)
+                        result.append((a,b))
+        return result
+
+
+    # HIDDEN METHODS
+    def _bounds(self,obj,box):
+        """
+        :return: The bounding box of obj, reading it from obj if box is None.
+
+        :param obj: The object to measure
+        :type obj:  any hashable object
+
+        :param box: The bounding box ``(left, bottom, right, top)``, or None
+        :type box:  ``tuple`` of 4 numbers or ``None``
+        """
+        if box is None:
+            return (obj.left,obj.bottom,obj.right,obj.top)
+        assert len(box) == 4, '%s is not a valid bounding box' % repr(box)
+        return tuple(box)
+
+    def _span(self,box):
+        """
+        :return: The cells ``(imin, jmin, imax, jmax)`` covered by a bounding box.
+
+        :param box: The bounding box ``(left, bottom, right, top)``
+        :type box:  ``tuple`` of 4 numbers
+        """
+        size = self._cellsize
+        return (int(box[0]//size),int(box[1]//size),int(box[2]//size),int(box[3]//size))
+
+    def _add(self,obj,span):
+        """
+        Adds obj to every cell in span.
+        """
+        for i in range(span[0],span[2]+1):
+            for j in range(span[1],span[3]+1):
+                cell = self._cells.get((i,j))
+                if cell is None:
+                    self._cells[(i,j)] = [obj]
+                else:
+                    cell.append(obj)
+
+    def _discard(self,obj,span):
+        """
+        Removes obj from every cell in span, deleting cells that become empty.
+        """
+        for i in range(span[0],span[2]+1):
+            for j in range(span[1],span[3]+1):
+                cell = self._cells[(i,j)]
+                cell.remove(obj)
+                if not cell:
+                    del self._cells[(i,j)]
@@ -0,0 +1,350 @@
+"""
+Timer support for 2D games.
+
+This module provides a hierarchical timer wheel, for scheduling things that happen
+after a delay (an enemy step, a respawn, the next frame of an animation).  Time is
+measured in integer ticks, which are usually game updates.  Counting the time since
+the last event in a float and resetting it to 0 loses the part of the last update
+past the deadline, so the timing drifts with the frame rate.  A wheel keeps absolute
+deadlines, and a timer that is scheduled from the callback of another is relative to
+the deadline of that timer, not the current time.
+
+Each level of the wheel is a ring of slots.  A timer is placed at the lowest level
+whose slots can tell its deadline apart from the current time.  As time passes, the
+timers of a higher slot are moved down a level when that slot is reached.  Scheduling
+and cancelling take constant time, and so does asking for the next deadline, which
+allows a game to skip over ticks where nothing happens.
+
+This module is pure Python and does not require Kivy.
+"""
+
+
+class GTimer(object):
+    """
+    A class representing a timer scheduled on a :class:`GTimerWheel`.
+
+    Timers are created by :meth:`GTimerWheel.schedule`, and should not be created
+    directly.  A timer can be used to cancel the callback before it happens.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def tick(self):
+        """
+        The tick at which this timer fires.
+
+        **Invariant**: Must be an ``int``.
+        """
+        return self._tick
+
+    @property
+    def priority(self):
+        """
+        The order of this timer among the timers with the same tick (lowest first).
+
+        **Invariant**: Must be an ``int``.
+        """
+        return self._priority
+
+    @property
+    def callback(self):
+        """
+        The function called when this timer fires.
+
+        **Invariant**: Must be a function with no arguments.
+        """
+        return self._callback
+
+    @property
+    def active(self):
+        """
+        Whether this timer is still waiting to fire.
+
+        **Invariant**: Must be a ``bool``.
+        """
+        return self._level is not None
+
+    # BUILT-IN METHODS
+    def __init__(self,tick,priority,seq,callback):
+        """
+        Creates a new (unscheduled) timer.
+
+        :param tick: The tick at which this timer fires
+        :type tick:  ``int``
+
+        :param priority: The order among the timers with the same tick
+        :type priority:  ``int``
+
+        :param seq: The order in which the timer was scheduled
+        :type seq:  ``int``
+
+        :param callback: The function to call
+        :type callback:  function with no arguments
+        """
+        self._tick = tick
+        self._priority = priority
+        self._seq = seq
+        self._callback = callback
+        self._level = None
+        self._slot = None
+
+    def __repr__(self):
+        """
+        :return: An unambiguous representation of this timer.
+        :rtype:  ``str``
+        """
+        return '<GTimer tick=%d priority=%d%s>' % (self._tick,self._priority,
+                                                   '' if self.active else ' inactive')
+
+
+class GTimerWheel(object):
+    """
+    A class representing a hierarchical timer wheel.
+
+    The wheel has ``levels`` rings of ``2**bits`` slots.  A slot at level ``k`` covers
+    ``2**(bits*k)`` ticks, so the wheel covers ``2**(bits*levels)`` ticks ahead of
+    the current time.  Timers further away than that are kept in an overflow list
+    until they are close enough.
+
+    Timers with the same tick fire in order of priority, and then in the order they
+    were scheduled.  A callback may schedule new timers (even with a delay of 0, in
+    which case they fire in the same call to :meth:`advance`).
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def now(self):
+        """
+        The current tick of this wheel.
+
+        While a callback is running, this is the tick of its timer.
+
+        **Invariant**: Must be an ``int``.
+        """
+        return self._now
+
+    # BUILT-IN METHODS
+    def __init__(self,now=0,bits=6,levels=4):
+        """
+        Creates a new, empty wheel.
+
+        :param now: The starting tick
+        :type now:  ``int``
+
+        :param bits: The number of bits of a tick handled by each level
+        :type bits:  ``int`` > 0
+
+        :param levels: The number of levels
+        :type levels:  ``int`` > 0
+        """
+        assert type(now) == int, '%s is not an int' % repr(now)
+        assert type(bits) == int and bits > 0, '%s is not a valid bit count' % repr(bits)
+        assert type(levels) == int and levels > 0, '%s is not a valid level count' % repr(levels)
+        self._now = now
+        self._bits = bits
+        self._mask = (1 << bits)-1
+        self._slots = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        self._occupied = [0]*levels
+        self._overflow = []
+        self._count = 0
+        self._seq = 0
+        self._next = None
+        self._stale = False
+
+    def __len__(self):
+        """
+        :return: The number of timers waiting to fire.
+        :rtype:  ``int`` >= 0
+        """
+        return self._count
+
+
+    # PUBLIC METHODS
+    def schedule(self,delay,callback,priority=0):
+        """
+        Schedules ``callback`` to be called ``delay`` ticks from now.
+
+        :param delay: The number of ticks to wait
+        :type delay:  ``int`` >= 0
+
+        :param callback: The function to call
+        :type callback:  function with no arguments
+
+        :param priority: The order among the timers with the same tick (lowest first)
+        :type priority:  ``int``
+
+        :return: The new timer
+        :rtype:  :class:`GTimer`
+        """
+        assert type(delay) == int and delay >= 0, '%s is not a valid delay' % repr(delay)
+        assert callable(callback), '%s is not callable' % repr(callback)
+        timer = GTimer(self._now+delay,priority,self._seq,callback)
+        self._seq += 1
+        self._place(timer)
+        self._count += 1
+        if self._next is not None and timer._tick < self._next:
+            self._next = timer._tick
+        elif self._next is None and not self._stale:
+            self._next = timer._tick
+        return timer
+
+    def cancel(self,timer):
+        """
+        Cancels a timer, so that its callback is never called.
+
+        This method does nothing if the timer has already fired or been cancelled.
+
+        :param timer: The timer to cancel
+        :type timer:  :class:`GTimer` from this wheel
+        """
+        if not timer.active:
+            return
+        self._unplace(timer)
+        self._count -= 1
+        if timer._tick == self._next:
+            self._stale = True
+            self._next = None
+
+    def next(self):
+        """
+        :return: The tick of the next timer to fire, or None if there are no timers.
+        :rtype:  ``int`` or ``None``
+        """
+        if self._stale:
+            self._next = self._earliest()
+            self._stale = False
+        return self._next
+
+    def until(self):
+        """
+        :return: The number of ticks until the next timer fires, or None if there are none.
+        :rtype:  ``int`` >= 0 or ``None``
+        """
+        tick = self.next()
+        return None if tick is None else tick-self._now
+
+    def advance(self,now):
+        """
+        Moves the wheel forward to tick ``now``, firing every timer that is due.
+
+        Timers fire in order of tick, then priority, then the order they were
+        scheduled.  The wheel jumps directly from one deadline to the next, so the
+        cost does not depend on the number of ticks skipped.
+
+        :param now: The new current tick
+        :type now:  ``int`` >= the current tick
+        """
+        assert type(now) == int and now >= self._now, '%s is not a valid tick' % repr(now)
+        while True:
+            tick = self.next()
+            if tick is None or tick > now:
+                break
+            self._move(tick)
+            slot = self._slots[0][tick & self._mask]
+            while slot:
+                timer = min(slot,key=lambda t: (t._priority,t._seq))
+                self._unplace(timer)
+                self._count -= 1
+                timer._callback()
+            self._stale = True
+        self._move(now)
+
+    def clear(self,now=None):
+        """
+        Cancels every timer in this wheel, and optionally moves it to a new tick.
+
+        Moving the wheel is how a saved game is put back: clear the wheel at the
+        saved tick, and schedule the saved timers again.
+
+        :param now: The new current tick (None to keep the current tick)
+        :type now:  ``int`` or ``None``
+        """
+        assert now is None or type(now) == int, '%s is not an int' % repr(now)
+        for level, bits in enumerate(self._occupied):
+            while bits:
+                slot = self._slots[level][(bits & -bits).bit_length()-1]
+                for timer in slot:
+                    timer._level = None
+                del slot[:]
+                bits &= bits-1
+        for timer in self._overflow:
+            timer._level = None
+        self._overflow = []
+        self._occupied = [0]*len(self._slots)
+        self._count = 0
+        self._next = None
+        self._stale = False
+        if now is not None:
+            self._now = now
+
+
+    # HIDDEN METHODS
+    def _place(self,timer):
+        """
+        Puts a timer in the slot for its tick, relative to the current tick.
+        """
+        diff = timer._tick ^ self._now
+        for level in range(len(self._slots)):
+            diff >>= self._bits
+            if diff == 0:
+                index = (timer._tick >> (self._bits*level)) & self._mask
+                self._slots[level][index].append(timer)
+                self._occupied[level] |= 1 << index
+                timer._level = level
+                timer._slot = index
+                return
+        self._overflow.append(timer)
+        timer._level = -1
+
+    def _unplace(self,timer):
+        """
+        Removes a timer from its slot.
+        """
+        if timer._level == -1:
+            self._overflow.remove(timer)
+        else:
+            slot = self._slots[timer._level][timer._slot]
+            slot.remove(timer)
+            if not slot:
+                self._occupied[timer._level] &= ~(1 << timer._slot)
+        timer._level = None
+
+    def _move(self,now):
+        """
+        Sets the current tick, moving timers down to the levels they now belong to.
+
+        There must be no timers due before ``now``.
+        """
+        old = self._now
+        if now == old:
+            return
+        self._now = now
+        levels = len(self._slots)
+        if (old ^ now) >> (self._bits*levels) and self._overflow:
+            pending = self._overflow
+            self._overflow = []
+            for timer in pending:
+                self._place(timer)
+        for level in range(levels-1,0,-1):
+            if (old ^ now) >> (self._bits*level):
+                index = (now >> (self._bits*level)) & self._mask
+                pending = self._slots[level][index]
+                if pending:
+                    self._slots[level][index] = []
+                    self._occupied[level] &= ~(1 << index)
+                    for timer in pending:
+                        self._place(timer)
+
+    def _earliest(self):
+        """
+        :return: The tick of the earliest timer, or None if there are no timers.
+        """
+        if self._count == 0:
+            return None
+        for level in range(len(self._slots)):
+            start = (self._now >> (self._bits*level)) & self._mask
+            bits = self._occupied[level] >> start
+            if bits:
+                index = start + (bits & -bits).bit_length()-1
+                return min(timer._tick for timer in self._slots[level][index])
+        return min(timer._tick for timer in self._overflow)
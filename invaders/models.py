@@ -66,27 +66,32 @@ class Ship(GImage):
     # INITIALIZER TO CREATE A NEW SHIP
     def __init__(self, x, y,source):
         super().__init__(x = x, y = y, width = SHIP_WIDTH, height = SHIP_HEIGHT,
-        source = 'ship.png')
+        source = SHIP_IMAGE)
 
     # METHODS TO MOVE THE SHIP AND CHECK FOR COLLISIONS
     def shipcollides(self,bolt):
         """
         Returns True if the alien bolt collides with the ship
 
-        This method returns False if bolt was not fired by the player.
+        This method returns False if bolt was fired by the player.
 
         Parameter bolt: The laser bolt to check
         Precondition: bolt is of class Bolt
         """
         assert isinstance(bolt,Bolt)
-        if (bolt.isPlayerBolt() != True and
-        self.contains((bolt.x + BOLT_WIDTH//2, bolt.y + BOLT_HEIGHT//2)) or
-        self.contains((bolt.x + BOLT_WIDTH//2, bolt.y - BOLT_HEIGHT//2)) or
-        self.contains((bolt.x - BOLT_WIDTH//2, bolt.y + BOLT_HEIGHT//2)) or
-        self.contains((bolt.x - BOLT_WIDTH//2, bolt.y - BOLT_HEIGHT//2))):
-            return True
-        else:
-            return False
+        return len(_collisions(self,[bolt],False)) > 0
+
+    def shipcollisions(self,bolts):
+        """
+        Returns the list of alien bolts in bolts that collide with the ship
+
+        This is the batched version of shipcollides.  Player bolts are never
+        in the result.
+
+        Parameter bolts: The laser bolts to check
+        Precondition: bolts is a list of Bolt objects
+        """
+        return _collisions(self,bolts,False)
 
     # ADD MORE METHODS (PROPERLY SPECIFIED) AS NECESSARY
 
@@ -129,15 +134,19 @@ class Alien(GImage):
         Precondition: bolt is of class Bolt
         """
         assert isinstance(bolt,Bolt)
+        return len(_collisions(self,[bolt],True)) > 0
 
-        if (bolt.isPlayerBolt() and
-        self.contains((bolt.x + BOLT_WIDTH//2, bolt.y + BOLT_HEIGHT//2)) or
-        self.contains((bolt.x + BOLT_WIDTH//2, bolt.y - BOLT_HEIGHT//2)) or
-        self.contains((bolt.x - BOLT_WIDTH//2, bolt.y + BOLT_HEIGHT//2)) or
-        self.contains((bolt.x - BOLT_WIDTH//2, bolt.y - BOLT_HEIGHT//2))):
-            return True
-        else:
-            return False
+    def collisions(self,bolts):
+        """
+        Returns the list of player bolts in bolts that collide with this alien
+
+        This is the batched version of collides.  Alien bolts are never in
+        the result.
+
+        Parameter bolts: The laser bolts to check
+        Precondition: bolts is a list of Bolt objects
+        """
+        return _collisions(self,bolts,True)
 
 
 class Bolt(GRectangle):
@@ -184,6 +193,26 @@ class Bolt(GRectangle):
         self._velocity = vel
 
     # ADD MORE METHODS (PROPERLY SPECIFIED) AS NECESSARY
+    def reset(self, x, y, vel):
+        """
+        Reuses this bolt for a new shot at (x,y) with velocity vel.
+
+        This keeps the Kivy instructions of the bolt, so it is much cheaper
+        than creating a new Bolt.
+
+        Parameter x: the horizontal coordinate of the bolt center
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the bolt center
+        Precondition: y is an int or float
+
+        Parameter vel: the velocity in y direction
+        Precondition: vel is an int or float
+        """
+        self.x = x
+        self.y = y
+        self._velocity = vel
+
     def isPlayerBolt(self):
         """
         Returns True if the bolt is one fired by a player. Returns False otherwise.
@@ -194,3 +223,39 @@ class Bolt(GRectangle):
             return False
 
 # IF YOU NEED ADDITIONAL MODEL CLASSES, THEY GO HERE
+
+
+# HELPER FUNCTIONS FOR COLLISION DETECTION
+def _collisions(target, bolts, player):
+    """
+    Returns the list of bolts of the given owner that overlap target
+
+    The edges of target are computed once, and each bolt is checked against
+    them with GRectangle.overlaps.  Bolts that only touch target do not
+    overlap it.  As bolts are smaller than ships and aliens, this is the same
+    as checking whether a corner of the bolt is inside target.
+
+    If PIXEL_COLLISIONS is True, a bolt that overlaps target is then checked
+    against the collision mask of its image, so only opaque pixels are hit.
+
+    Parameter target: The ship or alien to check
+    Precondition: target is an unrotated GImage
+
+    Parameter bolts: The laser bolts to check
+    Precondition: bolts is a list of Bolt objects
+
+    Parameter player: Whether to check player bolts (True) or alien bolts (False)
+    Precondition: player is a bool
+    """
+    box = (target.x - target.width/2.0, target.y - target.height/2.0,
+           target.x + target.width/2.0, target.y + target.height/2.0)
+    mask = GameApp.load_mask(target.source) if PIXEL_COLLISIONS else None
+    result = []
+    for bolt in bolts:
+        if bolt.isPlayerBolt() == player and bolt.overlaps(box):
+            if mask is None or mask.overlaps(target.x, target.y,
+            target.width, target.height, (bolt.x - BOLT_WIDTH/2.0,
+            bolt.y - BOLT_HEIGHT/2.0, bolt.x + BOLT_WIDTH/2.0,
+            bolt.y + BOLT_HEIGHT/2.0)):
+                result.append(bolt)
+    return result
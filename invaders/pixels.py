@@ -0,0 +1,102 @@
+"""
+Pixel view module for Alien Invaders
+
+This module contains the class PixelView, which draws a wave into a small
+array of pixels with a GRaster (see game2d/graster.py) instead of a Kivy
+window.  It draws the same things as Wave (the aliens, the ship, the defense
+line and the bolts, in that order) at the same positions, but at a low
+resolution and without a GPU.  This is what agents that learn from pixels
+observe, and what the visual checks compare.
+
+Like simulation.py, this module does not depend on the Kivy classes of game2d.
+"""
+from consts import *
+from simulation import IMAGE_DIRECTORY
+from game2d.graster import GRaster
+
+# PRIMARY RULE: PixelView can only access consts.py, simulation.py (for its
+# constants) and the headless helpers of game2d.
+
+# The colors of the bolts and the defense line (as in models.py and wave.py)
+BOLT_COLOR = (255, 255, 0)
+LINE_COLOR = (128, 128, 128)
+
+
+class PixelView(object):
+    """
+    A class representing a low-resolution picture of a wave.
+
+    The picture covers the whole window (GAME_WIDTH x GAME_HEIGHT), so each
+    pixel is a block of GAME_WIDTH/width by GAME_HEIGHT/height points of the
+    game.  Every draw reuses the same array.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _raster: the pixels of the picture
+    # Invariant: _raster is a GRaster covering the window
+    #
+    # Attribute _aliens: the texture of each alien image
+    # Invariant: _aliens is a list of GTexture, one for each of ALIEN_IMAGES
+    #
+    # Attribute _ship: the texture of the ship
+    # Invariant: _ship is a GTexture
+    #
+    # Attribute _bolt: the pixel value of a bolt
+    # Invariant: _bolt is a uint8 array with the channels of _raster
+    #
+    # Attribute _line: the pixel value of the defense line
+    # Invariant: _line is a uint8 array with the channels of _raster
+
+    # GETTERS
+    def getRaster(self):
+        """
+        Returns the GRaster that this view draws into.
+        """
+        return self._raster
+
+    # INITIALIZER
+    def __init__(self, width=GAME_WIDTH//5, height=GAME_HEIGHT//5, color=False):
+        """
+        Initializes the view, resizing the images to its resolution.
+
+        Parameter width: the number of pixel columns
+        Precondition: width is an int > 0
+
+        Parameter height: the number of pixel rows
+        Precondition: height is an int > 0
+
+        Parameter color: whether the pixels are colors (True) or gray levels
+        Precondition: color is a bool
+        """
+        self._raster = GRaster(width, height, GAME_WIDTH, GAME_HEIGHT, 3 if color else 1)
+        self._aliens = [self._raster.texture(name, IMAGE_DIRECTORY, ALIEN_WIDTH, ALIEN_HEIGHT)
+                        for name in ALIEN_IMAGES]
+        self._ship = self._raster.texture(SHIP_IMAGE, IMAGE_DIRECTORY, SHIP_WIDTH, SHIP_HEIGHT)
+        self._bolt = self._raster.color(BOLT_COLOR)
+        self._line = self._raster.color(LINE_COLOR)
+
+    # METHODS TO DRAW
+    def draw(self, sim):
+        """
+        Draws a wave, and returns the pixels (the buffer of the raster).
+
+        The result is the same array on every call, so copy it to keep it.
+
+        Parameter sim: the wave to draw
+        Precondition: sim is a Simulation object
+        """
+        raster = self._raster
+        raster.clear()
+        formation = sim.getFormation()
+        alive = formation.getAlive()
+        types = formation.getTypes()
+        for kind, texture in enumerate(self._aliens):
+            chosen = alive & (types == kind)
+            raster.blit_all(texture, formation.getX()[chosen], formation.getY()[chosen])
+        raster.blit(self._ship, sim.getShipX(), SHIP_BOTTOM + SHIP_HEIGHT/2.0)
+        raster.fill(0, DEFENSE_LINE, GAME_WIDTH, DEFENSE_LINE, self._line)
+        bolts = sim.getBolts()
+        alive = bolts.getAlive()
+        for x, y in zip(bolts.getX()[alive].tolist(), bolts.getY()[alive].tolist()):
+            raster.fill(x - BOLT_WIDTH/2.0, y - BOLT_HEIGHT/2.0,
+                        x + BOLT_WIDTH/2.0, y + BOLT_HEIGHT/2.0, self._bolt)
+        return raster.buffer
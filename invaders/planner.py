@@ -0,0 +1,485 @@
+"""
+Planning module for Alien Invaders
+
+This module contains the class Planner, a player that looks ahead with Monte
+Carlo tree search (MCTS).  Before each action it searches for a fixed time:
+every rollout restores a clone of the wave from a snapshot (see
+Simulation.snapshot), plays the actions of a path down the search tree and
+then a few more actions, and scores the kills and the lost lives.  The tree
+is open-loop: a node is a sequence of actions, not a state, and every
+rollout plays its path again from the root.  Half of the last actions are
+chosen by an Autopilot and half at random, which finds kills far sooner
+than random actions alone.  It then holds down the keys of the action it
+tried the most, through the same input methods as Autopilot, so it can play
+a Simulation, a Wave or the Invaders application.
+
+A clone is one restore of a small bytes object, so the search is limited by
+how fast the rules step rather than by copying.  The search may also run in
+worker processes: each worker searches its own tree from the same state
+with its own random numbers, and the planner adds up the visits of the
+actions at the root (root parallelization).  The rollouts per second of the
+last search are reported by getRate.
+
+A snapshot also holds the random numbers of the wave, which decide which
+alien fires next and when.  So that the planner does not see the real future,
+every restore reseeds the random numbers of the clone from those of the
+search: each rollout plays a sampled future instead.  (The tick of the next
+shot, drawn when the last shot was fired, is part of the state and is kept.)
+As the path is played again, the value of a node averages over the futures
+that its actions may lead to, rather than the one sampled when it was made.
+
+Like simulation.py, this module does not depend on the Kivy classes of game2d.
+"""
+from consts import *
+from simulation import Simulation
+from env import ACTIONS, ActionInput
+from batch import KILL_REWARD, LIFE_REWARD
+from autopilot import Autopilot
+from game2d.grandom import GRandom
+import multiprocessing
+import traceback
+import math
+import time
+
+# PRIMARY RULE: Planner can only access consts.py, simulation.py, env.py,
+# batch.py (for its constants), autopilot.py and the headless helpers of game2d.
+
+# The number of updates each planned action is held
+PLAN_TICKS = 8
+# The number of actions played at the end of a rollout
+HORIZON = 6
+# The chance that an action at the end of a rollout is that of an Autopilot
+# (instead of a random action)
+GUIDANCE = 0.5
+# The discount of the reward of each later action
+DISCOUNT = 0.95
+# The weight of exploration in the choice of a child (UCB1)
+EXPLORATION = 1.0
+# The largest seed drawn for a search
+SEED_LIMIT = 2**31-1
+# The input of each action
+INPUTS = tuple(ActionInput(keys) for keys in ACTIONS)
+
+
+class Planner(Autopilot):
+    """
+    A class representing a player that plans with Monte Carlo tree search.
+
+    Call think before each update, as with an Autopilot.  A new action is
+    planned every PLAN_TICKS updates, and its keys are held until the next.
+    The actions are those of InvadersEnv (see ACTIONS in env.py).
+
+    With workers, the searches run in worker processes that live as long as
+    the planner.  Call close (or use the planner in a with statement) to stop
+    them.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _budget: the seconds of each search
+    # Invariant: _budget is a float > 0
+    #
+    # Attribute _ticks: the number of updates each action is held
+    # Invariant: _ticks is an int > 0
+    #
+    # Attribute _left: the updates left before the next search
+    # Invariant: _left is an int in 0.._ticks
+    #
+    # Attribute _action: the last action chosen
+    # Invariant: _action is an int in 0..len(ACTIONS)-1
+    #
+    # Attribute _rng: the random numbers that seed each search
+    # Invariant: _rng is a GRandom object
+    #
+    # Attribute _scratch: the clone that the searches of this process restore
+    # Invariant: _scratch is a Simulation object
+    #
+    # Attribute _workers: the worker processes
+    # Invariant: _workers is a list of Process objects (empty to search here)
+    #
+    # Attribute _pipes: the parent end of the pipe to each worker
+    # Invariant: _pipes is a list of Connection objects, one per worker
+    #
+    # Attribute _rollouts: the number of rollouts of the last search
+    # Invariant: _rollouts is an int >= 0
+    #
+    # Attribute _seconds: the time taken by the last search
+    # Invariant: _seconds is a float >= 0
+
+    # GETTERS
+    def getBudget(self):
+        """
+        Returns the number of seconds of each search.
+        """
+        return self._budget
+
+    def getWorkers(self):
+        """
+        Returns the number of worker processes (0 if the search runs in this process).
+        """
+        return len(self._workers)
+
+    def getAction(self):
+        """
+        Returns the last action chosen, an index of ACTIONS.
+        """
+        return self._action
+
+    def getRollouts(self):
+        """
+        Returns the number of rollouts of the last search (of all workers).
+        """
+        return self._rollouts
+
+    def getRate(self):
+        """
+        Returns the rollouts per second of the last search (0 before the first).
+        """
+        return self._rollouts/self._seconds if self._seconds else 0.0
+
+    # INITIALIZER
+    def __init__(self, budget=0.05, workers=0, ticks=PLAN_TICKS, seed=None, pixel=False):
+        """
+        Initializes the planner, and starts its workers.
+
+        Parameter budget: the seconds of each search
+        Precondition: budget is a number > 0
+
+        Parameter workers: the number of worker processes (0 to search here)
+        Precondition: workers is an int >= 0
+
+        Parameter ticks: the number of updates each action is held
+        Precondition: ticks is an int > 0
+
+        Parameter seed: the seed of the random numbers of the search (None for
+        a random seed)
+        Precondition: seed is None or an int >= 0
+
+        Parameter pixel: whether bolts only hit opaque pixels (as in the wave played)
+        Precondition: pixel is a bool
+        """
+        assert type(budget) in (int, float) and budget > 0, \
+            repr(budget)+' is not a valid budget'
+        assert type(workers) == int and workers >= 0, \
+            repr(workers)+' is not a valid number of workers'
+        assert type(ticks) == int and ticks > 0, \
+            repr(ticks)+' is not a valid number of ticks'
+        Autopilot.__init__(self)
+        self._budget = float(budget)
+        self._ticks = ticks
+        self._left = 0
+        self._action = 0
+        self._rng = GRandom(seed)
+        self._scratch = Simulation(pixel)
+        self._rollouts = 0
+        self._seconds = 0.0
+        self._workers = []
+        self._pipes = []
+        for i in range(workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_work, daemon=True,
+                                              args=(child, ticks, pixel))
+            process.start()
+            child.close()
+            self._workers.append(process)
+            self._pipes.append(parent)
+
+    def __enter__(self):
+        """
+        Returns this planner, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, kind, value, trace):
+        """
+        Closes this planner at the end of a with statement.
+        """
+        self.close()
+
+    # METHODS TO PLAY
+    def think(self, sim):
+        """
+        Chooses the keys to play the next update of a wave.
+
+        Every PLAN_TICKS updates (the ticks given to the initializer), this
+        searches for a new action.  Otherwise it keeps the keys of the last.
+
+        Parameter sim: the wave to play
+        Precondition: sim is a Simulation object
+        """
+        if self._left == 0:
+            self.plan(sim)
+            self._left = self._ticks
+        self._left -= 1
+
+    def plan(self, sim):
+        """
+        Searches for the best action in the current state of a wave, and holds its keys.
+
+        The best action is the one visited the most at the root of the search.
+        This returns it (an index of ACTIONS).  If a worker fails, this raises
+        a RuntimeError once every worker has replied.
+
+        Parameter sim: the wave to play
+        Precondition: sim is a Simulation object, and the wave is not over
+        """
+        snapshot = sim.snapshot()
+        start = time.perf_counter()
+        if self._workers:
+            for pipe in self._pipes:
+                seed = self._rng.randint(0, SEED_LIMIT)
+                pipe.send(('plan', snapshot, self._budget, seed))
+            visits = [0]*len(ACTIONS)
+            rollouts = 0
+            # Read every reply before raising, so the next search is not
+            # answered by a reply to this one
+            replies = [pipe.recv() for pipe in self._pipes]
+            for reply in replies:
+                if reply[0] == 'error':
+                    raise RuntimeError('a planning worker failed:\n'+reply[1])
+            for reply in replies:
+                for action, count in enumerate(reply[1]):
+                    visits[action] += count
+                rollouts += reply[2]
+        else:
+            rng = GRandom(self._rng.randint(0, SEED_LIMIT))
+            visits, rollouts = search(self._scratch, snapshot, self._budget, rng,
+                                      self._ticks)
+        self._seconds = time.perf_counter()-start
+        self._rollouts = rollouts
+        self._action = max(range(len(ACTIONS)), key=lambda action: visits[action])
+        self._keys = ACTIONS[self._action]
+        return self._action
+
+    def close(self):
+        """
+        Stops the workers.
+
+        The planner may still search in this process after this.  Closing a
+        planner twice does nothing.
+        """
+        for pipe in self._pipes:
+            try:
+                pipe.send(('close',))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._workers:
+            process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+        for pipe in self._pipes:
+            pipe.close()
+        self._workers = []
+        self._pipes = []
+
+
+class _Node(object):
+    """
+    A class representing a sequence of actions in a search tree.
+
+    A node is made the first time its action is tried from its parent.  It
+    does not keep a state: each rollout through it plays the actions of its
+    path from the root, with the alien fire of that rollout.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute children: the node after each action (None if not tried)
+    # Invariant: children is a list with one entry for each of ACTIONS
+    #
+    # Attribute untried: the actions not tried yet from this node
+    # Invariant: untried is a list of indices of ACTIONS
+    #
+    # Attribute visits: the number of rollouts through this node
+    # Invariant: visits is an int >= 0
+    #
+    # Attribute total: the sum of the returns of the rollouts through this
+    # node, counted from the action into it
+    # Invariant: total is a float
+    __slots__ = ('children', 'untried', 'visits', 'total')
+
+    def __init__(self):
+        """
+        Initializes a node that has not been visited.
+        """
+        self.children = [None]*len(ACTIONS)
+        self.untried = list(range(len(ACTIONS)))
+        self.visits = 0
+        self.total = 0.0
+
+    def select(self):
+        """
+        Returns the action whose child has the highest UCB1 score.
+
+        Precondition: every action has been tried from this node
+        """
+        scale = EXPLORATION*(2*math.log(self.visits))**0.5
+        best = None
+        score = None
+        for action, child in enumerate(self.children):
+            value = child.total/child.visits + scale/child.visits**0.5
+            if score is None or value > score:
+                best = action
+                score = value
+        return best
+
+
+# HELPER FUNCTIONS
+def search(scratch, snapshot, budget, rng, ticks=PLAN_TICKS, limit=None):
+    """
+    Searches a state for a number of seconds, and returns (visits, rollouts).
+
+    The visits are the number of times the search went through each action
+    at the root, and the rollouts are the number of times it went down the
+    tree.  The search visits the tree at least once, however small the
+    budget.  Each rollout restores the snapshot, reseeds the random numbers
+    of the clone from rng, and plays the actions from the root down, so
+    every visit of a node plays a newly sampled future.  A rollout that ends
+    the wave stops there.
+
+    Parameter scratch: the clone to restore for each rollout
+    Precondition: scratch is a Simulation object (its state is lost)
+
+    Parameter snapshot: the state to search
+    Precondition: snapshot is a bytes object returned by Simulation.snapshot,
+    of a wave that is not over
+
+    Parameter budget: the seconds of the search
+    Precondition: budget is a number > 0
+
+    Parameter rng: the random numbers of the search
+    Precondition: rng is a GRandom object
+
+    Parameter ticks: the number of updates each action is held
+    Precondition: ticks is an int > 0
+
+    Parameter limit: the most rollouts to play (None for as many as the budget
+    allows).  A search with a limit it reaches in time is reproducible.
+    Precondition: limit is None or an int > 0
+    """
+    root = _Node()
+    deadline = time.perf_counter() + budget
+    pilot = Autopilot()
+    rollouts = 0
+    while rollouts == 0 or (rollouts != limit and time.perf_counter() < deadline):
+        scratch.restore(snapshot)
+        scratch.getRandom().seed(rng.randint(0, SEED_LIMIT))
+        node = root
+        path = []
+        rewards = []
+        over = False
+        expanded = False
+        while not over and not expanded:
+            if node.untried:
+                action = node.untried.pop(rng.randint(0, len(node.untried)-1))
+                node.children[action] = _Node()
+                expanded = True
+            else:
+                action = node.select()
+            node = node.children[action]
+            reward, over = _play(scratch, INPUTS[action], ticks)
+            path.append(node)
+            rewards.append(reward)
+        value = 0.0 if over else _rollout(scratch, rng, ticks, pilot)
+        for node, reward in zip(reversed(path), reversed(rewards)):
+            value = reward + DISCOUNT*value
+            node.visits += 1
+            node.total += value
+        root.visits += 1
+        rollouts += 1
+    visits = [0 if child is None else child.visits for child in root.children]
+    return (visits, rollouts)
+
+
+def _play(sim, held, ticks):
+    """
+    Plays the keys of an input for a number of updates, and returns (reward, over).
+
+    The reward is KILL_REWARD for each alien killed and LIFE_REWARD for each
+    life lost, and over is True if the wave ended (the action stops there).
+
+    Parameter sim: the wave to play
+    Precondition: sim is a Simulation object, and the wave is not over
+
+    Parameter held: the keys held down
+    Precondition: held has a method is_key_down(key)
+
+    Parameter ticks: the number of updates the keys are held
+    Precondition: ticks is an int > 0
+    """
+    lives = sim.getLives()
+    count = sim.getFormation().count()
+    dt = 1.0/UPDATE_RATE
+    over = False
+    for _ in range(ticks):
+        sim.update(held, dt)
+        if sim.player_won() or sim.getLives() <= 0:
+            over = True
+            break
+    killed = count - sim.getFormation().count()
+    lost = lives - sim.getLives()
+    return (KILL_REWARD*killed + LIFE_REWARD*lost, over)
+
+
+def _rollout(sim, rng, ticks, pilot):
+    """
+    Plays HORIZON actions, and returns their discounted reward.
+
+    Each action is that of the pilot (with chance GUIDANCE) or a random one.
+    The pilot chooses its keys once, at the start of the action.
+
+    Parameter sim: the wave to play
+    Precondition: sim is a Simulation object, and the wave is not over
+
+    Parameter rng: the random numbers of the actions
+    Precondition: rng is a GRandom object
+
+    Parameter ticks: the number of updates each action is held
+    Precondition: ticks is an int > 0
+
+    Parameter pilot: the scripted player of the guided actions
+    Precondition: pilot is an Autopilot object
+    """
+    value = 0.0
+    weight = 1.0
+    for _ in range(HORIZON):
+        if rng.random() < GUIDANCE:
+            pilot.think(sim)
+            held = pilot
+        else:
+            held = INPUTS[rng.randint(0, len(ACTIONS)-1)]
+        reward, over = _play(sim, held, ticks)
+        value += weight*reward
+        weight *= DISCOUNT
+        if over:
+            break
+    return value
+
+
+def _work(pipe, ticks, pixel):
+    """
+    Searches the states sent by a planner until it closes (the body of a worker process).
+
+    Parameter pipe: the worker end of the pipe to the planner
+    Precondition: pipe is a Connection object
+
+    Parameter ticks: the number of updates each action is held
+    Precondition: ticks is an int > 0
+
+    Parameter pixel: whether bolts only hit opaque pixels
+    Precondition: pixel is a bool
+    """
+    scratch = Simulation(pixel)
+    try:
+        while True:
+            message = pipe.recv()
+            if message[0] == 'close':
+                break
+            kind, snapshot, budget, seed = message
+            try:
+                visits, rollouts = search(scratch, snapshot, budget, GRandom(seed), ticks)
+            except Exception:
+                # Every search gets one reply, so the planner stays in step
+                pipe.send(('error', traceback.format_exc()))
+            else:
+                pipe.send(('done', visits, rollouts))
+    except (EOFError, BrokenPipeError, OSError, KeyboardInterrupt):
+        pass
+    finally:
+        pipe.close()
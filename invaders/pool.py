@@ -0,0 +1,392 @@
+"""
+Rollout pool module for Alien Invaders
+
+This module contains the class RolloutPool, which plays many games of Alien
+Invaders in worker processes.  Each worker plays its own share of the games
+with InvadersEnv (see env.py), so the games follow the rules of Simulation
+exactly, and the pool uses as many cores as it has workers.
+
+The actions, observations, rewards and done flags are not sent through pipes.
+They live in one block of shared memory that every process maps as NumPy
+arrays, so the only messages are a few small tuples per step.  The block is a
+ring of depth slots: the parent writes the actions of a step into a slot and
+asks the workers to play it, and each worker writes its results into the
+same slot.  Up to depth steps may be requested before the first is collected,
+so the workers can play the next step while the parent reads the last one.
+
+Like simulation.py, this module does not depend on game2d.
+"""
+from consts import *
+from env import InvadersEnv, OBSERVATION_SIZE
+from multiprocessing import shared_memory
+import multiprocessing
+import numpy as np
+import traceback
+import os
+
+# PRIMARY RULE: RolloutPool can only access consts.py and env.py.
+
+
+class RolloutPool(object):
+    """
+    A class representing a pool of worker processes playing games of Alien Invaders.
+
+    The games are numbered 0..size-1, and worker i plays the games i*games to
+    (i+1)*games-1.  The actions are those of InvadersEnv, and a game that ends
+    is reset in place (as in BatchEnv): its done flag is True and its
+    observation is the first one of the new game.
+
+    The arrays returned by collect and reset are views of the shared ring.
+    They stay valid until their slot is used again, depth requests later, so
+    copy them to keep them longer.  Call close (or use the pool in a with
+    statement) to stop the workers and free the shared memory.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _size: the number of games
+    # Invariant: _size is an int > 0
+    #
+    # Attribute _depth: the number of slots in the ring
+    # Invariant: _depth is an int > 0
+    #
+    # Attribute _memory: the shared block holding the ring
+    # Invariant: _memory is a SharedMemory object, or None once closed
+    #
+    # Attribute _actions: the action of each game in each slot
+    # Invariant: _actions is an int8 array of shape (depth, size)
+    #
+    # Attribute _obs: the observation of each game in each slot
+    # Invariant: _obs is a float32 array of shape (depth, size, OBSERVATION_SIZE)
+    #
+    # Attribute _rewards: the reward of each game in each slot
+    # Invariant: _rewards is a float32 array of shape (depth, size)
+    #
+    # Attribute _dones: the done flag of each game in each slot
+    # Invariant: _dones is a bool array of shape (depth, size)
+    #
+    # Attribute _workers: the worker processes
+    # Invariant: _workers is a list of Process objects
+    #
+    # Attribute _pipes: the parent end of the pipe to each worker
+    # Invariant: _pipes is a list of Connection objects, one per worker
+    #
+    # Attribute _next: the slot of the next request
+    # Invariant: _next is an int in 0..depth-1
+    #
+    # Attribute _pending: the number of requests not collected yet
+    # Invariant: _pending is an int in 0..depth
+    #
+    # Attribute _seed: the seed of the first reset
+    # Invariant: _seed is None or an int (it is None after the first reset)
+
+    # GETTERS
+    def getSize(self):
+        """
+        Returns the number of games in the pool.
+        """
+        return self._size
+
+    def getWorkers(self):
+        """
+        Returns the number of worker processes.
+        """
+        return len(self._workers)
+
+    def getDepth(self):
+        """
+        Returns the number of requests that may be pending at once.
+        """
+        return self._depth
+
+    def getPending(self):
+        """
+        Returns the number of requests that have not been collected.
+        """
+        return self._pending
+
+    # INITIALIZER
+    def __init__(self, workers=None, games=1, frameskip=4, repeat=None, depth=2,
+                 seed=None):
+        """
+        Initializes the pool and starts its workers.  Call reset to start the games.
+
+        Parameter workers: the number of worker processes (None for one per core)
+        Precondition: workers is None or an int > 0
+
+        Parameter games: the number of games played by each worker
+        Precondition: games is an int > 0
+
+        Parameter frameskip: the number of updates per step (see InvadersEnv)
+        Precondition: frameskip is an int > 0
+
+        Parameter repeat: the number of updates per step the action is held
+        (see InvadersEnv)
+        Precondition: repeat is None or an int in 1..frameskip
+
+        Parameter depth: the number of slots in the ring
+        Precondition: depth is an int > 0
+
+        Parameter seed: the seed of the first reset (None for a random seed)
+        Precondition: seed is None or an int >= 0
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        assert type(workers) == int and workers > 0, \
+            repr(workers)+' is not a valid number of workers'
+        assert type(games) == int and games > 0, \
+            repr(games)+' is not a valid number of games'
+        assert type(depth) == int and depth > 0, repr(depth)+' is not a valid depth'
+        self._size = workers*games
+        self._depth = depth
+        self._memory = shared_memory.SharedMemory(create=True,
+                                                  size=_nbytes(depth, self._size))
+        views = _views(self._memory.buf, depth, self._size)
+        self._actions, self._obs, self._rewards, self._dones = views
+        self._actions[:] = 0
+        self._next = 0
+        self._pending = 0
+        self._seed = seed
+        self._workers = []
+        self._pipes = []
+        for i in range(workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_work, daemon=True,
+                args=(child, self._memory.name, depth, self._size, i*games, games,
+                      frameskip, repeat))
+            process.start()
+            child.close()
+            self._workers.append(process)
+            self._pipes.append(parent)
+
+    def __enter__(self):
+        """
+        Returns this pool, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, kind, value, trace):
+        """
+        Closes this pool at the end of a with statement.
+        """
+        self.close()
+
+    # METHODS TO PLAY
+    def reset(self, seed=None):
+        """
+        Starts a new game everywhere, and returns the array of the first observations.
+
+        Any pending requests are collected (and dropped) first.  Game g is
+        seeded with seed+g, so after a seeded reset the same actions play the
+        same games, however many workers there are.  The first reset uses the
+        seed given to the initializer if seed is None.
+
+        Parameter seed: the seed of the games (None for the next seed of each
+        game, see InvadersEnv.reset)
+        Precondition: seed is None or an int >= 0
+        """
+        while self._pending:
+            self.collect()
+        if seed is None:
+            seed = self._seed
+        self._seed = None
+        self._request('reset', seed)
+        return self.collect()[0]
+
+    def submit(self, actions):
+        """
+        Asks the workers to play one step of every game, without waiting for them.
+
+        The step is played after every request before it.  Collect its results
+        with collect.
+
+        Parameter actions: the action of each game
+        Precondition: actions is a sequence of size ints in 0..len(ACTIONS)-1,
+        and fewer than depth requests are pending
+        """
+        assert self._pending < self._depth, 'the ring is full; collect a step first'
+        self._actions[self._next] = actions
+        self._request('step', None)
+
+    def collect(self):
+        """
+        Waits for the oldest pending request, and returns its results.
+
+        The results are the tuple (observations, rewards, dones).
+
+        If a worker failed to play the request, this raises a RuntimeError with
+        its traceback, but only once every worker has replied, so the requests
+        after it still line up with their replies.
+
+        Precondition: a request is pending
+        """
+        assert self._pending > 0, 'there is no pending step to collect'
+        slot = (self._next - self._pending) % self._depth
+        # Read every reply before raising, so the next request is not answered
+        # by a reply to this one
+        replies = [pipe.recv() for pipe in self._pipes]
+        self._pending -= 1
+        for reply in replies:
+            if reply[0] == 'error':
+                raise RuntimeError('a rollout worker failed:\n'+reply[1])
+            assert reply == ('done', slot), repr(reply)+' is out of order'
+        return (self._obs[slot], self._rewards[slot], self._dones[slot])
+
+    def step(self, actions):
+        """
+        Plays one step of every game, and returns (observations, rewards, dones).
+
+        Parameter actions: the action of each game
+        Precondition: actions is a sequence of size ints in 0..len(ACTIONS)-1,
+        and no requests are pending
+        """
+        assert self._pending == 0, 'collect the pending steps first'
+        self.submit(actions)
+        return self.collect()
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory.
+
+        The arrays returned by this pool may not be used after this.  Closing
+        a pool twice does nothing.
+        """
+        if self._memory is None:
+            return
+        for pipe in self._pipes:
+            try:
+                pipe.send(('close',))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._workers:
+            process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+        for pipe in self._pipes:
+            pipe.close()
+        self._actions = self._obs = self._rewards = self._dones = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+    # HIDDEN METHODS
+    def _request(self, kind, seed):
+        """
+        Sends a request for the next slot to every worker.
+
+        Parameter kind: the kind of request
+        Precondition: kind is 'step' or 'reset'
+
+        Parameter seed: the seed of a reset
+        Precondition: seed is None or an int >= 0
+        """
+        assert self._memory is not None, 'the pool is closed'
+        for pipe in self._pipes:
+            pipe.send((kind, self._next, seed))
+        self._next = (self._next + 1) % self._depth
+        self._pending += 1
+
+
+# HELPER FUNCTIONS
+def _nbytes(depth, size):
+    """
+    Returns the number of bytes of a ring.
+
+    Parameter depth: the number of slots in the ring
+    Precondition: depth is an int > 0
+
+    Parameter size: the number of games
+    Precondition: size is an int > 0
+    """
+    return depth*size*(1 + 4*OBSERVATION_SIZE + 4 + 1)
+
+
+def _views(buffer, depth, size):
+    """
+    Returns the arrays (actions, observations, rewards, dones) of a ring.
+
+    Every process makes the same arrays over the same block, so they share the data.
+
+    Parameter buffer: the memory of the ring
+    Precondition: buffer is a buffer of _nbytes(depth, size) bytes
+
+    Parameter depth: the number of slots in the ring
+    Precondition: depth is an int > 0
+
+    Parameter size: the number of games
+    Precondition: size is an int > 0
+    """
+    # The float arrays come first so that they are aligned
+    count = depth*size
+    obs = np.ndarray((depth, size, OBSERVATION_SIZE), np.float32, buffer, 0)
+    offset = 4*count*OBSERVATION_SIZE
+    rewards = np.ndarray((depth, size), np.float32, buffer, offset)
+    offset += 4*count
+    actions = np.ndarray((depth, size), np.int8, buffer, offset)
+    offset += count
+    dones = np.ndarray((depth, size), np.bool_, buffer, offset)
+    return (actions, obs, rewards, dones)
+
+
+def _work(pipe, name, depth, size, first, games, frameskip, repeat):
+    """
+    Plays the games of one worker until the pool closes (the body of a worker process).
+
+    Parameter pipe: the worker end of the pipe to the pool
+    Precondition: pipe is a Connection object
+
+    Parameter name: the name of the shared ring
+    Precondition: name is the name of a SharedMemory block
+
+    Parameter depth: the number of slots in the ring
+    Precondition: depth is an int > 0
+
+    Parameter size: the number of games in the pool
+    Precondition: size is an int > 0
+
+    Parameter first: the first game of this worker
+    Precondition: first is an int in 0..size-games
+
+    Parameter games: the number of games of this worker
+    Precondition: games is an int > 0
+
+    Parameter frameskip: the number of updates per step
+    Precondition: frameskip is an int > 0
+
+    Parameter repeat: the number of updates per step the action is held
+    Precondition: repeat is None or an int in 1..frameskip
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    actions, obs, rewards, dones = _views(memory.buf, depth, size)
+    mine = slice(first, first+games)
+    envs = [InvadersEnv(frameskip, repeat) for _ in range(games)]
+    try:
+        while True:
+            message = pipe.recv()
+            if message[0] == 'close':
+                break
+            kind, slot, seed = message
+            try:
+                if kind == 'reset':
+                    for g, env in enumerate(envs):
+                        game = first+g
+                        obs[slot, game] = env.reset(None if seed is None else seed+game)
+                    rewards[slot, mine] = 0
+                    dones[slot, mine] = False
+                else:
+                    for g, env in enumerate(envs):
+                        result, reward, done, info = env.step(int(actions[slot, first+g]))
+                        if done:
+                            result = env.reset()
+                        obs[slot, first+g] = result
+                        rewards[slot, first+g] = reward
+                        dones[slot, first+g] = done
+            except Exception:
+                # Every request gets one reply, so the pool stays in step
+                pipe.send(('error', traceback.format_exc()))
+            else:
+                pipe.send(('done', slot))
+    except (EOFError, BrokenPipeError, OSError, KeyboardInterrupt):
+        pass
+    finally:
+        del actions, obs, rewards, dones
+        memory.close()
+        pipe.close()
@@ -0,0 +1,517 @@
+"""
+Headless simulation module for Alien Invaders
+
+This module contains the game rules for a single wave of Alien Invaders: the
+ship, the marching aliens, the laser bolts, and the collisions between them.
+Nothing in this module depends on the Kivy classes of game2d, and importing
+the headless helpers of game2d does not load Kivy (even when it is
+installed), so a wave can be stepped without a Kivy window, textures or an
+audio device.  This is what we use for balancing runs and soak tests.
+
+The class Wave in wave.py is a thin view adapter over Simulation.  It owns the
+GImage and GRectangle objects, copies their positions from the simulation when
+it draws, and plays the sounds that the simulation asks for.
+"""
+from consts import *
+from formation import *
+from bolts import *
+from events import *
+from trajectory import *
+from game2d.gmask import load_mask
+from game2d.gtimer import GTimerWheel
+from game2d.grandom import GRandom
+import numpy as np
+import struct
+import os
+
+# PRIMARY RULE: Simulation can only access consts.py, formation.py, bolts.py,
+# events.py, trajectory.py and the headless helpers of game2d.  It is NOT
+# allowed to access the drawing classes of game2d, models.py or wave.py
+# (those depend on Kivy).
+
+# The number of updates (at UPDATE_RATE) between alien steps
+STEP_TICKS = max(1, int(round(ALIEN_SPEED*UPDATE_RATE)))
+# The order of the timers that fall on the same tick (steps before fire)
+STEP_PRIORITY = 0
+FIRE_PRIORITY = 1
+# The folder with the image files (for the collision masks)
+IMAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Images')
+# The fixed part of a snapshot (see Simulation.snapshot): the ship x and
+# previous x, the scale, the clock, the position of the formation, the start
+# of its march (left, right, lowest, direction), the direction, the lives, the
+# steps marched, the timer tick, the tick of the next step and shot (-1 for
+# none), and the number of bolts
+SNAPSHOT_HEADER = struct.Struct('<9d2bi4qI')
+
+
+class Simulation(object):
+    """
+    This class simulates a single level or wave of Alien Invaders.
+
+    It follows the same rules as the original Wave controller: the ship moves
+    and fires with the keyboard, the aliens march back and forth across the
+    screen and step down at the edges, a random bottom alien fires every few
+    steps, and the wave is over when the aliens are all destroyed or reach
+    the defense line.
+
+    The method update takes any input object with an is_key_down method, so
+    it may be a GInput or a scripted replacement.  Sounds are not played
+    here.  Instead, every update emits the events of the update (BoltFired,
+    AlienKilled and ShipHit) into a buffer (see getEvents), and whoever owns
+    the simulation drains the buffer to the subscribers after the update.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _shipx: the horizontal coordinate of the ship center
+    # Invariant: _shipx is an int or float in 0..GAME_WIDTH
+    #
+    # Attribute _shipprev: the horizontal coordinate of the ship center before
+    # the last update
+    # Invariant: _shipprev is an int or float in 0..GAME_WIDTH
+    #
+    # Attribute _scale: the length of the last update, in updates at UPDATE_RATE
+    # Invariant: _scale is an int or float >= 0
+    #
+    # Attribute _aliens: the table of aliens in the wave
+    # Invariant: _aliens is a Formation object
+    #
+    # Attribute _bolts: the laser bolts currently on screen
+    # Invariant: _bolts is a BoltBuffer object
+    #
+    # Attribute _lives: the number of lives left
+    # Invariant: _lives is an int (<= 0 once the player has lost)
+    #
+    # Attribute _clock: the time since the wave started, in updates at UPDATE_RATE
+    # Invariant: _clock is an int or float >= 0
+    #
+    # Attribute _timers: the scheduled alien steps and alien fire
+    # Invariant: _timers is a GTimerWheel whose ticks are updates at UPDATE_RATE
+    # (tick 0 is the start of the wave)
+    #
+    # Attribute _steptimer, _firetimer: the timers of the next alien step and
+    # the next alien shot
+    # Invariant: _steptimer and _firetimer are GTimer objects of _timers (they
+    # are no longer active once the wave is won)
+    #
+    # Attribute _direction: specifies the direction in which the aliens are traveling
+    # Invariant: _direction is 1 (right) or -1 (left)
+    #
+    # Attribute _march: the march of the aliens since the extents last changed
+    # Invariant: _march is a Trajectory object
+    #
+    # Attribute _marched: the number of steps taken along _march
+    # Invariant: _marched is an int >= 0
+    #
+    # Attribute _bounds: the extents of the formation when _march was made
+    # Invariant: _bounds is a triple of ints (see Formation.bounds)
+    #
+    # Attribute _events: the bus with the events of the last update
+    # Invariant: _events is an EventBus object
+    #
+    # Attribute _rng: the random numbers of the wave (alien fire)
+    # Invariant: _rng is a GRandom object
+    #
+    # Attribute _masks: the collision masks of the ship and aliens
+    # Invariant: _masks is None for box collisions, or a dict from
+    # SHIP_IMAGE and every name in ALIEN_IMAGES to a GMask
+
+    # GETTERS AND SETTERS
+    def getLives(self):
+        return self._lives
+
+    def setLives(self, decrease):
+        self._lives = self._lives - decrease
+
+    def getShipX(self):
+        """
+        Returns the horizontal coordinate of the ship center.
+        """
+        return self._shipx
+
+    def getShipPrevious(self):
+        """
+        Returns the horizontal coordinate of the ship center before the last update.
+        """
+        return self._shipprev
+
+    def getScale(self):
+        """
+        Returns the length of the last update, measured in updates at UPDATE_RATE.
+
+        A bolt moved by its velocity times this value in the last update.
+        """
+        return self._scale
+
+    def getDirection(self):
+        """
+        Returns the direction the aliens are marching (1 for right, -1 for left).
+        """
+        return self._direction
+
+    def getFormation(self):
+        """
+        Returns the Formation with the aliens of this wave.
+
+        The formation is owned by the simulation and should not be modified.
+        """
+        return self._aliens
+
+    def getBolts(self):
+        """
+        Returns the BoltBuffer with the laser bolts currently on screen.
+
+        Bolts that hit something during the last update are still in the
+        buffer, but are no longer alive.  The buffer is owned by the
+        simulation and should not be modified.
+        """
+        return self._bolts
+
+    def getRandom(self):
+        """
+        Returns the GRandom with the random numbers of this wave.
+        """
+        return self._rng
+
+    def getEvents(self):
+        """
+        Returns the EventBus with the events of the last update.
+
+        Each update starts by discarding the events that were not drained,
+        so the buffer only ever holds the events of one update.
+        """
+        return self._events
+
+    # INITIALIZER
+    def __init__(self, pixel=PIXEL_COLLISIONS, seed=None):
+        """
+        Initializes the ship, aliens and bolts.
+
+        Every wave has its own random numbers, so two waves with the same seed
+        play the same way (given the same input), whatever else the process
+        is doing.
+
+        Parameter pixel: whether bolts only hit the opaque pixels of the ship
+        and aliens (the masks are read from the image files, once per name)
+        Precondition: pixel is a bool
+
+        Parameter seed: the seed of the random numbers (None for a random seed)
+        Precondition: seed is None or an int >= 0
+        """
+        self._shipx = GAME_WIDTH//2
+        self._shipprev = self._shipx
+        self._scale = 1
+        self._aliens = Formation()
+        self._direction = 1
+        self._retrace()
+        self._rng = GRandom(seed)
+        self._clock = 0
+        self._timers = GTimerWheel()
+        self._steptimer = self._timers.schedule(STEP_TICKS, self.alien_step, STEP_PRIORITY)
+        self._firetimer = self._timers.schedule(STEP_TICKS*(self._rng.randint(1,BOLT_RATE)+1),
+        self.alien_fire, FIRE_PRIORITY)
+        self._bolts = BoltBuffer()
+        self._lives = SHIP_LIVES
+        self._events = EventBus()
+        self._masks = None
+        if pixel:
+            self._masks = {name: load_mask(name, IMAGE_DIRECTORY)
+                           for name in (SHIP_IMAGE,)+tuple(ALIEN_IMAGES)}
+
+    # UPDATE METHOD TO MOVE THE SHIP, ALIENS, AND LASER BOLTS
+    def update(self,input,dt):
+        """
+        Advances the wave by one update.
+
+        The ship and the bolts move in proportion to dt, so the game runs at
+        the same speed whatever the number of updates per second.  The alien
+        steps and alien fire are timers that fire when the clock passes their
+        deadlines (see alien_step and alien_fire).
+
+        Parameter input: the keyboard state
+        Precondition: input has a method is_key_down(key)
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        self._events.clear()
+        self._scale = dt*UPDATE_RATE
+        self.ship_update(input)
+        self.bolt_update(input)
+        self.collision()
+        self.shipcollision()
+        self._clock += self._scale
+        # The epsilon keeps float sums of dt from landing just short of a tick
+        self._timers.advance(int(self._clock + 1e-6))
+
+    def untilNextEvent(self):
+        """
+        Returns the time in seconds until the next alien step or alien fire.
+
+        Nothing but the ship and the bolts changes before then, so a headless
+        run with no bolts on screen may skip straight to it.  This returns
+        None once the wave is won (nothing is scheduled any more).
+        """
+        ticks = self._timers.next()
+        if ticks is None:
+            return None
+        return max(ticks - self._clock, 0)/UPDATE_RATE
+
+    def alien_step(self):
+        """
+        Moves the aliens one step, and schedules the next step. Called by the timers.
+
+        The next step is STEP_TICKS after this one was due (not after the
+        update that ran it), so the cadence does not drift.
+        """
+        if not self.player_won():
+            self.alien_update()
+            self._steptimer = self._timers.schedule(STEP_TICKS, self.alien_step, STEP_PRIORITY)
+
+    def alien_fire(self):
+        """
+        Fires a bolt from a random bottom alien, and schedules the next shot.
+
+        The shot falls on an alien step, BOLT_RATE steps after the last one
+        at most.  Called by the timers.
+        """
+        if not self.player_won():
+            row, col = self.random_alien()
+            x = float(self._aliens.getX()[row,col])
+            y = float(self._aliens.getY()[row,col])
+            self._bolts.fire(x, y, -BOLT_SPEED)
+            self._events.emit(BoltFired(x, y, False))
+            self._firetimer = self._timers.schedule(STEP_TICKS*(self._rng.randint(1,BOLT_RATE)+1),
+            self.alien_fire, FIRE_PRIORITY)
+
+    # METHODS TO SAVE AND RESTORE THE WAVE
+    def snapshot(self):
+        """
+        Returns the complete state of the wave as a bytes object.
+
+        The state is everything that the rules read: the ship, the position
+        and alive flags of the formation, the march, the bolts, the lives, the
+        clock and timers, and the state of the random numbers.  It is about a
+        hundred bytes plus 25 per bolt, and restore puts it back in any
+        Simulation with the same collision setting.  The events of the last
+        update are not saved.
+        """
+        aliens = self._aliens
+        bolts = self._bolts
+        n = bolts.count()
+        left, right, lowest, start = self._march.start()
+        header = SNAPSHOT_HEADER.pack(self._shipx, self._shipprev, self._scale,
+            self._clock, aliens.getX()[0,0], aliens.getY()[0,0], left, right, lowest,
+            start, self._direction, self._lives, self._marched, self._timers.now,
+            self._steptimer.tick if self._steptimer.active else -1,
+            self._firetimer.tick if self._firetimer.active else -1, n)
+        return b''.join((header, np.packbits(aliens.getAlive()).tobytes(),
+            bolts.getX().tobytes(), bolts.getY().tobytes(),
+            bolts.getVelocity().tobytes(), bolts.getAlive().tobytes(),
+            self._rng.getstate()))
+
+    def restore(self, snapshot):
+        """
+        Puts the wave back in the state of a snapshot.
+
+        The formation, bolts and timers are updated in place, so this is much
+        faster than making a new Simulation.  This also restores the random
+        numbers, so the wave plays on exactly as it did after the snapshot
+        was taken.
+
+        Parameter snapshot: the state to restore
+        Precondition: snapshot is a bytes object returned by snapshot
+        """
+        (self._shipx, self._shipprev, self._scale, self._clock, x, y, left, right,
+         lowest, start, self._direction, self._lives, self._marched, now, step,
+         fire, n) = SNAPSHOT_HEADER.unpack_from(snapshot)
+        shape = self._aliens.getShape()
+        offset = SNAPSHOT_HEADER.size
+        size = (shape[0]*shape[1]+7)//8
+        bits = np.frombuffer(snapshot, np.uint8, size, offset)
+        alive = np.unpackbits(bits, count=shape[0]*shape[1]).reshape(shape)
+        self._aliens.restore(x, y, alive.view(bool))
+        offset += size
+        arrays = []
+        for dtype in (np.float64, np.float64, np.float64, np.bool_):
+            arrays.append(np.frombuffer(snapshot, dtype, n, offset))
+            offset += arrays[-1].nbytes
+        self._bolts.restore(*arrays)
+        self._rng.setstate(snapshot[offset:])
+
+        self._bounds = self._aliens.bounds()
+        self._march = Trajectory(left, right, lowest, start)
+        self._timers.clear(now)
+        if step >= 0:
+            self._steptimer = self._timers.schedule(step-now, self.alien_step, STEP_PRIORITY)
+        if fire >= 0:
+            self._firetimer = self._timers.schedule(fire-now, self.alien_fire, FIRE_PRIORITY)
+        self._events.clear()
+
+    def ship_update(self, input):
+        """
+        Method for updating the ship. Called by update.
+        """
+        da = 0
+        if input.is_key_down('right'):
+            da += SHIP_MOVEMENT
+        if input.is_key_down('left'):
+            da -= SHIP_MOVEMENT
+        self._shipprev = self._shipx
+        newpos = self._shipx + da*self._scale
+        if newpos > GAME_WIDTH:
+            newpos = 0
+        if newpos < 0:
+            newpos = GAME_WIDTH                     #Ship may wrap-around screen
+        self._shipx = newpos
+
+    def _shipbox(self):
+        """
+        Returns the bounding box (left, bottom, right, top) of the ship.
+        """
+        return (self._shipx - SHIP_WIDTH/2.0, SHIP_BOTTOM,
+                self._shipx + SHIP_WIDTH/2.0, SHIP_BOTTOM + SHIP_HEIGHT)
+
+    def _shipmask(self, i):
+        """
+        Returns True if the path of alien bolt i overlaps an opaque pixel of the ship.
+
+        Parameter i: the bolt index
+        Precondition: i is an int in 0..count()-1 of the bolt buffer
+        """
+        x = float(self._bolts.getX()[i])
+        lows, highs = self._bolts.swept(self._scale)
+        return self._masks[SHIP_IMAGE].overlaps(self._shipx,
+        SHIP_BOTTOM + SHIP_HEIGHT/2.0, SHIP_WIDTH, SHIP_HEIGHT,
+        (x - BOLT_WIDTH/2.0, float(lows[i]), x + BOLT_WIDTH/2.0, float(highs[i])))
+
+    def alien_update(self):
+        """
+        Method for updating the aliens. Called by alien_step.
+        """
+        self.march(1)
+
+    def march(self, steps):
+        """
+        Moves the aliens forward a number of steps along their march.
+
+        The position is read from the trajectory of the formation, so this
+        takes the same time for any number of steps.  It is the same as
+        calling alien_update steps times, as long as no alien dies meanwhile.
+
+        Parameter steps: the number of steps to take
+        Precondition: steps is an int >= 0
+        """
+        dx0, dy0, _ = self._march.offset(self._marched)
+        self._marched += steps
+        dx1, dy1, self._direction = self._march.offset(self._marched)
+        if dx1 != dx0 or dy1 != dy0:
+            self._aliens.move(dx1-dx0, dy1-dy0)
+
+    def _retrace(self):
+        """
+        Starts a new trajectory for the aliens from where they are now.
+
+        This is called whenever a kill changes the extents of the formation.
+        """
+        self._bounds = self._aliens.bounds()
+        self._march = Trajectory(self.left_alien(), self.right_alien(),
+        self.lowest_alien(), self._direction)
+        self._marched = 0
+
+    def right_alien(self):
+        """
+        Finds the x-value of the rightmost alien and returns the value.
+        """
+        return self._aliens.right()
+
+    def left_alien(self):
+        """
+        Finds the x-value of the leftmost alien and returns the value.
+        """
+        return self._aliens.left()
+
+    def lowest_alien(self):
+        """
+        Finds the lowest alien and returns the y-value.
+        """
+        return self._aliens.lowest()
+
+    def bolt_update(self, input):
+        """
+        Fires a player bolt (if allowed) and moves the bolts.
+
+        All bolts are moved and culled off screen in one pass over the buffer.
+        """
+        if input.is_key_down('spacebar') and self.num_player_bolts() < 1:
+            y = BOLT_HEIGHT//2 + SHIP_HEIGHT + SHIP_BOTTOM
+            self._bolts.fire(self._shipx, y, BOLT_SPEED)
+            self._events.emit(BoltFired(self._shipx, y, True))
+        self._bolts.advance(self._scale)
+
+    def num_player_bolts(self):
+        """
+        Returns the number of player bolts on screen.
+        """
+        return self._bolts.players()
+
+    def random_alien(self):
+        """
+        Returns the (row, col) of a random bottom alien to fire a bolt.
+        """
+        return self._rng.choice(self._aliens.frontline())
+
+    def collision(self):
+        """
+        Removes alien (and the bolt) if hit by ship bolt
+
+        A bolt hits the first alien on the path it swept during this update,
+        so it cannot pass through an alien when the update is long.  With
+        collision masks, the aliens whose boxes overlap the path are checked
+        against the mask of their image as well.
+        """
+        if self._bolts.players() == 0:
+            return
+        xs = self._bolts.getX()
+        lows, highs = self._bolts.swept(self._scale)
+        for i in np.flatnonzero(self._bolts.getOwner() & self._bolts.getAlive()).tolist():
+            x = float(xs[i])
+            box = (x - BOLT_WIDTH/2.0, float(lows[i]), x + BOLT_WIDTH/2.0, float(highs[i]))
+            accept = None
+            if self._masks is not None:
+                accept = lambda row, col: self._masks[
+                    ALIEN_IMAGES[self._aliens.getTypes()[row,col]]].overlaps(
+                    self._aliens.getX()[row,col], self._aliens.getY()[row,col],
+                    ALIEN_WIDTH, ALIEN_HEIGHT, box)
+            cell = self._aliens.hit(box[0], box[2], box[1], box[3], accept)
+            if cell is not None:
+                self._aliens.kill(cell[0], cell[1])
+                if self._aliens.bounds() != self._bounds and self._aliens.count() > 0:
+                    self._retrace()
+                self._bolts.kill(i)
+                self._events.emit(AlienKilled(cell[0], cell[1], self._aliens.count()))
+
+    def shipcollision(self):
+        """
+        Ship loses life if hit by alien bolt
+
+        The box of the ship is checked against the swept paths of all alien
+        bolts at once.  There is only one target, so a broad phase would only
+        add work.
+        """
+        if self._bolts.aliens() > 0:
+            hits = self._bolts.overlapping(*self._shipbox(), player=False,
+                                           scale=self._scale)
+            if self._masks is not None:
+                hits = [i for i in hits if self._shipmask(i)]
+            for i in hits:
+                self._bolts.kill(i)
+                self.setLives(1)
+                self._events.emit(ShipHit(1, self._lives))
+        if self.lowest_alien() <= DEFENSE_LINE + ALIEN_HEIGHT//2:
+            self.setLives(3)
+            self._events.emit(ShipHit(3, self._lives))
+
+    def player_won(self):
+        """
+        returns True if the player has won the game
+        """
+        return self._aliens.count() == 0
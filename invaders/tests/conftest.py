@@ -0,0 +1,11 @@
+"""
+Test configuration for Alien Invaders
+
+The modules of the game are flat files that import each other by name (as
+they do when the game is run from its folder), so the tests put that folder
+first on the path.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,79 @@
+"""
+Tests for the scripted player of autopilot.py
+
+The autopilot must be usable wherever a keyboard is, must get out of the way
+of an alien bolt about to hit the ship, and must play the game well enough to
+make progress.  A soak run must be reproducible from its seed.
+"""
+from consts import *
+from simulation import Simulation
+from env import ActionInput
+from autopilot import Autopilot, SHIP_TOP, soak
+import tracemalloc
+import pytest
+
+
+def test_holds_keys_like_an_action_input():
+    pilot = Autopilot()
+    assert isinstance(pilot, ActionInput)
+    assert pilot.key_count == 0 and pilot.keys == []
+    pilot.hold('s')
+    assert pilot.keys == ['s'] and pilot.is_key_down('s')
+    assert not pilot.is_key_down('c')
+    pilot.hold()
+    assert pilot.key_count == 0
+
+
+@pytest.mark.parametrize('side', (-1, 1))
+def test_moves_away_from_a_bolt_about_to_hit(side):
+    sim = Simulation(seed=0)
+    x = sim.getShipX()
+    sim.getBolts().fire(x + side*SHIP_WIDTH/4.0, SHIP_TOP + BOLT_HEIGHT/2.0 + BOLT_SPEED,
+                        -BOLT_SPEED)
+    pilot = Autopilot()
+    pilot.think(sim)
+    assert pilot.is_key_down('left' if side > 0 else 'right')
+    assert not pilot.is_key_down('left' if side < 0 else 'right')
+
+
+def test_ignores_a_bolt_far_to_the_side():
+    sim = Simulation(seed=0)
+    x = sim.getShipX()
+    sim.getBolts().fire(x + 3*SHIP_WIDTH, SHIP_TOP + BOLT_HEIGHT/2.0 + BOLT_SPEED,
+                        -BOLT_SPEED)
+    pilot = Autopilot()
+    assert pilot._threat(sim, x) is None
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_plays_a_wave(seed):
+    sim = Simulation(seed=seed)
+    pilot = Autopilot()
+    start = sim.getFormation().count()
+    for _ in range(20*UPDATE_RATE):
+        players = sim.getBolts().players()
+        pilot.think(sim)
+        assert not (players and pilot.is_key_down('spacebar'))
+        sim.update(pilot, 1.0/UPDATE_RATE)
+        if sim.player_won() or sim.getLives() <= 0:
+            break
+    assert sim.getFormation().count() < start
+
+
+def test_soak_is_reproducible():
+    first = soak(6000, seed=5, window=2000)
+    second = soak(6000, seed=5, window=2000)
+    assert [tick for tick, _, _, _ in first] == [2000, 4000, 6000]
+    assert [waves for _, _, _, waves in first] == [waves for _, _, _, waves in second]
+    assert first[-1][3] > 0
+    assert all(seconds > 0 and memory is None for _, seconds, memory, _ in first)
+
+
+def test_soak_measures_memory_when_tracing():
+    tracemalloc.start()
+    try:
+        result = soak(250, seed=1, window=100)
+    finally:
+        tracemalloc.stop()
+    assert [tick for tick, _, _, _ in result] == [100, 200, 250]
+    assert all(type(memory) == int and memory > 0 for _, _, memory, _ in result)
@@ -0,0 +1,91 @@
+"""
+Tests for the lock-step games of batch.py
+
+A game in a BatchEnv must play exactly like a Simulation (as played by
+InvadersEnv) given the same keys and the same random choices, and observe
+it the same way.  The two draw their random numbers in different ways, so
+both are given the same script of alien fire here.
+"""
+from consts import *
+from batch import *
+from env import ACTIONS, InvadersEnv
+import simulation
+import numpy as np
+import random
+import pytest
+
+# The keys of each column of a batch action
+KEYS = ('left', 'right', 'spacebar')
+
+
+class Script(object):
+    """
+    A scripted stand-in for GRandom: fire delays and columns from fixed lists.
+    """
+
+    def __init__(self, delays, columns):
+        self.delays = iter(delays)
+        self.columns = iter(columns)
+
+    def randint(self, a, b):
+        return next(self.delays)
+
+    def choice(self, seq):
+        return seq[next(self.columns) % len(seq)]
+
+
+class ScriptedBatch(BatchEnv):
+    """
+    A batch of one game that fires from the same script as a Simulation.
+    """
+
+    def __init__(self, delays, columns):
+        self.script = Script(delays, columns)
+        BatchEnv.__init__(self, 1)
+
+    def _fire_delay(self, n):
+        return np.array([self.script.randint(1, BOLT_RATE) for _ in range(n)])
+
+    def _fire_column(self, colany):
+        return np.array([np.flatnonzero(row)[next(self.script.columns) % row.sum()]
+                         for row in colany])
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_batch_plays_like_simulation(monkeypatch, seed):
+    rng = random.Random(seed)
+    delays = [rng.randint(1, BOLT_RATE) for _ in range(10000)]
+    columns = [rng.randrange(ALIENS_IN_ROW) for _ in range(10000)]
+    monkeypatch.setattr(simulation, 'GRandom', lambda seed: Script(delays, columns))
+    env = InvadersEnv(1)
+    batch = ScriptedBatch(delays, columns)
+    assert np.array_equal(env.reset(), batch.observe()[0])
+    action = 0
+    kills = hits = 0
+    for tick in range(20000):
+        if tick % 15 == 0:
+            action = rng.randrange(len(ACTIONS))
+        keys = np.array([[key in ACTIONS[action] for key in KEYS]])
+        obs, reward, done, info = env.step(action)
+        observations, rewards, dones = batch.step(keys)
+        assert reward == rewards[0] and done == dones[0], tick
+        if done:
+            break
+        assert np.array_equal(obs, observations[0]), tick
+        kills += reward == KILL_REWARD
+        hits += reward == LIFE_REWARD
+    else:
+        pytest.fail('the game did not end')
+    # The games must have got far enough to test the kills and the ship hits
+    assert kills > 0 and hits > 0
+
+
+def test_reset_only_restarts_the_given_games():
+    batch = BatchEnv(3, 16)
+    for _ in range(200):
+        batch.step(np.array([[False, True, True]]*3))
+    before = batch.observe().copy()
+    observations = batch.reset(np.array([False, True, False]))
+    assert observations is batch.observe()
+    assert np.array_equal(observations[[0, 2]], before[[0, 2]])
+    assert np.array_equal(observations[1], BatchEnv(1).observe()[0])
@@ -0,0 +1,90 @@
+"""
+Tests for the feature tables of features.py
+
+A table must hold the current state of a wave after every update, with the
+observation of BatchEnv as its first field and no old bolts left behind.
+"""
+from consts import *
+from features import *
+from formation import ROW_PITCH
+from simulation import Simulation
+from env import ACTIONS, ActionInput, InvadersEnv
+import numpy as np
+import random
+
+
+def frontline(sim):
+    """
+    Returns the frontline heights of a wave, computed from its alive flags.
+    """
+    formation = sim.getFormation()
+    result = np.zeros(ALIENS_IN_ROW, dtype=np.float32)
+    for col in range(ALIENS_IN_ROW):
+        rows = np.flatnonzero(formation.getAlive()[:,col])
+        if len(rows):
+            result[col] = formation.getY()[rows[0],col]
+    return result
+
+
+def test_update_matches_the_wave():
+    rng = random.Random(22)
+    sim = Simulation(False, 22)
+    table = FeatureTable(3)
+    seen = 0
+    for tick in range(6000):
+        sim.update(ActionInput(ACTIONS[rng.randrange(len(ACTIONS))]), 1.0/UPDATE_RATE)
+        if sim.player_won() or sim.getLives() <= 0:
+            break
+        table.update(sim, 1)
+        bolts = sim.getBolts()
+        alive = np.flatnonzero(bolts.getAlive())
+        seen = max(seen, len(alive))
+        assert table.getShipX()[1] == np.float32(sim.getShipX())
+        assert table.getLives()[1] == sim.getLives()
+        assert table.getDirection()[1] == sim.getDirection()
+        assert (table.getAlive()[1] == sim.getFormation().getAlive()).all()
+        assert np.array_equal(table.getFrontline()[1], frontline(sim)), tick
+        n = len(alive)
+        assert table.getBoltValid()[1].tolist() == [True]*n + [False]*(BOLT_SLOTS-n)
+        assert np.array_equal(table.getBoltX()[1,:n], bolts.getX()[alive].astype(np.float32))
+        assert np.array_equal(table.getBoltY()[1,:n], bolts.getY()[alive].astype(np.float32))
+        assert np.array_equal(table.getBoltVelocity()[1,:n],
+                              bolts.getVelocity()[alive].astype(np.float32))
+        # Empty slots are cleared, not left with the bolts that were there
+        assert not table.getBoltX()[1,n:].any() and not table.getBoltY()[1,n:].any()
+        assert not table.getBoltVelocity()[1,n:].any()
+    assert seen > 1
+    # The other records are not touched
+    assert not table.getObservations()[[0, 2]].any()
+
+
+def test_observation_is_the_env_observation():
+    env = InvadersEnv(2)
+    rng = random.Random(23)
+    obs = env.reset(23)
+    table = env.getFeatures()
+    assert obs.shape == (OBSERVATION_SIZE,)
+    assert np.shares_memory(obs, table.getTable())
+    for _ in range(500):
+        obs, reward, done, info = env.step(rng.randrange(len(ACTIONS)))
+        if done:
+            break
+        record = table.getObservations()[0]
+        assert np.array_equal(obs, record)
+        # The named fields are views of the same observation
+        sim = env.getSimulation()
+        assert table.getBolt()[0,0] == (sim.getBolts().players() > 0)
+        assert table.getAlienBolts()[0,:,0].sum() == sim.getBolts().aliens()
+        assert np.array_equal(table.getAlive()[0].ravel(), obs[-ALIEN_ROWS*ALIENS_IN_ROW:])
+
+
+def test_table_in_a_buffer():
+    buffer = bytearray(2*FEATURES.itemsize)
+    buffer[:] = b'\xff'*len(buffer)
+    table = FeatureTable(2, buffer)
+    assert not table.getObservations().any() and not table.getBoltValid().any()
+    sim = Simulation(False, 1)
+    table.update(sim, 0)
+    copy = np.frombuffer(buffer, dtype=FEATURES)
+    assert copy['observation']['ship'][0] == GAME_WIDTH//2
+    assert copy['observation']['lives'][0] == SHIP_LIVES
@@ -0,0 +1,34 @@
+"""
+Tests for the frame stack of game2d.gframes
+
+The stack must always hold the last depth frames pushed, oldest first,
+whichever way they were written and however often the ring wraps.
+"""
+from game2d.gframes import GFrameStack
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('depth,length', ((1, 2), (3, 4), (4, None), (5, 13)))
+def test_stack_holds_the_last_frames(depth, length):
+    stack = GFrameStack(depth, (2, 3), np.int64, length)
+    rng = np.random.default_rng(depth)
+    frame = rng.integers(0, 1000, (2, 3))
+    stack.slot[:] = frame
+    history = [frame]*depth
+    assert np.array_equal(stack.reset(), history)
+    for step in range(100):
+        frame = rng.integers(0, 1000, (2, 3))
+        if step % 2:
+            frames = stack.append(frame)
+        else:
+            stack.slot[:] = frame
+            frames = stack.push()
+        history = history[1:]+[frame]
+        assert np.array_equal(frames, history)
+        assert np.array_equal(stack.frames, history)
+
+
+def test_length_must_exceed_depth():
+    with pytest.raises(AssertionError):
+        GFrameStack(3, (2,), length=3)
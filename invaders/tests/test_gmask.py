@@ -0,0 +1,105 @@
+"""
+Tests for the collision masks of game2d.gmask and their use in simulation.py
+
+A mask must have a bit for every opaque pixel of its image, and with masks
+a bolt must only hit the ship or an alien where it is drawn.
+"""
+from consts import *
+from game2d.gmask import GMask, load_mask
+from game2d.gpng import read_png
+from simulation import Simulation, IMAGE_DIRECTORY
+import os
+import pytest
+
+
+def alpha(name):
+    """
+    Returns the alpha values of an image, as a list of rows from the bottom up.
+    """
+    width, height, pixels = read_png(os.path.join(IMAGE_DIRECTORY, name))
+    rows = [list(pixels[j*4*width+3:(j+1)*4*width:4]) for j in range(height)]
+    return rows[::-1]
+
+
+@pytest.mark.parametrize('name', (SHIP_IMAGE,)+tuple(ALIEN_IMAGES))
+def test_mask_bits_match_alpha(name):
+    mask = load_mask(name, IMAGE_DIRECTORY)
+    rows = alpha(name)
+    assert (mask.width, mask.height) == (len(rows[0]), len(rows))
+    opaque = 0
+    for j, row in enumerate(rows):
+        for i, a in enumerate(row):
+            # A one-pixel box at the size of the file checks a single bit
+            assert mask.overlaps(mask.width/2.0, mask.height/2.0, mask.width,
+                                 mask.height, (i, j, i+1, j+1)) == (a >= 128), (i, j)
+            opaque += a >= 128
+    assert mask.count() == opaque
+    # The sprites are neither empty nor solid
+    assert 0 < opaque < mask.width*mask.height
+
+
+def test_mask_scales_to_drawn_size():
+    # A 2x2 mask with only its top right pixel set, drawn at 10x10
+    mask = GMask(2, 2, [0, 2])
+    assert mask.overlaps(0, 0, 10, 10, (1, 1, 2, 2))
+    assert not mask.overlaps(0, 0, 10, 10, (-2, -2, -1, -1))
+    assert not mask.overlaps(0, 0, 10, 10, (-2, 1, -1, 2))
+    # Touching the opaque quarter at an edge is not an overlap
+    assert not mask.overlaps(0, 0, 10, 10, (-2, -2, 0, 0))
+    assert not mask.overlaps(0, 0, 10, 10, (5, 5, 6, 6))
+
+
+def transparent(mask, x, y, width, height, boxes):
+    """
+    Returns the first bolt center whose box overlaps an image but none of its pixels.
+
+    Parameter boxes: the bolt centers to try, in order
+    """
+    for bx, by in boxes:
+        box = (bx - BOLT_WIDTH/2.0, by - BOLT_HEIGHT/2.0,
+               bx + BOLT_WIDTH/2.0, by + BOLT_HEIGHT/2.0)
+        inside = (box[0] < x + width/2.0 and x - width/2.0 < box[2] and
+                  box[1] < y + height/2.0 and y - height/2.0 < box[3])
+        if inside and not mask.overlaps(x, y, width, height, box):
+            return (bx, by)
+    return None
+
+
+@pytest.mark.parametrize('pixel', (False, True))
+def test_bolt_misses_transparent_ship_pixels(pixel):
+    sim = Simulation(pixel, 0)
+    x = sim.getShipX()
+    y = SHIP_BOTTOM + SHIP_HEIGHT/2.0
+    # Alien bolts coming down on the top corners of the ship
+    tries = [(x + dx, y + SHIP_HEIGHT/2.0 + BOLT_HEIGHT/2.0 - 1)
+             for dx in range(-SHIP_WIDTH//2, SHIP_WIDTH//2)]
+    spot = transparent(load_mask(SHIP_IMAGE, IMAGE_DIRECTORY), x, y,
+                       SHIP_WIDTH, SHIP_HEIGHT, tries)
+    assert spot is not None
+    sim.getBolts().fire(spot[0], spot[1], -BOLT_SPEED)
+    sim.shipcollision()
+    assert sim.getLives() == (SHIP_LIVES if pixel else SHIP_LIVES-1)
+    # The middle of the ship is opaque, so a bolt there hits in both modes
+    lives = sim.getLives()
+    sim.getBolts().fire(x, y, -BOLT_SPEED)
+    sim.shipcollision()
+    assert sim.getLives() == lives-1
+
+
+@pytest.mark.parametrize('pixel', (False, True))
+def test_bolt_misses_transparent_alien_pixels(pixel):
+    sim = Simulation(pixel, 0)
+    formation = sim.getFormation()
+    x = float(formation.getX()[0,0])
+    y = float(formation.getY()[0,0])
+    name = ALIEN_IMAGES[formation.getTypes()[0,0]]
+    # Player bolts coming up under the bottom corners of the bottom left alien
+    tries = [(x + dx, y - ALIEN_HEIGHT/2.0 - BOLT_HEIGHT/2.0 + 1)
+             for dx in range(-ALIEN_WIDTH//2, ALIEN_WIDTH//2)]
+    spot = transparent(load_mask(name, IMAGE_DIRECTORY), x, y,
+                       ALIEN_WIDTH, ALIEN_HEIGHT, tries)
+    assert spot is not None
+    sim.getBolts().fire(spot[0], spot[1], BOLT_SPEED)
+    sim.collision()
+    assert formation.getAlive()[0,0] == pixel
+    assert formation.count() == ALIEN_ROWS*ALIENS_IN_ROW - (0 if pixel else 1)
@@ -0,0 +1,56 @@
+"""
+Tests for the PNG decoder of game2d.gpng
+
+The decoder must give the same RGBA pixels as a full image library, for
+the sprites of the game and for every color type it supports.
+"""
+from game2d.gpng import read_png
+import os
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+# The folder with the image files of the game
+IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Images')
+
+
+def rgba(filename):
+    """
+    Returns the (width, height, pixels) of a PNG file as read by PIL.
+    """
+    with Image.open(filename) as image:
+        image = image.convert('RGBA')
+        return (image.width, image.height, bytearray(image.tobytes()))
+
+
+@pytest.mark.parametrize('name', sorted(name for name in os.listdir(IMAGES)
+                                        if name.endswith('.png')))
+def test_sprites_match_pil(name):
+    filename = os.path.join(IMAGES, name)
+    assert read_png(filename) == rgba(filename)
+
+
+@pytest.mark.parametrize('mode', ('L', 'LA', 'RGB', 'RGBA', 'P'))
+def test_color_types_match_pil(tmp_path, mode):
+    filename = os.path.join(IMAGES, 'alien2.png')
+    with Image.open(filename) as image:
+        image = image.convert('RGBA')
+        if mode == 'P':
+            converted = image.convert('P', palette=Image.ADAPTIVE, colors=16)
+        else:
+            converted = image.convert(mode)
+        path = str(tmp_path / ('sprite-%s.png' % mode))
+        if mode == 'P':
+            # 8 bits per index (the only depth supported), with a transparent
+            # entry (a tRNS chunk)
+            converted.save(path, transparency=0, bits=8)
+        else:
+            converted.save(path)
+    assert read_png(path) == rgba(path)
+
+
+def test_not_a_png(tmp_path):
+    path = tmp_path / 'sprite.png'
+    path.write_bytes(b'GIF89a')
+    with pytest.raises(IOError):
+        read_png(str(path))
@@ -0,0 +1,41 @@
+"""
+Tests for the box test of game2d.grectangle
+
+GRectangle.overlaps is the one box test of the models, so it must agree
+with checking the corners of a smaller rectangle, as the models did before.
+"""
+import pytest
+import random
+
+pytest.importorskip('kivy')
+from game2d.grectangle import GRectangle
+
+
+def corners(target, x, y, width, height):
+    """
+    Returns True if a corner of a rectangle is inside target (the old test).
+    """
+    return any(target.contains((x + dx*width/2.0, y + dy*height/2.0))
+               for dx in (-1, 1) for dy in (-1, 1))
+
+
+def test_overlaps_matches_corners():
+    rng = random.Random(10)
+    target = GRectangle(x=100, y=50, width=40, height=20)
+    for _ in range(2000):
+        # Quarter pixels, so some rectangles touch the target exactly
+        x = rng.randrange(0, 800)/4.0
+        y = rng.randrange(0, 400)/4.0
+        box = (x-2, y-5, x+2, y+5)
+        expected = corners(target, x, y, 4, 10)
+        assert target.overlaps(box) == expected, (x, y)
+        other = GRectangle(x=x, y=y, width=4, height=10)
+        assert target.overlaps(other) == expected, (x, y)
+        assert other.overlaps(target) == expected, (x, y)
+
+
+def test_touching_edges_do_not_overlap():
+    target = GRectangle(x=0, y=0, width=10, height=10)
+    assert not target.overlaps((5, -5, 10, 5))
+    assert not target.overlaps((-5, 5, 5, 10))
+    assert target.overlaps((4.5, -5, 10, 5))
@@ -0,0 +1,90 @@
+"""
+Tests for the uniform grid of game2d.gspatial
+
+The grid must find the same overlaps as checking every box against every
+other box.
+"""
+from game2d.gspatial import GSpatialHash
+import itertools
+import random
+
+
+def overlap(b1, b2):
+    """
+    Returns True if two boxes (left, bottom, right, top) overlap.
+    """
+    return b1[0] < b2[2] and b2[0] < b1[2] and b1[1] < b2[3] and b2[1] < b1[3]
+
+
+def randombox(rng):
+    """
+    Returns a random box, some of them larger than a cell.
+    """
+    x = rng.uniform(-100, 500)
+    y = rng.uniform(-100, 500)
+    return (x, y, x+rng.uniform(1, 150), y+rng.uniform(1, 150))
+
+
+def test_insert_update_remove():
+    grid = GSpatialHash(32)
+    grid.insert(1000, (0, 0, 10, 10), 'a')
+    grid.insert(2000, (100, 100, 110, 110), 'b')
+    assert len(grid) == 2 and 1000 in grid and sorted(grid) == [1000, 2000]
+    assert grid.query(5, 5, 6, 6) == [1000]
+    # Boxes that only touch do not overlap
+    assert grid.query(10, 0, 20, 10) == []
+    grid.update(1000, (95, 95, 105, 105))
+    assert grid.box(1000) == (95, 95, 105, 105)
+    assert grid.query(5, 5, 6, 6) == []
+    assert sorted(grid.query(100, 100, 101, 101)) == [1000, 2000]
+    assert grid.query(100, 100, 101, 101, 'b') == [2000]
+    grid.insert(1000, (0, 0, 10, 10), 'c')
+    assert grid.group(1000) == 'c' and len(grid) == 2
+    grid.remove(1000)
+    grid.remove(1000)
+    assert len(grid) == 1 and grid.query(0, 0, 500, 500) == [2000]
+    grid.clear()
+    assert len(grid) == 0 and grid.query(0, 0, 500, 500) == []
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(5)
+    grid = GSpatialHash(64)
+    boxes = {}
+    for step in range(600):
+        key = rng.randrange(300)
+        if key in boxes and rng.random() < 0.3:
+            grid.remove(key)
+            del boxes[key]
+        elif key in boxes:
+            boxes[key] = randombox(rng)
+            grid.update(key, boxes[key])
+        else:
+            boxes[key] = randombox(rng)
+            grid.insert(key, boxes[key], key % 3)
+        region = randombox(rng)
+        expected = sorted(key for key, box in boxes.items() if overlap(box, region))
+        assert sorted(grid.query(*region)) == expected
+        expected = sorted(key for key in expected if key % 3 == 1)
+        assert sorted(grid.query(*region, group=1)) == expected
+
+
+def test_pairs_matches_brute_force():
+    rng = random.Random(6)
+    grid = GSpatialHash(64)
+    boxes = {}
+    # Ints above 256 are equal but not always the same object, so the pairs
+    # must not depend on the identity of the keys
+    for key in range(1000, 1200):
+        boxes[key] = randombox(rng)
+        grid.insert(int(str(key)), boxes[key], 'ship' if key % 2 else 'bolt')
+    found = grid.pairs('ship', 'bolt')
+    assert len(found) == len(set(found))
+    expected = sorted((a, b) for a, b in itertools.product(boxes, repeat=2)
+                      if a % 2 and not b % 2 and overlap(boxes[a], boxes[b]))
+    assert sorted(found) == expected
+    found = grid.pairs('bolt', 'bolt')
+    assert len({frozenset(pair) for pair in found}) == len(found)
+    expected = sorted((a, b) for a, b in itertools.combinations(sorted(boxes), 2)
+                      if not a % 2 and not b % 2 and overlap(boxes[a], boxes[b]))
+    assert sorted(tuple(sorted(pair)) for pair in found) == expected
@@ -0,0 +1,118 @@
+"""
+Tests for the timer wheel of game2d.gtimer
+
+The wheel must fire the same timers in the same order as a plain heap of
+(tick, priority, order) deadlines, however far apart the deadlines are.
+"""
+from game2d.gtimer import GTimerWheel
+import heapq
+import random
+
+
+class HeapTimers(object):
+    """
+    A reference scheduler: a heap of (tick, priority, order, name) deadlines.
+    """
+
+    def __init__(self):
+        self.now = 0
+        self.heap = []
+        self.order = 0
+        self.cancelled = set()
+
+    def schedule(self, delay, name, priority):
+        heapq.heappush(self.heap, (self.now+delay, priority, self.order, name))
+        self.order += 1
+
+    def cancel(self, name):
+        self.cancelled.add(name)
+
+    def next(self):
+        while self.heap and self.heap[0][3] in self.cancelled:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def advance(self, now, fired, chain):
+        while self.next() is not None and self.heap[0][0] <= now:
+            tick, _, _, name = heapq.heappop(self.heap)
+            self.now = tick
+            fired.append((tick, name))
+            if name in chain:
+                delay, child, priority = chain[name]
+                self.schedule(delay, child, priority)
+        self.now = now
+
+
+def play(seed, bits, levels):
+    """
+    Plays the same random schedule on a wheel and a heap, checking them as it goes.
+    """
+    rng = random.Random(seed)
+    wheel = GTimerWheel(bits=bits, levels=levels)
+    heap = HeapTimers()
+    span = 1 << (bits*levels)
+    timers = {}
+    chain = {}
+    fired = []
+    expected = []
+
+    def callback(name):
+        def fire():
+            fired.append((wheel.now, name))
+            timers.pop(name)
+            if name in chain:
+                delay, child, priority = chain[name]
+                timers[child] = wheel.schedule(delay, callback(child), priority)
+        return fire
+
+    now = 0
+    for count in range(2000):
+        op = rng.random()
+        if op < 0.5:
+            # Mostly near deadlines, some beyond the wheel (in the overflow)
+            delay = rng.choice((0, rng.randint(0, 8), rng.randint(0, span), rng.randint(span, 3*span)))
+            priority = rng.randint(0, 2)
+            name = 'timer%d' % count
+            timers[name] = wheel.schedule(delay, callback(name), priority)
+            heap.schedule(delay, name, priority)
+            if rng.random() < 0.2:
+                # A callback that schedules another timer when it fires
+                chain[name] = (rng.choice((0, rng.randint(0, 20))), name+'+', rng.randint(0, 2))
+        elif op < 0.6 and timers:
+            name = rng.choice(sorted(timers))
+            wheel.cancel(timers.pop(name))
+            heap.cancel(name)
+        else:
+            now += rng.choice((0, 1, rng.randint(0, 64), rng.randint(0, span)))
+            wheel.advance(now)
+            heap.advance(now, expected, chain)
+            assert fired == expected
+            assert wheel.now == now
+        assert wheel.next() == heap.next()
+        assert len(wheel) == len(timers)
+    wheel.advance(now + 4*span)
+    heap.advance(now + 4*span, expected, chain)
+    assert fired == expected
+    assert len(wheel) == 0 and wheel.next() is None
+
+
+def test_wheel_matches_heap():
+    for seed in range(5):
+        play(seed, 6, 4)
+
+
+def test_small_wheel_matches_heap():
+    # Two levels of 4 slots, so most timers start in the overflow
+    for seed in range(5):
+        play(seed, 2, 2)
+
+
+def test_clear_moves_the_wheel():
+    wheel = GTimerWheel()
+    fired = []
+    wheel.schedule(10, lambda: fired.append('old'))
+    wheel.clear(1000)
+    assert len(wheel) == 0 and wheel.now == 1000
+    wheel.schedule(5, lambda: fired.append('new'))
+    wheel.advance(2000)
+    assert fired == ['new']
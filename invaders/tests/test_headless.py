@@ -0,0 +1,20 @@
+"""
+Tests that the headless modules of the game do not load Kivy
+
+The game rules, the environments and the agents must run where Kivy cannot
+open a window, so importing them (and game2d with them) must not import it.
+"""
+import os
+import subprocess
+import sys
+
+# The folder with the modules of the game
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_headless_modules_do_not_import_kivy():
+    code = ('import sys\n'
+            'import simulation, batch, env, pool, features, pixels, autopilot, planner\n'
+            'import game2d\n'
+            'assert "kivy" not in sys.modules, sorted(sys.modules)\n')
+    subprocess.run([sys.executable, '-c', code], cwd=FOLDER, check=True)
@@ -0,0 +1,120 @@
+"""
+Tests for the tree search of planner.py
+
+The search must be reproducible from its random numbers (when it is limited
+to a number of rollouts), must not see the real future of the wave, and must
+play every rollout from the root with alien fire of its own.
+"""
+from consts import *
+from simulation import Simulation
+from env import ACTIONS
+from game2d.grandom import GRandom
+import planner
+from planner import Planner, search
+import pytest
+
+# A budget that a limited search never runs out of
+BUDGET = 60.0
+
+
+def started(seed):
+    """
+    Returns a wave that has been played for a little while, with an alien bolt on screen.
+    """
+    sim = Simulation(seed=seed)
+    while sim.getBolts().aliens() == 0:
+        sim.update(planner.INPUTS[0], 1.0/UPDATE_RATE)
+    return sim
+
+
+def test_search_counts_its_rollouts():
+    snapshot = started(0).snapshot()
+    visits, rollouts = search(Simulation(), snapshot, BUDGET, GRandom(1), limit=40)
+    assert rollouts == 40 and sum(visits) == 40
+    assert all(count > 0 for count in visits)
+
+
+def test_search_visits_the_tree_once_however_small_the_budget():
+    snapshot = started(0).snapshot()
+    visits, rollouts = search(Simulation(), snapshot, 1e-9, GRandom(1))
+    assert rollouts == 1 and sum(visits) == 1
+
+
+def test_search_is_reproducible():
+    snapshot = started(1).snapshot()
+    first = search(Simulation(), snapshot, BUDGET, GRandom(3), limit=60)
+    second = search(Simulation(), snapshot, BUDGET, GRandom(3), limit=60)
+    assert first == second
+
+
+def test_search_does_not_see_the_random_numbers_of_the_wave():
+    sim = started(2)
+    snapshot = sim.snapshot()
+    sim.getRandom().seed(12345)
+    reseeded = sim.snapshot()
+    assert snapshot != reseeded
+    first = search(Simulation(), snapshot, BUDGET, GRandom(4), limit=60)
+    second = search(Simulation(), reseeded, BUDGET, GRandom(4), limit=60)
+    assert first == second
+
+
+def test_every_rollout_plays_from_the_root(monkeypatch):
+    # Each rollout is the list of (action, state) of the actions it played in
+    # the tree.  A rollout always starts at the root, and a revisited node is
+    # played again with newly sampled fire, so the states it starts from
+    # differ from one visit to the next (a closed-loop tree restores the same
+    # one every time)
+    rollouts = []
+    play = planner._play
+
+    class Scratch(Simulation):
+        def restore(self, state):
+            assert state == snapshot
+            rollouts.append([])
+            Simulation.restore(self, state)
+
+    def spy(sim, held, ticks):
+        rollouts[-1].append((planner.INPUTS.index(held), sim.snapshot()))
+        return play(sim, held, ticks)
+
+    snapshot = started(3).snapshot()
+    monkeypatch.setattr(planner, '_play', spy)
+    monkeypatch.setattr(planner, '_rollout', lambda sim, rng, ticks, pilot: 0.0)
+    search(Scratch(), snapshot, BUDGET, GRandom(5), limit=50)
+    assert len(rollouts) == 50
+    after = {}
+    for path in rollouts:
+        if len(path) > 1:
+            after.setdefault(path[0][0], []).append(path[1][1])
+    assert after and all(len(set(states)) == len(states) for states in after.values())
+
+
+def test_planner_holds_the_keys_of_its_action():
+    sim = started(0)
+    pilot = Planner(0.01, seed=0)
+    action = pilot.plan(sim)
+    assert action == pilot.getAction()
+    assert pilot.keys == list(ACTIONS[action])
+    assert pilot.getRollouts() > 0 and pilot.getRate() > 0
+
+
+def test_planner_with_workers_adds_up_their_searches():
+    sim = started(0)
+    with Planner(0.02, workers=2, seed=0) as pilot:
+        assert pilot.getWorkers() == 2
+        action = pilot.plan(sim)
+        assert 0 <= action < len(ACTIONS)
+        assert pilot.getRollouts() >= 2
+    assert pilot.getWorkers() == 0
+
+
+def test_planner_plays_a_wave():
+    sim = Simulation(seed=4)
+    pilot = Planner(0.01, ticks=4, seed=2)
+    start = sim.getFormation().count()
+    for _ in range(20*UPDATE_RATE):
+        pilot.think(sim)
+        sim.update(pilot, 1.0/UPDATE_RATE)
+        if sim.player_won() or sim.getLives() <= 0:
+            break
+    assert sim.getFormation().count() < start
@@ -0,0 +1,67 @@
+"""
+Tests for the rollout pool of pool.py
+
+Game g of a pool is seeded with seed+g, so a seeded pool must play the
+same games however they are split between its workers.
+"""
+from consts import *
+from env import ACTIONS, InvadersEnv
+from pool import RolloutPool
+import numpy as np
+import pytest
+
+# The number of games in every pool
+SIZE = 4
+# The number of steps to play
+STEPS = 150
+
+
+def play(workers, depth):
+    """
+    Returns the arrays (observations, rewards, dones) of a seeded run of a pool.
+
+    The steps are submitted depth at a time before they are collected.
+    """
+    actions = np.random.default_rng(18).integers(0, len(ACTIONS), size=(STEPS, SIZE))
+    result = ([], [], [])
+    with RolloutPool(workers, SIZE//workers, depth=depth, seed=7) as pool:
+        first = pool.reset().copy()
+        for start in range(0, STEPS, depth):
+            for step in range(start, start+depth):
+                pool.submit(actions[step])
+            for step in range(depth):
+                for part, array in zip(result, pool.collect()):
+                    part.append(array.copy())
+    return (first,)+tuple(np.array(part) for part in result)
+
+
+def test_pool_is_independent_of_workers():
+    expected = play(1, 1)
+    for workers, depth in ((2, 1), (4, 3), (2, 2)):
+        for part, other in zip(expected, play(workers, depth)):
+            assert np.array_equal(part, other)
+    # The run must be long enough to see rewards
+    assert expected[2].any()
+
+
+def test_pool_matches_env():
+    first, obs, rewards, dones = play(2, 2)
+    actions = np.random.default_rng(18).integers(0, len(ACTIONS), size=(STEPS, SIZE))
+    env = InvadersEnv()
+    for game in range(SIZE):
+        assert np.array_equal(env.reset(7+game), first[game])
+        for step in range(STEPS):
+            result, reward, done, info = env.step(int(actions[step, game]))
+            if done:
+                result = env.reset()
+            assert np.array_equal(result, obs[step, game])
+            assert reward == rewards[step, game] and done == dones[step, game]
+
+
+def test_pool_survives_a_bad_action():
+    with RolloutPool(2, 1, seed=1) as pool:
+        pool.reset()
+        with pytest.raises(RuntimeError):
+            pool.step([0, len(ACTIONS)])
+        obs, rewards, dones = pool.step([0, 0])
+        assert obs.shape[0] == 2
@@ -0,0 +1,60 @@
+"""
+Tests for the snapshots of simulation.py
+
+A wave restored from a snapshot must play on exactly like the wave the
+snapshot was taken from, given the same keys.
+"""
+from consts import *
+from simulation import Simulation
+from env import ACTIONS, ActionInput
+import random
+import pytest
+
+# The input of each action
+INPUTS = [ActionInput(keys) for keys in ACTIONS]
+
+
+def state(sim):
+    """
+    Returns the state of a wave, including the indexes derived from it.
+    """
+    formation = sim.getFormation()
+    return (sim.snapshot(), formation.bounds(), formation.count(), formation.frontline(),
+            sim.untilNextEvent())
+
+
+def play(sim, actions):
+    """
+    Plays a list of actions on a wave, and returns the state after each update.
+    """
+    trace = []
+    for action in actions:
+        sim.update(INPUTS[action], 1.0/UPDATE_RATE)
+        trace.append(state(sim))
+        if sim.player_won() or sim.getLives() <= 0:
+            break
+    return trace
+
+
+@pytest.mark.parametrize('pixel', (False, True))
+@pytest.mark.parametrize('seed', range(3))
+def test_restore_replays_the_same_wave(pixel, seed):
+    rng = random.Random(seed)
+    actions = [rng.randrange(len(ACTIONS)) for _ in range(6000)]
+    cut = rng.randrange(200, 2000)
+    sim = Simulation(pixel, seed)
+    play(sim, actions[:cut])
+    snapshot = sim.snapshot()
+    expected = play(sim, actions[cut:])
+    assert expected[-1][2] < ALIEN_ROWS*ALIENS_IN_ROW
+
+    # A wave that has gone its own way
+    other = Simulation(pixel, seed+100)
+    play(other, [rng.randrange(len(ACTIONS)) for _ in range(500)])
+    other.restore(snapshot)
+    assert other.snapshot() == snapshot
+    assert play(other, actions[cut:]) == expected
+
+    # The wave the snapshot came from
+    sim.restore(snapshot)
+    assert play(sim, actions[cut:]) == expected
@@ -0,0 +1,69 @@
+"""
+Tests for the closed-form march of trajectory.py
+
+The closed form must agree with the step-by-step march that Wave used
+before it: walk to an edge, step down and turn, until the lowest alien
+reaches the defense line.
+"""
+from consts import *
+from trajectory import *
+from simulation import Simulation
+import random
+
+
+def walk(left, right, lowest, direction, steps):
+    """
+    Returns the list of (dx, dy, direction) after 0..steps steps of the old march.
+    """
+    dx = dy = 0
+    result = [(0, 0, direction)]
+    for _ in range(steps):
+        if lowest + dy > LAND_LIMIT:
+            if direction == 1 and right + dx >= RIGHT_LIMIT:
+                dy -= ALIEN_V_WALK
+                direction = -1
+            elif direction == -1 and left + dx <= LEFT_LIMIT:
+                dy -= ALIEN_V_WALK
+                direction = 1
+            else:
+                dx += direction*ALIEN_H_WALK
+        result.append((dx, dy, direction))
+    return result
+
+
+def test_offset_matches_stepping():
+    rng = random.Random(14)
+    for _ in range(300):
+        left = rng.randint(0, GAME_WIDTH)
+        right = rng.randint(left, GAME_WIDTH + ALIEN_WIDTH)
+        lowest = rng.randint(DEFENSE_LINE - ALIEN_HEIGHT, GAME_HEIGHT)
+        direction = rng.choice((1, -1))
+        march = Trajectory(left, right, lowest, direction)
+        expected = walk(left, right, lowest, direction, march.landing() + 50)
+        for steps, offset in enumerate(expected):
+            assert march.offset(steps) == offset, (left, right, lowest, direction, steps)
+
+
+def test_landing_is_first_step_at_the_line():
+    rng = random.Random(41)
+    for _ in range(100):
+        left = rng.randint(LEFT_LIMIT, RIGHT_LIMIT)
+        right = rng.randint(left, RIGHT_LIMIT)
+        lowest = rng.randint(LAND_LIMIT, GAME_HEIGHT)
+        march = Trajectory(left, right, lowest, rng.choice((1, -1)))
+        steps = march.landing()
+        assert lowest + march.offset(steps)[1] <= LAND_LIMIT
+        if steps:
+            assert lowest + march.offset(steps - 1)[1] > LAND_LIMIT
+
+
+def test_march_matches_alien_updates():
+    jumped = Simulation(seed=1)
+    stepped = Simulation(seed=1)
+    for steps in (1, 7, 30, 200, 1000):
+        jumped.march(steps)
+        for _ in range(steps):
+            stepped.alien_update()
+        assert (jumped.getFormation().getX() == stepped.getFormation().getX()).all()
+        assert (jumped.getFormation().getY() == stepped.getFormation().getY()).all()
+        assert jumped.getDirection() == stepped.getDirection()
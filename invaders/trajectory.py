@@ -0,0 +1,151 @@
+"""
+Formation trajectory module for Alien Invaders
+
+This module contains the class Trajectory, which computes where the march
+of the aliens takes the formation after any number of steps.  Between two
+kills, the march only depends on the extents of the formation (its leftmost,
+rightmost and lowest aliens) and the direction it is going: it walks to one
+edge, steps down, walks to the other edge, steps down, and so on until the
+lowest alien reaches the defense line.  After the first two runs, every run
+has the same length, so the position after k steps is a closed formula.
+
+This lets the simulation jump the formation ahead (to fast-forward, to seek
+in a replay, or to look ahead when planning) without running every step.
+A trajectory is only valid until an alien at an extent dies; the simulation
+then makes a new one from the current position.
+
+Like simulation.py, this module does not depend on game2d.
+"""
+from consts import *
+import math
+
+# PRIMARY RULE: Trajectory can only access consts.py.
+
+# The right edge of the march (the rightmost alien steps down once it is here)
+RIGHT_LIMIT = GAME_WIDTH - ALIEN_WIDTH // 2 - ALIEN_H_SEP
+# The left edge of the march (the leftmost alien steps down once it is here)
+LEFT_LIMIT = ALIEN_WIDTH // 2 + ALIEN_H_SEP
+# The height at which the aliens stop marching (they have reached the line)
+LAND_LIMIT = DEFENSE_LINE + ALIEN_HEIGHT // 2
+
+
+class Trajectory(object):
+    """
+    A class representing the march of the formation from a starting position.
+
+    The march is measured in steps of the formation.  Horizontal steps move it
+    ALIEN_H_WALK pixels, and a step down moves it ALIEN_V_WALK pixels down and
+    reverses the direction.  The position is stored as the number u of
+    horizontal steps right of the start, so the march is a series of runs:
+    each run moves u towards the edge in its direction (moves steps) and then
+    steps down (1 step).  The first two runs depend on where the formation
+    starts; all later runs have the same length.
+    """
+    # HIDDEN ATTRIBUTES:
+    # Attribute _start: the arguments the trajectory was made from
+    # Invariant: _start is a tuple (left, right, lowest, direction)
+    #
+    # Attribute _direction: the direction of the first run
+    # Invariant: _direction is 1 (right) or -1 (left)
+    #
+    # Attribute _runs: the number of horizontal steps in the first two runs
+    # Invariant: _runs is a pair of ints >= 0
+    #
+    # Attribute _middle: the value of u at the end of the second run
+    # Invariant: _middle is an int
+    #
+    # Attribute _period: the number of horizontal steps in every later run
+    # Invariant: _period is an int >= 0
+    #
+    # Attribute _landing: the number of steps before the march stops at the
+    # defense line
+    # Invariant: _landing is an int >= 0
+
+    # INITIALIZER
+    def __init__(self, left, right, lowest, direction):
+        """
+        Initializes the march of a formation from its current position.
+
+        Parameter left: the x-value of the leftmost alive alien
+        Precondition: left is an int or float
+
+        Parameter right: the x-value of the rightmost alive alien
+        Precondition: right is an int or float >= left
+
+        Parameter lowest: the y-value of the lowest alive alien
+        Precondition: lowest is an int or float
+
+        Parameter direction: the direction the formation is marching
+        Precondition: direction is 1 (right) or -1 (left)
+        """
+        # The formation steps down on its right run once u >= stop, and on its
+        # left run once u <= back
+        stop = math.ceil((RIGHT_LIMIT - right)/ALIEN_H_WALK)
+        back = math.floor((LEFT_LIMIT - left)/ALIEN_H_WALK)
+        self._start = (left, right, lowest, direction)
+        self._direction = direction
+        if direction == 1:
+            first = max(stop, 0)
+            self._middle = min(max(0, stop), back)
+            self._runs = (first, first - self._middle)
+        else:
+            first = min(back, 0)
+            self._middle = max(min(0, back), stop)
+            self._runs = (-first, self._middle - first)
+        self._period = max(stop - back, 0)
+
+        downs = max(math.ceil((lowest - LAND_LIMIT)/ALIEN_V_WALK), 0)
+        if downs == 0:
+            self._landing = 0
+        elif downs == 1:
+            self._landing = self._runs[0]+1
+        else:
+            self._landing = (self._runs[0] + self._runs[1] + 2 +
+                             (downs-2)*(self._period+1))
+
+    # METHODS TO QUERY THE MARCH
+    def start(self):
+        """
+        Returns the tuple (left, right, lowest, direction) the march was made from.
+
+        Trajectory(*start()) is the same march, which is how a saved game
+        rebuilds it.
+        """
+        return self._start
+
+    def landing(self):
+        """
+        Returns the number of steps until the formation reaches the defense line.
+
+        The formation does not move on any later step.
+        """
+        return self._landing
+
+    def offset(self, steps):
+        """
+        Returns the triple (dx, dy, direction) of the march after a number of steps.
+
+        The pair (dx, dy) is how far the formation has moved from its start, and
+        direction is the direction of its next horizontal step (1 for right, -1
+        for left).  This takes the same time for any number of steps.
+
+        Parameter steps: the number of steps taken
+        Precondition: steps is an int >= 0
+        """
+        steps = min(steps, self._landing)
+        d = self._direction
+        first, second = self._runs
+        if steps <= first:
+            return (d*steps*ALIEN_H_WALK, 0, d)
+        steps -= first+1
+        start = d*first
+        if steps <= second:
+            return ((start - d*steps)*ALIEN_H_WALK, -ALIEN_V_WALK, -d)
+        steps -= second+1
+        runs, steps = divmod(steps, self._period+1)
+        if runs % 2 == 0:
+            u = self._middle + d*steps
+        else:
+            u = self._middle + d*(self._period - steps)
+            d = -d
+        return (u*ALIEN_H_WALK, -(2+runs)*ALIEN_V_WALK, d)
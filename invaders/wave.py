@@ -7,6 +7,11 @@ you move to a new level, you are expected to make a new instance of the class.
 
 The subcontroller Wave manages the ship, the aliens and any laser bolts on
 screen. These are model objects.  Their classes are defined in models.py.
+The rules of the game (movement, firing and collisions) are in the headless
+class Simulation in simulation.py.  Wave is a view adapter over a Simulation:
+it creates the model objects, copies their positions from the simulation
+when drawing, and drains the events of each update to its subscribers (one
+of which plays the sounds).
 
 Most of your work on this assignment will be in either this module or
 models.py. Whether a helper method belongs in this module or models.py is
@@ -20,7 +25,7 @@ Oana Mirestean oam34
 from game2d import *
 from consts import *
 from models import *
-import random
+from simulation import *
 
 # PRIMARY RULE: Wave can only access attributes in models.py via getters/setters
 # Wave is NOT allowed to access anything in app.py (Subcontrollers are not
@@ -32,11 +37,12 @@ class Wave(object):
     This class controls a single level or wave of Alien Invaders.
 
     This subcontroller has a reference to the ship, aliens, and any laser bolts
-    on screen. It animates the laser bolts, removing any aliens as necessary.
-    It also marches the aliens back and forth across the screen until they are
-    all destroyed or they reach the defense line (at which point the player
-    loses). When the wave is complete, you  should create a NEW instance of
-    Wave (in Invaders) if you want to make a new wave of aliens.
+    on screen. The game rules are delegated to a Simulation object, which
+    animates the laser bolts, removes any aliens as necessary, and marches the
+    aliens back and forth across the screen until they are all destroyed or
+    they reach the defense line (at which point the player loses). When the
+    wave is complete, you  should create a NEW instance of Wave (in Invaders)
+    if you want to make a new wave of aliens.
 
     If you want to pause the game, tell this controller to draw, but do not
     update.  See subcontrollers.py from Lecture 24 for an example.  This
@@ -52,363 +58,248 @@ class Wave(object):
 
     """
     # HIDDEN ATTRIBUTES:
-    # Attribute _ship: the player ship to control
-    # Invariant: _ship is a Ship object or None
+    # Attribute _sim: the headless simulation with the game rules
+    # Invariant: _sim is a Simulation object
     #
-    # Attribute _aliens: the 2d list of aliens in the wave
-    # Invariant: _aliens is a rectangular 2d list containing Alien objects or None
+    # Attribute _ship: the player ship to draw
+    # Invariant: _ship is a Ship object
     #
-    # Attribute _bolts: the laser bolts currently on screen
-    # Invariant: _bolts is a list of Bolt objects, possibly empty
+    # Attribute _aliens: the 2d list of alien images in the wave
+    # Invariant: _aliens is a rectangular 2d list of Alien objects, with the
+    # same shape as the formation of _sim (dead aliens keep their image, so a
+    # restore that revives them makes no new image)
     #
-    # Attribute _dline: the defensive line being protected
-    # Invariant : _dline is a GPath object
-    #
-    # Attribute _lives: the number of lives left
-    # Invariant: _lives is an int >= 0
-    #
-    # Attribute _time: the amount of time since the last Alien "step"
-    # Invariant: _time is a float >= 0s
+    # Attribute _version: the formation version the alien images were moved to
+    # Invariant: _version is an int, or None if the images were never moved
     #
-    # You may change any attribute above, as long as you update the invariant
-    # You may also add any new attributes as long as you document them.
-    # LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
-    #Attribute _direction: specifies the direction in which the aliens are traveling
-    #Invariant: _direction is an int >= -2 and int<= 2
+    # Attribute _bolts: the laser bolt images currently on screen
+    # Invariant: _bolts is a list of Bolt objects, one for each alive bolt of
+    # _sim (in the same order) as of the last draw
     #
-    #Attribute _steps: the randomized number of steps the aliens take before shooting
-    #Invariant: _steps is an int >= 1 and int <= BOLT_RATE
+    # Attribute _pool: the laser bolt images that are not in use
+    # Invariant: _pool is a list of Bolt objects, none of them in _bolts
     #
-    #Attribute _blast1: the sound for when an alien is destroyed
-    #Invariant: _blast1 is a .wav file
-    #
-    #Attribute _blast2: the sound for when an ship is destroyed
-    #Invariant: _blast2 is a .wav file
-    #
-    #Attribute _pew1: the sound for when an ship blast is fired
-    #Invariant: _pew1 is a .wav file
-    #
-    #Attribute _pew2: the sound for when an alien blast is fired
-    #Invariant: _pew2 is a .wav file
+    # Attribute _dline: the defensive line being protected
+    # Invariant : _dline is a GPath object
     #
-    #Attribute _rogue: an alien object that is a rogue
-    #Invariant: _rogue is a GObject
+    # Attribute _sounds: the sounds played for the simulation events
+    # Invariant: _sounds is a dict mapping .wav file names to Sound objects
+    # (empty if the wave has no audio)
 
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
     def getLives(self):
-        return self._lives
+        return self._sim.getLives()
 
     def setLives(self, decrease):
-        self._lives = self._lives - decrease
+        self._sim.setLives(decrease)
+
+    def getSimulation(self):
+        """
+        Returns the headless Simulation with the rules of this wave.
+
+        This is for programs that play the wave, such as an Autopilot.  Do
+        not update it directly; use update.
+        """
+        return self._sim
 
     # INITIALIZER (standard form) TO CREATE SHIP AND ALIENS
-    def __init__(self):
+    def __init__(self, audio=True, seed=None, pixel=PIXEL_COLLISIONS):
         """
-        Initializes the ship, aliens, bolts, and dline.
+        Initializes the simulation, and the ship, aliens, and dline to draw it.
+
+        Parameter audio: whether to play sounds for the simulation events
+        Precondition: audio is a bool
+
+        Parameter seed: the seed of the random numbers of the wave (None for
+        a random seed)
+        Precondition: seed is None or an int >= 0
+
+        Parameter pixel: whether bolts only hit the opaque pixels of the ship
+        and aliens
+        Precondition: pixel is a bool
         """
-        self._ship = Ship(x = GAME_WIDTH//2, y = SHIP_BOTTOM+SHIP_HEIGHT//2,
-        source = 'ship.png')
+        self._sim = Simulation(pixel, seed)
+        self._ship = Ship(x = self._sim.getShipX(), y = SHIP_BOTTOM+SHIP_HEIGHT//2,
+        source = SHIP_IMAGE)
+        formation = self._sim.getFormation()
+        xs = formation.getX().tolist()
+        ys = formation.getY().tolist()
+        types = formation.getTypes().tolist()
         self._aliens = []
-        self.draw_table()
-        self._direction = 1
-        self._time = 0
-        self._steps = random.randint(1,BOLT_RATE)
+        for row in range(len(xs)):
+            self._aliens.append([Alien(x = xs[row][col], y = ys[row][col],
+            source = ALIEN_IMAGES[types[row][col]]) for col in range(len(xs[row]))])
+        self._version = formation.getVersion()
         self._dline = GPath(points = [0,DEFENSE_LINE,GAME_WIDTH,DEFENSE_LINE],
         linewidth = 1,linecolor = 'gray')
         self._bolts = []
-        self._blast1 = Sound('blast1.wav')
-        self._pew1 = Sound('pew1.wav')
-        self._blast2 = Sound('blast2.wav')
-        self._pew2 = Sound('pew2.wav')
-        self._lives = 3
-
+        self._pool = []
+        self._sounds = {}
+        if audio:
+            for name in ('blast1.wav','pew1.wav','blast2.wav','pew2.wav'):
+                self._sounds[name] = Sound(name)
+            self.subscribe(self._play)
 
     # UPDATE METHOD TO MOVE THE SHIP, ALIENS, AND LASER BOLTS
     def update(self,input,dt):
         """
         Update method for everything in Wave.
         """
-        self.ship_update(input)
-        self.bolt_update(input)
-        self.collision()
-        self.shipcollision()
-        if not self.player_won():
-            if self._time > ALIEN_SPEED:
-                self.alien_update()
-                self._time = 0
-                if self._steps == 0:
-                    alien = self.random_alien()
-                    self._bolts.append(Bolt(x = alien.x, y = alien.y,
-                    vel = -BOLT_SPEED))
-                    self._pew2.play()
-                    self._steps = random.randint(1,BOLT_RATE)
-                else:
-                    self._steps = self._steps -1
-            else:
-                self._time = self._time + dt
+        self._sim.update(input,dt)
+        self._sim.getEvents().drain()
 
-    # DRAW METHOD TO DRAW THE SHIP, ALIENS, DEFENSIVE LINE AND BOLTS
-    def draw(self, view):
+    def subscribe(self, handler, kind=GameEvent):
         """
-        Draws the game objects.
+        Registers handler to be called with the events of each update.
 
-        Every single thing you want to draw in this game is a GObject.
+        The handlers are called after the update is complete, never in the
+        middle of it (see EventBus).
 
-        Many of the GObjects (such as the ships, aliens, and bolts) are
-        attributes in Wave. In order to draw them, you either need to add
-        getters for these attributes or you need to add a draw method to
-        class Wave.  We suggest the latter.  See the example subcontroller.py
-        from class.
-        """
-        for alienrows in self._aliens:
-            for alien in alienrows:
-                if alien != None:
-                    alien.draw(view)
-        self._ship.draw(view)
-        self._dline.draw(view)
-        for bolt in self._bolts:
-            bolt.draw(view)
+        Parameter handler: the function to call
+        Precondition: handler is a function taking one GameEvent
 
-    def draw_table(self):
-        """
-        Creates a table of aliens according to the given constants.
-        Table is built from bottom to top.
+        Parameter kind: the kind of event to receive (GameEvent for all)
+        Precondition: kind is GameEvent or a subclass of it
         """
-        x = 0
-        y = GAME_HEIGHT - ALIEN_CEILING - (ALIEN_ROWS * (ALIEN_V_SEP + ALIEN_HEIGHT))
-        alien_type = 0
-        image = ALIEN_IMAGES[alien_type]
-        for m in range(1, ALIEN_ROWS + 1):
-            columns = []
-            for n in range(ALIENS_IN_ROW):
-                if n == 0:
-                    x = ALIEN_H_SEP + ALIEN_WIDTH//2
-                    y = y + ALIEN_HEIGHT//2
-                    columns.append(Alien(x = x , y = y , source = ALIEN_IMAGES[alien_type]))
-                else:
-                    x = x + ALIEN_H_SEP + ALIEN_WIDTH
-                    columns.append(Alien(x = x, y = y , source = ALIEN_IMAGES[alien_type]))
-            if m % 2 == 0:
-                alien_type = alien_type + 1
-                alien_type = alien_type % 3
-            self._aliens.append(columns)
-            y = y + ALIEN_HEIGHT + ALIEN_V_SEP
-
-    def ship_update(self, input):
-        """
-        Method for updating the ship. Called by update.
-        """
-        da = 0
-        if input.is_key_down('right'):
-            da += SHIP_MOVEMENT
-        if input.is_key_down('left'):
-            da -= SHIP_MOVEMENT
-        newpos = self._ship.x + da
-        # if newpos > GAME_WIDTH:
-        #     newpos = GAME_WIDTH             #Ship does not wrap-around screen
-        # if newpos < 0:
-        #     newpos = 0
-        if newpos > GAME_WIDTH:
-            newpos = 0
-        if newpos < 0:
-            newpos = GAME_WIDTH                     #Ship may wrap-around screen
-        self._ship.x = newpos
-
-    def alien_update(self):
-        """
-        Method for updating the aliens. Called by update.
-        """
-        lowest = self.lowest_alien()
-        if lowest > DEFENSE_LINE + ALIEN_HEIGHT//2:
-            rightmost = self.right_alien()
-            leftmost = self.left_alien()
-            if (rightmost >= GAME_WIDTH - ALIEN_WIDTH // 2 - ALIEN_H_SEP and
-            self._direction == 1):
-                self._direction = 2
-                self.alien_down()
-            elif leftmost <= ALIEN_WIDTH // 2 + ALIEN_H_SEP and self._direction  == -1:
-                self._direction = -2
-                self.alien_down()
-            elif self._direction == -2:
-                self.alien_right()
-            elif rightmost < GAME_WIDTH - ALIEN_WIDTH // 2 - ALIEN_H_SEP and self._direction == 1:
-                self.alien_right()
-            elif self._direction == 2:
-                self.alien_left()
-            elif leftmost > ALIEN_WIDTH // 2 + ALIEN_H_SEP and self._direction == -1:
-                self.alien_left()
-
-    def alien_right(self):
-        """
-        Moves the aliens to the right.
-        """
-        for alien_col in self._aliens:
-            for alien in alien_col:
-                if alien != None:
-                    alien.x = alien.x + ALIEN_H_WALK
+        self._sim.getEvents().subscribe(handler, kind)
 
-    def alien_left(self):
+    def _play(self, event):
         """
-        Moves the aliens to the left.
-        """
-        for alien_col in self._aliens:
-            for alien in alien_col:
-                if alien != None:
-                    alien.x = alien.x - ALIEN_H_WALK
+        Plays the sound for a simulation event.
 
-    def alien_down(self):
-        """
-        Moves the aliens down.
+        Parameter event: the event to play
+        Precondition: event is a GameEvent
         """
-        for alien_col in self._aliens:
-            for alien in alien_col:
-                if alien != None:
-                    alien.y = alien.y - ALIEN_V_WALK
-        if self._direction == 2:
-            self._direction = -1
-        elif self._direction == -2:
-            self._direction = 1
-
-    def right_alien(self):
-        """
-        Finds the righmost point of the rightmost alien and returns the value.
-        """
-        max = 0
-        for alien_col in self._aliens:
-            for alien in alien_col:
-                if alien != None:
-                    x = alien.x
-                    if x >= max:
-                        max = x
-        return max
-
-    def left_alien(self):
-        """
-        Finds the leftmost value of the leftmost alien and returns the value.
-        """
-        min = GAME_WIDTH -1
-        for alien_col in self._aliens:
-            for alien in alien_col:
-                if alien != None:
-                    x = alien.x
-                    if x <= min:
-                        min = x
-        return min
-
-    def lowest_alien(self):
-        """
-        Finds the lowest alien and returns the y-value.
-        """
-        lowest = GAME_HEIGHT
-        for alien_col in self._aliens:
-            for alien in alien_col:
-                if alien != None:
-                    y = alien.y
-                    if y <= lowest:
-                        lowest = y
-        return lowest
-
-    def bolt_update(self, input):
-        """
-        Updates the bolts.
-        """
-        if input.is_key_down('spacebar') and self.num_player_bolts() < 1:
-            self._bolts.append(Bolt(x = self._ship.x, y = BOLT_HEIGHT//2 + SHIP_HEIGHT
-            + SHIP_BOTTOM, vel = BOLT_SPEED))
-            self._pew1.play()
-        self.player_bolt()
-        self.alien_bolt()
-
-    def player_bolt(self):
-        """
-        Method for updating bolts fired by the player.
+        if isinstance(event, BoltFired):
+            name = 'pew1.wav' if event.isPlayerBolt() else 'pew2.wav'
+        elif isinstance(event, AlienKilled):
+            name = 'blast1.wav'
+        elif isinstance(event, ShipHit):
+            name = 'blast2.wav'
+        else:
+            return
+        self._sounds[name].play()
+
+    # DRAW METHOD TO DRAW THE SHIP, ALIENS, DEFENSIVE LINE AND BOLTS
+    def draw(self, view, alpha=1.0):
         """
-        for i in range(len(self._bolts)):
-            if self._bolts[i].isPlayerBolt():
-                self._bolts[i].y += BOLT_SPEED
-        i = 0
-        while i < len(self._bolts):
-            if (self._bolts[i].y - BOLT_HEIGHT//2) > GAME_HEIGHT:
-                del self._bolts[i]
+        Draws the game objects.
+
+        The model objects are only moved here, right before they are drawn,
+        so the simulation never touches a Kivy object.
+
+        The ship and the bolts are drawn at alpha of the way from where they
+        were before the last update to where they are now.  The aliens step,
+        so they are always drawn where they are.
+
+        Parameter view: the view to draw to
+        Precondition: view is a GView
+
+        Parameter alpha: the interpolation factor (see GameApp.interpolation)
+        Precondition: alpha is a float in 0..1
+        """
+        formation = self._sim.getFormation()
+        alive = formation.getAlive()
+        if formation.getVersion() != self._version:
+            self._sync_aliens(formation)
+        for row, col in zip(*alive.nonzero()):
+            self._aliens[row][col].draw(view)
+        shipx = self._sim.getShipX()
+        prev = self._sim.getShipPrevious()
+        if abs(shipx - prev) < GAME_WIDTH/2:        # Do not interpolate a wrap
+            shipx = prev + (shipx - prev)*alpha
+        self._ship.x = shipx
+        self._ship.draw(view)
+        self._dline.draw(view)
+        buffer = self._sim.getBolts()
+        alive = buffer.getAlive()
+        xs = buffer.getX()[alive].tolist()
+        vels = buffer.getVelocity()[alive]
+        ys = (buffer.getY()[alive] - vels*(self._sim.getScale()*(1-alpha))).tolist()
+        vels = vels.tolist()
+        while len(self._bolts) > len(xs):
+            self.release_bolt(self._bolts.pop())
+        for i in range(len(xs)):
+            if i < len(self._bolts):
+                self._bolts[i].reset(xs[i], ys[i], vels[i])
             else:
-                i += 1
+                self._bolts.append(self.acquire_bolt(xs[i], ys[i], vels[i]))
+            self._bolts[i].draw(view)
 
-    def alien_bolt(self):
+    # METHODS TO SAVE AND RESTORE THE WAVE
+    def snapshot(self):
         """
-        Method for updating bolts fired by the aliens.
+        Returns the complete state of the wave as a bytes object.
+
+        See Simulation.snapshot.
         """
-        for i in range(len(self._bolts)):
-            if self._bolts[i].isPlayerBolt() == False:
-                self._bolts[i].y -= BOLT_SPEED
-        i = 0
-        while i < len(self._bolts):
-            if (self._bolts[i].y + BOLT_HEIGHT//2) < 0:
-                del self._bolts[i]
-            else:
-                i += 1
+        return self._sim.snapshot()
 
-    def num_player_bolts(self):
+    def restore(self, snapshot):
         """
-        Returns the number of player bolts in the list.
+        Puts the wave back in the state of a snapshot.
+
+        No images are made: aliens that come back to life get back the image
+        they had before they died, and the next draw moves everything into
+        place.  No sounds are played for the restore.
+
+        Parameter snapshot: the state to restore
+        Precondition: snapshot is a bytes object returned by snapshot
         """
-        num = 0
-        for i in self._bolts:
-            if i.getVelocity() > 0:
-                num = num + 1
-        w = num
-        num = 0
-        return w
-
-    def random_alien(self):
+        self._sim.restore(snapshot)
+        self._version = None
+
+    def acquire_bolt(self, x, y, vel):
         """
-        Finds the random alien to fire the bolt.
+        Returns a Bolt at (x,y) with velocity vel, reusing a released bolt if possible.
+
+        Building a Bolt from scratch parses its colors and creates all of its
+        Kivy instructions.  A released bolt keeps these, so reusing it only
+        moves it.
+
+        Parameter x: the horizontal coordinate of the bolt center
+        Precondition: x is an int or float
+
+        Parameter y: the vertical coordinate of the bolt center
+        Precondition: y is an int or float
+
+        Parameter vel: the velocity in y direction
+        Precondition: vel is an int or float, and not 0
         """
-        current_aliens = []
-        for s in range(ALIENS_IN_ROW):
-            no_col_alien = True
-            for t in range(ALIEN_ROWS):
-                if self._aliens[t][s] is not None and no_col_alien:
-                    current_aliens += [self._aliens[t][s]]
-                    no_col_alien = False
-        return random.choice(current_aliens)
-
-    def collision(self):
+        if self._pool:
+            bolt = self._pool.pop()
+            bolt.reset(x, y, vel)
+            return bolt
+        return Bolt(x = x, y = y, vel = vel)
+
+    def release_bolt(self, bolt):
         """
-        Removes alien if hit by ship bolt
+        Returns a Bolt that is no longer on screen to the pool.
+
+        Parameter bolt: the bolt to recycle
+        Precondition: bolt is a Bolt that is not drawn anymore
         """
-        for bolt in self._bolts:
-            for row in range(len(self._aliens)):
-                for alien in range(ALIENS_IN_ROW):
-                    if self._aliens[row][alien] != None:
-                        if self._aliens[row][alien].collides(bolt) and bolt.isPlayerBolt():
-                            self._aliens[row][alien] = None
-                            self._blast1.play()
-                            self._bolts.remove(bolt)
-
-    def shipcollision(self):
+        self._pool.append(bolt)
+
+    def _sync_aliens(self, formation):
         """
-        Ship loses life if hit by alien bolt
+        Moves the alive alien images to their positions in the formation.
+
+        Parameter formation: the formation to copy positions from
+        Precondition: formation is the Formation of _sim
         """
-        for bolt in self._bolts:
-            if self._ship.shipcollides(bolt):
-                self._blast2.play()
-                self._bolts.remove(bolt)
-                self.setLives(1)
-        if self.lowest_alien() <= DEFENSE_LINE + ALIEN_HEIGHT//2:
-            self.setLives(3)
+        alive = formation.getAlive()
+        xs = formation.getX()[alive].tolist()
+        ys = formation.getY()[alive].tolist()
+        rows, cols = alive.nonzero()
+        for i in range(len(xs)):
+            alien = self._aliens[rows[i]][cols[i]]
+            alien.x = xs[i]
+            alien.y = ys[i]
+        self._version = formation.getVersion()
 
     def player_won(self):
         """
         returns True if the player has won the game
         """
-        acc = 0
-        for x in self._aliens:
-            for y in x:
-                if y is not None:
-                    acc += 1
-        if acc == 0:
-            return True
-        else:
-            return False
-
-    # HELPER METHODS FOR COLLISION DETECTION
+        return self._sim.player_won()